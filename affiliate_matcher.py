@@ -0,0 +1,153 @@
+"""
+Affiliate link eşleştirme (Aho-Corasick).
+
+suggest_missing_piece her çağrıda bütün affiliate_links satırlarını okuyup
+virgüllü anahtar kelimeleri tek tek ürün adında arıyordu
+(linkler x kelimeler). Artık:
+- Bütün anahtar kelimeler bir kez Aho-Corasick otomatına derlenir;
+  eşleştirme ürün adının uzunluğunda tek geçiştir
+- Türkçe büyük/küçük harf duyarsız: "I", "İ", "ı" hepsi "i" sayılır; ürün
+  adı "MAVI" (İngilizce klavye) ya da "MAVİ" yazılsa da "mavi" ile eşleşir
+- Birden fazla kelime geçiyorsa en uzunu kazanır ("deri ceket" > "ceket"),
+  eşitlikte ürün adında önce geçen; aynı kelime iki satırda varsa eski satır
+- Tablo değişince (ekleme / güncelleme / silme) tetikleyiciler
+  affiliate_version'ı artırır. Değişikliği yapan worker otomatı hemen,
+  diğerleri en geç AFFILIATE_SYNC_SECONDS içinde yeniden kurar
+
+Ölçüm: benchmarks/bench_affiliate_matcher.py
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+AFFILIATE_SYNC_SECONDS = float(os.getenv("AFFILIATE_SYNC_SECONDS", "10"))
+
+# str.lower() "İ"yi "i̇" (iki karakter) yapar; noktalı/noktasız i farkı da eşleşmeyi bozmasın
+_TR_CASE = str.maketrans({"I": "i", "İ": "i", "ı": "i"})
+
+
+def fold(text):
+    """Eşleştirme için küçük harf (I/İ/ı -> i)."""
+    return text.translate(_TR_CASE).lower()
+
+
+def split_keywords(keyword):
+    """Virgüllü liste -> kelimeler: "Ceket, Mont, Kaban" -> ["ceket", "mont", "kaban"]"""
+    return [k for k in (fold(part.strip()) for part in (keyword or "").split(",")) if k]
+
+
+def install(cursor):
+    """Sürüm sayacı + tetikleyiciler (tıklanma sayacı değişince otomat yeniden kurulmaz)."""
+    cursor.execute("CREATE TABLE IF NOT EXISTS affiliate_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER)")
+    cursor.execute("INSERT OR IGNORE INTO affiliate_version (id, version) VALUES (1, 0)")
+    for name, event in (("insert", "INSERT"), ("update", "UPDATE OF keyword, link"), ("delete", "DELETE")):
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_affiliate_{name} AFTER {event} ON affiliate_links BEGIN
+            UPDATE affiliate_version SET version = version + 1 WHERE id = 1;
+        END''')
+
+
+class Automaton:
+    """Kelime -> değer sözlüğünden Aho-Corasick otomatı; her düğümde orada biten en uzun kelime tutulur."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [None]   # (uzunluk, değer)
+        for word, value in patterns.items():
+            node = 0
+            for ch in word:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(None)
+                node = nxt
+            self.out[node] = (len(word), value)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                # Düğümün kendi kelimesi yoksa son eki olan en uzun kelime
+                if self.out[child] is None:
+                    self.out[child] = self.out[self.fail[child]]
+                queue.append(child)
+
+    def longest(self, text):
+        """Dönüş: (başlangıç, uzunluk, değer) veya None; en uzun, eşitse en soldaki."""
+        goto, fail, out = self.goto, self.fail, self.out
+        best = None
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = out[node]
+            if hit is not None and (best is None or hit[0] > best[1]):
+                best = (i - hit[0] + 1, hit[0], hit[1])
+        return best
+
+
+class AffiliateMatcher:
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.automaton = None
+        self.links = {}
+        self.version = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def _rebuild(self, conn, version):
+        rows = conn.execute("SELECT id, keyword, link FROM affiliate_links ORDER BY id").fetchall()
+        patterns = {}
+        for link_id, keyword, _ in rows:
+            for word in split_keywords(keyword):
+                patterns.setdefault(word, link_id)  # Aynı kelime iki satırda varsa eski satır
+        self.links = {link_id: {"id": link_id, "keyword": keyword, "link": link} for link_id, keyword, link in rows}
+        self.automaton = Automaton(patterns)
+        self.version = version
+
+    def _sync(self):
+        """self.lock altında: otomat yoksa veya sürüm değiştiyse yeniden kurar (en fazla AFFILIATE_SYNC_SECONDS'te bir bakılır)."""
+        if self.automaton is not None and time.monotonic() - self.checked_at <= AFFILIATE_SYNC_SECONDS:
+            return
+        conn = sqlite3.connect(self.db_file)
+        try:
+            row = conn.execute("SELECT version FROM affiliate_version WHERE id = 1").fetchone()
+            version = row[0] if row else None
+            if self.automaton is None or version != self.version:
+                self._rebuild(conn, version)
+        finally:
+            conn.close()
+        self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Bu worker'da tablo değişti: sonraki eşleştirmede otomat yeniden kurulur."""
+        with self.lock:
+            self.automaton = None
+
+    def get(self, link_id):
+        """Tek link satırı (yönlendirme için): {"id", "keyword", "link"} veya None"""
+        with self.lock:
+            self._sync()
+            return self.links.get(link_id)
+
+    def match(self, product_name):
+        """Ürün adında geçen en uzun anahtar kelimenin satırı: {"id", "keyword", "link", "matched"} veya None"""
+        with self.lock:
+            self._sync()
+            automaton, links = self.automaton, self.links
+        name = fold(product_name or "")
+        hit = automaton.longest(name)
+        if hit is None:
+            return None
+        start, length, link_id = hit
+        return {**links[link_id], "matched": name[start:start + length]}
@@ -0,0 +1,166 @@
+"""
+Affiliate gösterim / tıklama sayaçları (write-behind).
+
+Eskiden her eşleşmede istek içinde "UPDATE affiliate_links SET
+click_count = click_count + 1" commit ediliyor, yazma kilidi öneri
+cevabını bekletiyordu. Üstelik sayılan tıklama değil, önerinin
+gösterilmesiydi. Artık:
+- Öneri gösterilince impression, kullanıcı /affiliate/go/{id} ile linke
+  gidince click olayı bellekteki sayaca eklenir (istek DB'ye yazmaz)
+- Arka plan thread'i AFFILIATE_FLUSH_INTERVAL saniyede bir toplanmış
+  sayıları tek transaction'da yazar: affiliate_daily (link + gün başına
+  özet) upsert + affiliate_links toplamları
+- /affiliate/list son AFFILIATE_TREND_DAYS günün eğilimini ham olay
+  taramadan affiliate_daily'den okur
+- Yazma başarısız olursa sayılar belleğe geri eklenir, sonraki flush dener
+- Bu arada silinmiş linklerin sayıları atılır (affiliate_daily'de yetim
+  satır oluşmaz; başka worker'ın belleğindeki sayılar için de geçerli)
+
+Ölçüm: benchmarks/bench_affiliate_stats.py
+"""
+import atexit
+import os
+import sqlite3
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+AFFILIATE_FLUSH_INTERVAL = float(os.getenv("AFFILIATE_FLUSH_INTERVAL", "5"))
+AFFILIATE_TREND_DAYS = int(os.getenv("AFFILIATE_TREND_DAYS", "7"))
+
+KINDS = ("impressions", "clicks")
+
+
+def install(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS affiliate_daily (
+        link_id INTEGER,
+        day TEXT,
+        impressions INTEGER DEFAULT 0,
+        clicks INTEGER DEFAULT 0,
+        PRIMARY KEY (link_id, day)
+    ) WITHOUT ROWID''')
+    try:
+        cursor.execute("ALTER TABLE affiliate_links ADD COLUMN impression_count INTEGER DEFAULT 0")
+        # Eski click_count aslında "öneri gösterildi" sayısıydı
+        cursor.execute("UPDATE affiliate_links SET impression_count = COALESCE(click_count, 0), click_count = 0")
+    except sqlite3.OperationalError:
+        pass
+
+
+class AffiliateCounter:
+    def __init__(self, db_file, interval=AFFILIATE_FLUSH_INTERVAL):
+        self.db_file = db_file
+        self.interval = interval
+        self.counts = Counter()    # (link_id, gün, tür) -> yazılmamış sayı
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.stopped = False
+
+    def _add(self, link_id, kind):
+        with self.lock:
+            self.counts[(link_id, date.today().isoformat(), kind)] += 1
+        self._ensure_thread()
+
+    def impression(self, link_id):
+        self._add(link_id, "impressions")
+
+    def click(self, link_id):
+        self._add(link_id, "clicks")
+
+    def pending(self):
+        """Henüz yazılmamış toplamlar: link_id -> {"impressions", "clicks"}"""
+        totals = {}
+        with self.lock:
+            for (link_id, _, kind), n in self.counts.items():
+                totals.setdefault(link_id, dict.fromkeys(KINDS, 0))[kind] += n
+        return totals
+
+    # --- Yazma ---
+
+    def flush(self):
+        """Bekleyen sayıları tek transaction'da yazar. Dönüş: yazılan olay sayısı."""
+        with self.flush_lock:
+            with self.lock:
+                counts, self.counts = self.counts, Counter()
+            if not counts:
+                return 0
+            try:
+                self._write(counts)
+            except Exception as e:
+                print(f"Affiliate sayaç yazma hatası, tekrar denenecek: {e}")
+                with self.lock:
+                    self.counts.update(counts)
+                return 0
+            return sum(counts.values())
+
+    def _write(self, counts):
+        daily, totals = {}, {}
+        for (link_id, day, kind), n in counts.items():
+            daily.setdefault((link_id, day), dict.fromkeys(KINDS, 0))[kind] += n
+            totals.setdefault(link_id, dict.fromkeys(KINDS, 0))[kind] += n
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Sayılırken silinen linkler atlanır (kilit altında okunur, araya silme giremez)
+            ids = list(totals)
+            existing = set()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                existing.update(r[0] for r in conn.execute(f"SELECT id FROM affiliate_links WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+            daily = {k: c for k, c in daily.items() if k[0] in existing}
+            totals = {k: c for k, c in totals.items() if k in existing}
+            conn.executemany('''INSERT INTO affiliate_daily (link_id, day, impressions, clicks) VALUES (?, ?, ?, ?)
+                ON CONFLICT(link_id, day) DO UPDATE SET impressions = impressions + excluded.impressions, clicks = clicks + excluded.clicks''',
+                             [(link_id, day, c["impressions"], c["clicks"]) for (link_id, day), c in daily.items()])
+            conn.executemany('''UPDATE affiliate_links SET impression_count = COALESCE(impression_count, 0) + ?,
+                click_count = COALESCE(click_count, 0) + ? WHERE id = ?''',
+                             [(c["impressions"], c["clicks"], link_id) for link_id, c in totals.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # --- Arka plan thread'i ---
+
+    def _ensure_thread(self):
+        if self.thread is not None or self.stopped:
+            return
+        with self.flush_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="affiliate-counter", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self.stopped:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+
+    def close(self):
+        """Thread'i durdurur ve kalanları yazar (uygulama kapanırken)."""
+        self.stopped = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.flush()
+
+
+def trends(conn, link_ids, days=None):
+    """Son `days` günün link başına günlük sayıları (eksik günler 0): link_id -> [{"day", "impressions", "clicks"}]"""
+    days = days or AFFILIATE_TREND_DAYS
+    today = date.today()
+    day_list = [(today - timedelta(days=i)).isoformat() for i in range(days - 1, -1, -1)]
+    series = {link_id: {d: dict(day=d, impressions=0, clicks=0) for d in day_list} for link_id in link_ids}
+    for i in range(0, len(link_ids), 500):
+        chunk = link_ids[i:i + 500]
+        rows = conn.execute(f"SELECT link_id, day, impressions, clicks FROM affiliate_daily WHERE link_id IN ({','.join('?' * len(chunk))}) AND day >= ?",
+                            (*chunk, day_list[0]))
+        for link_id, day, impressions, clicks in rows:
+            if day in series[link_id]:
+                series[link_id][day].update(impressions=impressions, clicks=clicks)
+    return {link_id: list(by_day.values()) for link_id, by_day in series.items()}
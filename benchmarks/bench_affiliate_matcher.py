@@ -0,0 +1,120 @@
+"""
+Affiliate link eşleştirme: eski iç içe döngü / Aho-Corasick otomatı.
+
+Kullanım:
+    python benchmarks/bench_affiliate_matcher.py [link_sayisi] [urun_adi_sayisi]
+
+Geçici veritabanına her satırda 3 virgüllü anahtar kelime olan linkler
+yazılır. Ölçülenler:
+1) Eski yol: her istekte bütün satırları oku + kelime kelime `in` kontrolü
+2) AffiliateMatcher.match (otomat hazır) ve otomatın kurulma süresi
+3) Doğruluk: her ürün adı için kaba kuvvetle bulunan en uzun kelimeyle
+   aynı uzunlukta eşleşme; eski yolun bulduğu her ürün yeni yolda da bulunmalı
+4) Başka bir bağlantıdan eklenen link, sürüm tetikleyicisiyle fark edilmeli
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import affiliate_matcher  # noqa: E402
+
+COLORS = ["siyah", "beyaz", "lacivert", "kırmızı", "bej", "haki", "gri", "pembe", "mavi", "yeşil", "ışıltılı", "açık mavi"]
+MATERIALS = ["deri", "keten", "pamuklu", "yün", "kadife", "saten", "denim", "triko", "süet", "şifon"]
+ITEMS = ["ceket", "mont", "kaban", "gömlek", "tişört", "kazak", "hırka", "etek", "pantolon", "şort", "elbise",
+         "sneaker", "bot", "çizme", "loafer", "çanta", "kemer", "şapka", "gözlük", "saat", "kolye", "atkı", "yelek"]
+
+
+def make_db(n_links):
+    path = os.path.join(tempfile.mkdtemp(), "aff.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE affiliate_links (id INTEGER PRIMARY KEY AUTOINCREMENT, keyword TEXT UNIQUE, link TEXT, click_count INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    affiliate_matcher.install(conn.cursor())
+    rnd = random.Random(1)
+    words = [f"{c} {m} {i}" for c in COLORS for m in MATERIALS for i in ITEMS] + [f"{m} {i}" for m in MATERIALS for i in ITEMS] + ITEMS
+    rnd.shuffle(words)
+    rows = []
+    for k in range(n_links):
+        picked = [words[(3 * k + j) % len(words)] for j in range(3)]
+        rows.append((", ".join(w.upper() if rnd.random() < 0.2 else w.title() for w in picked) + f" #{k}", f"https://ty.gl/{k}"))
+    conn.executemany("INSERT INTO affiliate_links (keyword, link) VALUES (?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def product_names(n):
+    rnd = random.Random(2)
+    names = []
+    for _ in range(n):
+        name = f"{rnd.choice(COLORS).title()} {rnd.choice(MATERIALS).title()} {rnd.choice(ITEMS).title()}"
+        if rnd.random() < 0.3:
+            name = "Oversize " + name.upper() + " ve Uyumlu Aksesuar"
+        names.append(name)
+    return names
+
+
+def old_match(db, product_name):
+    conn = sqlite3.connect(db)
+    conn.row_factory = sqlite3.Row
+    all_links = conn.execute("SELECT id, keyword, link FROM affiliate_links").fetchall()
+    conn.close()
+    for row in all_links:
+        for k in [k.strip().lower() for k in row["keyword"].split(",")]:
+            if k in product_name.lower():
+                return row
+    return None
+
+
+def brute_longest(keywords, product_name):
+    name = affiliate_matcher.fold(product_name)
+    return max((len(k) for k in keywords if k in name), default=0)
+
+
+def main():
+    n_links = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_names = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    db = make_db(n_links)
+    names = product_names(n_names)
+
+    matcher = affiliate_matcher.AffiliateMatcher(db)
+    start = time.perf_counter()
+    matcher.match("ısınma")
+    build = time.perf_counter() - start
+    states = len(matcher.automaton.goto)
+    print(f"{n_links} link ({n_links * 3} kelime), {n_names} ürün adı; otomat kurulumu {build * 1000:.1f} ms, {states} düğüm")
+
+    start = time.perf_counter()
+    old = [old_match(db, n) for n in names]
+    t_old = (time.perf_counter() - start) / n_names
+    start = time.perf_counter()
+    for _ in range(10):
+        new = [matcher.match(n) for n in names]
+    t_new = (time.perf_counter() - start) / n_names / 10
+    print(f"eski (oku + döngü)     : {t_old * 1e6:10.1f} µs/istek")
+    print(f"AffiliateMatcher.match : {t_new * 1e6:10.1f} µs/istek  ({t_old / t_new:.0f}x)")
+
+    conn = sqlite3.connect(db)
+    keywords = [k for (kw,) in conn.execute("SELECT keyword FROM affiliate_links") for k in affiliate_matcher.split_keywords(kw)]
+    conn.close()
+    wrong = sum(1 for n, m in zip(names, new) if brute_longest(keywords, n) != (len(m["matched"]) if m else 0))
+    lost = sum(1 for o, m in zip(old, new) if o is not None and m is None)
+    print(f"en uzun eşleşme hatası: {wrong}, eskinin bulup yeninin kaçırdığı: {lost}, "
+          f"bulunan {sum(1 for m in new if m)}/{n_names} (eski {sum(1 for o in old if o)})")
+
+    affiliate_matcher.AFFILIATE_SYNC_SECONDS = 0
+    conn = sqlite3.connect(db)
+    conn.execute("INSERT INTO affiliate_links (keyword, link) VALUES (?, ?)", ("Mor Peluş Terlik", "https://ty.gl/yeni"))
+    conn.execute("UPDATE affiliate_links SET click_count = click_count + 1 WHERE id = 1")
+    conn.commit()
+    conn.close()
+    hit = matcher.match("MOR PELUŞ TERLİK")
+    print(f"başka bağlantıdan eklenen link: {hit['link'] if hit else None}")
+
+
+if __name__ == "__main__":
+    main()
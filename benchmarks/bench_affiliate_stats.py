@@ -0,0 +1,141 @@
+"""
+Affiliate sayaçları: istek içinde UPDATE (eski) / bellekte toplama + toplu
+yazma (affiliate_stats.AffiliateCounter) ve eğilim sorgusu.
+
+Kullanım:
+    python benchmarks/bench_affiliate_stats.py [thread_sayisi] [olay_sayisi]
+
+1) N thread aynı anda olay kaydeder, bu sırada ayrı bir thread her 20 ms'de
+   başka bir tabloya küçük bir yazma yapar (diğer istekler). Olay başına
+   süre ve diğer yazmanın p99 gecikmesi ölçülür
+2) Sonunda affiliate_links toplamları ve affiliate_daily özetinin olay
+   sayısıyla tuttuğu kontrol edilir
+3) /affiliate/list eğilimi: 200 link x 90 gün özet tablosundan okuma /
+   aynı veriyi 1M satırlık ham olay tablosundan GROUP BY ile üretme
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import affiliate_stats  # noqa: E402
+
+LINKS = 200
+
+
+def make_db():
+    path = os.path.join(tempfile.mkdtemp(), "aff.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE affiliate_links (id INTEGER PRIMARY KEY AUTOINCREMENT, keyword TEXT UNIQUE, link TEXT, click_count INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("CREATE TABLE other_writes (id INTEGER PRIMARY KEY, v INTEGER)")
+    conn.executemany("INSERT INTO affiliate_links (keyword, link) VALUES (?, ?)", [(f"kelime {i}", f"https://ty.gl/{i}") for i in range(LINKS)])
+    affiliate_stats.install(conn.cursor())
+    conn.commit()
+    conn.close()
+    return path
+
+
+def old_record(db, link_id):
+    conn = sqlite3.connect(db, timeout=30)
+    conn.execute("UPDATE affiliate_links SET click_count = click_count + 1 WHERE id = ?", (link_id,))
+    conn.commit()
+    conn.close()
+
+
+def run(db, record, threads, events):
+    latencies, done = [], threading.Event()
+
+    def other():
+        while not done.is_set():
+            start = time.perf_counter()
+            conn = sqlite3.connect(db, timeout=30)
+            conn.execute("INSERT INTO other_writes (v) VALUES (1)")
+            conn.commit()
+            conn.close()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        for _ in range(events):
+            record(rnd.randint(1, LINKS))
+
+    bg = threading.Thread(target=other)
+    bg.start()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    bg.join()
+    latencies.sort()
+    return elapsed / (threads * events), latencies[int(len(latencies) * 0.99)] if latencies else 0
+
+
+def bench_trend(db):
+    today = date.today()
+    days = [(today - timedelta(days=i)).isoformat() for i in range(90)]
+    rnd = random.Random(3)
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE raw_events (link_id INTEGER, day TEXT, kind TEXT)")
+    conn.executemany("INSERT INTO raw_events VALUES (?, ?, ?)",
+                     ((rnd.randint(1, LINKS), rnd.choice(days), "clicks" if rnd.random() < 0.1 else "impressions") for _ in range(1_000_000)))
+    conn.execute("CREATE INDEX idx_raw_events ON raw_events (link_id, day)")
+    conn.execute("DELETE FROM affiliate_daily")
+    conn.execute("""INSERT INTO affiliate_daily (link_id, day, impressions, clicks)
+                    SELECT link_id, day, SUM(kind = 'impressions'), SUM(kind = 'clicks') FROM raw_events GROUP BY link_id, day""")
+    conn.commit()
+
+    ids = [r[0] for r in conn.execute("SELECT id FROM affiliate_links ORDER BY id DESC LIMIT 20")]
+    start = time.perf_counter()
+    for _ in range(20):
+        affiliate_stats.trends(conn, ids)
+    rollup = (time.perf_counter() - start) / 20
+    since = (today - timedelta(days=affiliate_stats.AFFILIATE_TREND_DAYS - 1)).isoformat()
+    start = time.perf_counter()
+    for _ in range(20):
+        conn.execute(f"SELECT link_id, day, SUM(kind = 'impressions'), SUM(kind = 'clicks') FROM raw_events "
+                     f"WHERE link_id IN ({','.join('?' * len(ids))}) AND day >= ? GROUP BY link_id, day", (*ids, since)).fetchall()
+    raw = (time.perf_counter() - start) / 20
+    conn.close()
+    print(f"eğilim (20 link, {affiliate_stats.AFFILIATE_TREND_DAYS} gün): özet {rollup * 1000:.2f} ms / ham olaylardan {raw * 1000:.2f} ms")
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    total = threads * events
+    print(f"{threads} thread x {events} olay")
+
+    db = make_db()
+    per_event, p99 = run(db, lambda link_id: old_record(db, link_id), threads, events)
+    print(f"eski (istek içinde UPDATE) : {per_event * 1e6:8.1f} µs/olay, diğer yazma p99 {p99 * 1000:6.1f} ms")
+
+    db = make_db()
+    counter = affiliate_stats.AffiliateCounter(db, interval=0.5)
+    per_event, p99 = run(db, counter.impression, threads, events)
+    counter.close()
+    print(f"AffiliateCounter           : {per_event * 1e6:8.1f} µs/olay, diğer yazma p99 {p99 * 1000:6.1f} ms")
+
+    conn = sqlite3.connect(db)
+    links = conn.execute("SELECT SUM(impression_count) FROM affiliate_links").fetchone()[0]
+    daily = conn.execute("SELECT SUM(impressions) FROM affiliate_daily").fetchone()[0]
+    conn.close()
+    print(f"toplam kontrol: olay {total}, affiliate_links {links}, affiliate_daily {daily}")
+
+    bench_trend(db)
+
+
+if __name__ == "__main__":
+    main()
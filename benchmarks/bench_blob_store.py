@@ -0,0 +1,103 @@
+"""
+S3 arka ucu kontrolü (moto ile sahte S3, ağ gerekmez).
+
+Kullanım:
+    pip install boto3 moto
+    python benchmarks/bench_blob_store.py [dosya_sayisi] [onbellek_mb]
+
+S3Backend gerçek boto3 istemcisiyle moto'nun S3 taklidine konuşur. Ölçülen /
+kontrol edilenler:
+1) Aynı içerik iki kez yazılınca bucket'ta tek nesne (put_bytes dedupe)
+2) multipart eşiğinin üstündeki dosya parçalı yüklenir ve aynen geri okunur
+3) exists() önbellekteki kopyaya değil bucket'a bakar: başka node nesneyi
+   silince False döner
+4) local_path: kaçırma (indir) / isabet süresi; önbellek sınırı aşılmaz ve
+   klasör her kaçırmada değil sadece sınır aşılınca taranır
+5) delete() nesneyi ve önbellek kopyasını siler
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    sys.exit("Bu kontrol için boto3 ve moto gerekli: pip install boto3 moto")
+
+import blob_store  # noqa: E402
+
+BUCKET = "giyim-test"
+MB = 1024 * 1024
+
+# moto sahte kimlik bilgisi ister; gerçek hesaba istek gitmez
+for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+    os.environ[name] = "test"
+os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+
+
+def count_objects(client):
+    return client.list_objects_v2(Bucket=BUCKET).get("KeyCount", 0)
+
+
+@mock_aws
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    cache_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    client = boto3.client("s3")
+    client.create_bucket(Bucket=BUCKET)
+    cache_dir = tempfile.mkdtemp()
+    backend = blob_store.S3Backend(BUCKET, prefix="uploads", cache_dir=cache_dir, cache_max_bytes=cache_mb * MB,
+                                   multipart_threshold=5 * MB, client=client)
+    blob_store.backend = backend
+
+    data = os.urandom(256 * 1024)
+    first = blob_store.put_bytes(data, "png")
+    second = blob_store.put_bytes(data, "png")
+    print(f"1) aynı içerik iki kez: anahtar aynı {first == second}, bucket'ta {count_objects(client)} nesne")
+
+    big = os.urandom(12 * MB)
+    key = blob_store.put_bytes(big, "png")
+    etag = client.head_object(Bucket=BUCKET, Key=backend._obj(key))["ETag"]
+    with open(blob_store.local_path(key), "rb") as f:
+        same = f.read() == big
+    print(f"2) 12 MB dosya: multipart {'-' in etag} (ETag {etag}), geri okunan aynı {same}")
+
+    client.delete_object(Bucket=BUCKET, Key=backend._obj(key))
+    print(f"3) başka node sildi, önbellekte kopya var {os.path.exists(os.path.join(cache_dir, key))}: exists() {backend.exists(key)}")
+
+    keys = [blob_store.put_bytes(os.urandom(MB), "png") for _ in range(n)]
+    for name in os.listdir(cache_dir):
+        os.remove(os.path.join(cache_dir, name))
+    backend.cache_bytes = 0
+    trims = 0
+    trim = backend._trim_cache
+
+    def counted_trim(keep=None):
+        nonlocal trims
+        trims += 1
+        trim(keep)
+    backend._trim_cache = counted_trim
+
+    start = time.perf_counter()
+    for k in keys:
+        blob_store.local_path(k)
+    miss = (time.perf_counter() - start) / n
+    on_disk = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+    start = time.perf_counter()
+    for _ in range(10):
+        blob_store.local_path(keys[-1])
+    hit = (time.perf_counter() - start) / 10
+    print(f"4) local_path: kaçırma {miss * 1000:.1f} ms, isabet {hit * 1e6:.0f} µs; {n} x 1 MB indirildi, "
+          f"önbellek {on_disk / MB:.1f} MB (sınır {cache_mb} MB, sayaç {backend.cache_bytes / MB:.1f} MB), klasör taraması {trims} kez (eskiden {n})")
+
+    blob_store.local_path(first)
+    backend.delete(first)
+    print(f"5) delete: bucket'ta {'var' if backend.exists(first) else 'yok'}, önbellekte {'var' if os.path.exists(os.path.join(cache_dir, first)) else 'yok'}")
+
+
+if __name__ == "__main__":
+    main()
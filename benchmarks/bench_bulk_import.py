@@ -0,0 +1,201 @@
+"""
+Linkten içe aktarma verimi: eski senkron indirme / bulk_import.Importer.
+
+Kullanım:
+    python benchmarks/bench_bulk_import.py [link_sayisi] [gecikme_ms]
+
+Aynı süreçte sahte bir mağaza sunucusu açılır (127.0.0.1-4 = 4 farklı
+site). Her ürün sayfası ve resmi `gecikme_ms` sonra döner. Ölçülenler:
+1) Eski yol: requests.get (sayfa) + tam BeautifulSoup + requests.get
+   (resim), link link sırayla
+2) Importer: bağlantı havuzu + eşzamanlı indirme; sadece indirme ve resim
+   prepare_upload'dan geçerek (iki işleme thread'i) ayrı ölçülür. Sunucu
+   site başına aynı anda açık istek sayısını da kaydeder (IMPORT_PER_HOST'u
+   aşmamalı). Sahte mağaza yerel olduğu için allow_private=True
+4) Adres kontrolü: varsayılan Importer yerel adresi reddetmeli
+3) Boyut sınırı: Content-Length göndermeden 50 MB akıtan resimde indirme
+   IMPORT_IMAGE_MAX_BYTES civarında kesilmeli
+"""
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from bs4 import BeautifulSoup
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import bulk_import  # noqa: E402
+from image_prep import prepare_upload  # noqa: E402
+
+HOSTS = ["127.0.0.1", "127.0.0.2", "127.0.0.3", "127.0.0.4"]
+
+
+def sample_jpeg():
+    img = Image.new("RGB", (1200, 1500), (235, 235, 235))
+    d = ImageDraw.Draw(img)
+    d.rectangle((250, 200, 950, 1300), fill=(30, 60, 120))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+class Shop:
+    def __init__(self, latency):
+        self.latency = latency
+        self.image = sample_jpeg()
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.big_sent = 0
+
+    def enter(self, host):
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+
+    def leave(self, host):
+        with self.lock:
+            self.active[host] -= 1
+
+
+def make_handler(shop):
+    filler = "<div class='urun'><p>Açıklama</p></div>" * 400
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            host = self.headers.get("Host", "").split(":")[0]
+            shop.enter(host)
+            try:
+                time.sleep(shop.latency)
+                if self.path.startswith("/p/"):
+                    image = "/big.jpg" if self.path == "/p/big" else f"/img/{self.path[3:]}.jpg"
+                    body = (f"<html><head><title>Ürün</title><meta property='og:title' content='Basic Tişört {self.path[3:]}'>"
+                            f"<meta property='og:image' content='{image}'></head><body>{filler}</body></html>").encode()
+                    self._send(body, "text/html; charset=utf-8")
+                elif self.path == "/big.jpg":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "image/jpeg")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    chunk = b"\xff" * 65536
+                    try:
+                        for _ in range(800):
+                            self.wfile.write(chunk)
+                            shop.big_sent += len(chunk)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+                    self.close_connection = True
+                else:
+                    self._send(shop.image, "image/jpeg")
+            finally:
+                shop.leave(host)
+
+        def _send(self, body, content_type):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def product_urls(port, n):
+    return [f"http://{HOSTS[i % len(HOSTS)]}:{port}/p/{i}" for i in range(n)]
+
+
+def old_import(urls):
+    headers = bulk_import.HEADERS
+    for url in urls:
+        response = requests.get(url, headers=headers, timeout=10)
+        soup = BeautifulSoup(response.content, "html.parser")
+        image_url = requests.compat.urljoin(url, soup.find("meta", property="og:image")["content"])
+        prepare_upload(requests.get(image_url).content)
+
+
+def process(username, page_url, meta, image, category):
+    prepare_upload(image)
+    return {"status": "success", "title": meta["title"]}
+
+
+def fetch_only(username, page_url, meta, image, category):
+    return {"status": "success", "title": meta["title"]}
+
+
+async def new_import(urls, per_host, process_fn=process):
+    importer = bulk_import.Importer(process_fn, per_host=per_host, allow_private=True)
+    try:
+        results = await asyncio.gather(*(importer.import_one("bench", u) for u in urls))
+    finally:
+        await importer.close()
+    return sum(1 for r in results if "error" not in r)
+
+
+async def capped(url):
+    importer = bulk_import.Importer(process, allow_private=True)
+    try:
+        return await importer.import_one("bench", url)
+    finally:
+        await importer.close()
+
+
+async def guard_check(url):
+    importer = bulk_import.Importer(process, allow_private=False)
+    try:
+        result = await importer.import_one("bench", url)
+    finally:
+        await importer.close()
+    assert not importer.host_slots  # Boşalan host semaforu tutulmaz
+    return result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 80) / 1000
+    shop = Shop(latency)
+    server = ThreadingHTTPServer(("0.0.0.0", 0), make_handler(shop))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    urls = product_urls(port, n)
+    print(f"{n} link, {len(HOSTS)} site, gecikme {latency * 1000:.0f} ms, "
+          f"IMPORT_CONCURRENCY {bulk_import.IMPORT_CONCURRENCY}")
+
+    start = time.perf_counter()
+    old_import(urls)
+    old = time.perf_counter() - start
+    print(f"eski (sıralı, indirme + hazırlama)        : {old:6.2f} sn  {n / old:6.1f} link/sn")
+
+    for label, per_host, process_fn in (("sadece indirme", bulk_import.IMPORT_PER_HOST, fetch_only),
+                                        ("indirme + hazırlama", bulk_import.IMPORT_PER_HOST, process),
+                                        ("indirme + hazırlama", bulk_import.IMPORT_CONCURRENCY, process)):
+        shop.peak.clear()
+        start = time.perf_counter()
+        ok = asyncio.run(new_import(urls, per_host, process_fn))
+        new = time.perf_counter() - start
+        print(f"Importer, {label:19s} (site başı {per_host}): {new:6.2f} sn  {n / new:6.1f} link/sn  "
+              f"başarılı {ok}/{n}  site başına en fazla eşzamanlı {max(shop.peak.values())}")
+
+    result = asyncio.run(capped(f"http://127.0.0.1:{port}/p/big"))
+    time.sleep(0.2)
+    print(f"50 MB resim: {result}  sunucunun gönderebildiği {shop.big_sent / 1e6:.1f} MB "
+          f"(sınır {bulk_import.IMPORT_IMAGE_MAX_BYTES / 1e6:.1f} MB + soket tamponları)")
+    guarded = asyncio.run(guard_check(f"http://127.0.0.1:{port}/p/1"))
+    print(f"allow_private olmadan yerel adres: {guarded}")
+    assert guarded == {"error": "Bu adrese izin verilmiyor."}
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Soğuk ve sıcak uygulama açılışında kablodan geçen byte'lar.
+
+Kullanım:
+    python benchmarks/bench_http_cache.py
+
+Soğuk: tarayıcıda hiçbir şey yok (index.html + 20 kıyafet resmi indirilir).
+Sıcak: aynı sayfa tekrar açılır; tarayıcı ETag'lerle koşullu istek atar.
+Eski davranış (sıkıştırmasız, ETag'siz) ile karşılaştırılır.
+"""
+import io
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import blob_store  # noqa: E402
+import main  # noqa: E402
+
+ACCEPT = {"Accept-Encoding": "br, gzip"}
+
+
+def wire_bytes(resp):
+    head = sum(len(k) + len(v) + 4 for k, v in resp.headers.items())
+    return head + resp.num_bytes_downloaded
+
+
+def load_app(client, urls, etags):
+    total = 0
+    for url in ["/"] + urls:
+        headers = dict(ACCEPT)
+        if url in etags:
+            headers["If-None-Match"] = etags[url]
+        r = client.get(url, headers=headers)
+        if "etag" in r.headers:
+            etags[url] = r.headers["etag"]
+        total += wire_bytes(r)
+    return total
+
+
+def main_bench():
+    blob_store.configure(tempfile.mkdtemp(), "/static/uploads/", backend_name="local")
+    urls = []
+    for i in range(20):
+        img = Image.new("RGB", (600, 800), (i * 10, 80, 160))
+        urls.append(blob_store.url_for(blob_store.put_image(img, "PNG")))
+
+    client = TestClient(main.app)
+    etags = {}
+    cold = load_app(client, urls, etags)
+    warm = load_app(client, urls, etags)
+
+    raw_index = os.path.getsize(os.path.join(ROOT, "static", "index.html"))
+    raw_imgs = sum(len(client.get(u).content) for u in urls)
+    print(f"eski (her açılış)  : {(raw_index + raw_imgs) / 1024:8.1f} KB")
+    print(f"soğuk açılış       : {cold / 1024:8.1f} KB")
+    print(f"sıcak açılış (304) : {warm / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main_bench()
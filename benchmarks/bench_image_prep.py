@@ -0,0 +1,93 @@
+"""
+Yükleme ön işleme testi: gönderilen ve saklanan byte'lar + süre.
+
+Kullanım:
+    python benchmarks/bench_image_prep.py [fotograf_klasoru]
+
+Klasör verilmezse 12 MP'lik örnek telefon fotoğrafları üretilir.
+Her resim için ham boyut, HF'ye gidecek hazırlanmış boyut, tam çözünürlük
+PNG ile hazırlanmış PNG boyutu ve ön işleme süresi yazılır.
+Sonda paletli (P), siyah-beyaz (1), 16 bit gri (I;16) ve GIF girişlerinin
+hata vermeden RGB/RGBA'ya hazırlandığı, bozuk dosyanın InvalidImageError
+verdiği kontrol edilir.
+"""
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PIL import Image, ImageFilter  # noqa: E402
+
+from image_prep import InvalidImageError, prepare_upload  # noqa: E402
+
+
+def sample_corpus(count=5):
+    random.seed(1)
+    for i in range(count):
+        img = Image.effect_noise((4000, 3000), 40).convert("RGB").filter(ImageFilter.GaussianBlur(2))
+        exif = img.getexif()
+        exif[0x0112] = random.choice([1, 6, 8])  # telefon yönü
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=92, exif=exif)
+        yield f"ornek_{i}.jpg", buf.getvalue()
+
+
+def folder_corpus(folder):
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png", ".heic", ".webp")):
+            with open(os.path.join(folder, name), "rb") as f:
+                yield name, f.read()
+
+
+def mode_corpus():
+    """reduce'un kabul etmediği modlarda büyük resimler (+ bozuk dosya)."""
+    base = Image.effect_noise((3000, 2500), 60)
+    palette = base.convert("RGB").quantize(64)
+    transparent = palette.copy()
+    transparent.info["transparency"] = 0
+    cases = [("paletli PNG", palette, "PNG"), ("saydam paletli PNG", transparent, "PNG"),
+             ("GIF", palette, "GIF"), ("siyah-beyaz PNG", base.convert("1"), "PNG"),
+             ("16 bit gri PNG", base.convert("I;16"), "PNG")]
+    for name, img, fmt in cases:
+        buf = io.BytesIO()
+        img.save(buf, format=fmt)
+        yield name, buf.getvalue()
+    yield "bozuk PNG", buf.getvalue()[:len(buf.getvalue()) // 2]
+
+
+def png_size(img):
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.tell()
+
+
+def main():
+    corpus = folder_corpus(sys.argv[1]) if len(sys.argv) > 1 else sample_corpus()
+    totals = [0, 0, 0, 0]
+    for name, raw in corpus:
+        t0 = time.perf_counter()
+        img, prepared = prepare_upload(raw)
+        ms = (time.perf_counter() - t0) * 1000
+        full_png = png_size(Image.open(io.BytesIO(raw)))
+        small_png = png_size(img)
+        totals = [a + b for a, b in zip(totals, (len(raw), len(prepared), full_png, small_png))]
+        print(f"{name:24s} gonderilen {len(raw) / 1e6:6.2f} MB -> {len(prepared) / 1e6:5.2f} MB | "
+              f"saklanan {full_png / 1e6:6.2f} MB -> {small_png / 1e6:5.2f} MB | {ms:6.1f} ms  {img.size}")
+
+    if totals[1]:
+        print(f"TOPLAM gonderilen x{totals[0] / totals[1]:.1f} kuculdu, saklanan x{totals[2] / totals[3]:.1f} kuculdu")
+
+    print("-- mod kontrolü")
+    for name, raw in mode_corpus():
+        try:
+            img, _ = prepare_upload(raw)
+            print(f"{name:24s} {img.mode} {img.size}")
+        except InvalidImageError as e:
+            print(f"{name:24s} InvalidImageError: {e}")
+
+
+if __name__ == "__main__":
+    main()
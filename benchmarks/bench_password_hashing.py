@@ -0,0 +1,107 @@
+"""
+100 girişlik ani yük altında API gecikmesi: bcrypt event loop'ta (eski) /
+ayrı thread havuzunda (password_hashing) / havuz + deneme sınırı (throttle).
+
+Kullanım:
+    python benchmarks/bench_password_hashing.py [giris_sayisi] [bcrypt_cost]
+
+Aynı süreçte küçük bir FastAPI uygulaması kurulur. Girişler aynı anda
+gönderilirken ayrı bir istemci her 20 ms'de hafif bir endpoint'e (/ping)
+istek atar; /ping gecikmesinin (planlanan gönderim anından cevaba kadar)
+p50 / p99 / maks değerleri ölçülür.
+Deneme sınırlı senaryoda bütün girişler tek IP'den gelir (credential
+stuffing) ve sınırı aşanlar hash hesaplanmadan 429 alır.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import bcrypt
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import password_hashing  # noqa: E402
+import throttle  # noqa: E402
+
+
+def make_app(hashed):
+    app = FastAPI()
+    ip_limit = throttle.TokenBucket(capacity=20, rate=1 / 3)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/login/eski")
+    async def login_old():
+        return {"ok": bcrypt.checkpw(b"sifre123", hashed.encode())}
+
+    @app.post("/login/havuz")
+    async def login_pool():
+        try:
+            ok, _ = await password_hashing.verify_password("sifre123", hashed)
+        except password_hashing.HashBusyError:
+            raise HTTPException(status_code=503)
+        return {"ok": ok}
+
+    @app.post("/login/sinirli")
+    async def login_throttled(request: Request):
+        allowed, _ = ip_limit.take(throttle.client_ip(request))
+        if not allowed:
+            raise HTTPException(status_code=429)
+        return await login_pool()
+
+    return app
+
+
+async def scenario(app, route, logins):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+        done = asyncio.Event()
+
+        async def pinger():
+            # Gecikme = isteğin gönderilmesi gereken andan cevaba kadar
+            # (event loop bloklanırsa uyanma gecikmesi de dahil)
+            due = time.perf_counter()
+            while True:
+                await client.get("/ping")
+                latencies.append(time.perf_counter() - due)
+                if done.is_set():
+                    break
+                due = time.perf_counter() + 0.02
+                await asyncio.sleep(0.02)
+
+        ping_task = asyncio.create_task(pinger())
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.post(route) for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ping_task
+
+    codes = {}
+    for r in responses:
+        codes[r.status_code] = codes.get(r.status_code, 0) + 1
+    latencies.sort()
+    print(f"{route:15s} toplam {elapsed:6.2f} sn  durum {codes}  "
+          f"/ping p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.1f} ms  maks {latencies[-1] * 1000:7.1f} ms")
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cost = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    hashed = bcrypt.hashpw(b"sifre123", bcrypt.gensalt(cost)).decode()
+    password_hashing.BCRYPT_ROUNDS = cost
+    print(f"{logins} eşzamanlı giriş, bcrypt cost {cost}, {password_hashing.PASSWORD_HASH_WORKERS} hash thread'i")
+    for route in ("/login/eski", "/login/havuz", "/login/sinirli"):
+        asyncio.run(scenario(make_app(hashed), route, logins))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Ürün sayfası bilgisi: eski tam indirme + tam parse / head'de durma /
+önbellek (koşullu GET ve taze kayıt).
+
+Kullanım:
+    python benchmarks/bench_product_meta.py [tekrar] [gecikme_ms]
+
+Aynı süreçte sahte bir mağaza sunucusu açılır. Ürün sayfası ~1 MB
+(gövdede büyük gömülü JSON, Trendyol benzeri), ETag döner ve
+If-None-Match eşleşirse 304 verir. Gövde 64 KB'lık parçalarla ~10 MB/sn
+hızında yazılır (gerçek ağ gibi). Ölçülenler:
+1) Sadece parse: tam BeautifulSoup / SoupStrainer / product_meta.parse_head
+2) Kaçırma yolu: eski (requests.get + tam parse), önbelleksiz Importer
+   (</head>'de durur), önbellek boşken Importer
+3) Yeniden doğrulama: kayıt eski -> koşullu GET -> 304
+4) İsabet: taze kayıt bellekte / sadece SQLite'ta (utm_* eklenmiş linkle)
+5) Head'de og:image olmayan sayfa: tam sayfa taranıp gövdedeki ilk <img>
+   bulunmalı
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import bulk_import  # noqa: E402
+import product_meta  # noqa: E402
+
+
+def product_page(i):
+    head = ("<!DOCTYPE html><html lang='tr'><head><meta charset='utf-8'><title>Basic Tişört - Trendyol</title>"
+            + "".join(f"<link rel='preload' href='/static/chunk{j}.js' as='script'>" for j in range(40))
+            + f"<meta property='og:title' content='Basic Oversize Tişört {i}'>"
+            + f"<meta property='og:image' content='https://cdn.shop.test/img/{i}.jpg'>"
+            + "<style>" + ".c{color:red}" * 2000 + "</style></head>")
+    state = json.dumps({"product": {"id": i, "variants": [{"sku": f"{i}-{k}", "stock": k, "desc": "Pamuklu kumaş " * 20} for k in range(2500)]}})
+    body = ("<body><div id='app'>" + "<div class='card'><img src='/x.jpg'><span>Ürün</span></div>" * 3000
+            + f"<script>window.__STATE__={state}</script></div></body></html>")
+    return (head + body).encode()
+
+
+# Head'de ürün bilgisi yok, resim sadece gövdede
+NO_HEAD_PAGE = ("<html><head><title>Keten Gömlek</title></head><body>" + "<p>Açıklama</p>" * 20000
+                + "<img src='/img/keten.jpg'></body></html>").encode()
+
+
+class Shop:
+    def __init__(self, latency, page):
+        self.latency = latency
+        self.page = page
+        self.etag = '"v1"'
+        self.sent = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(shop):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(shop.latency)
+            if self.path == "/nohead":
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(NO_HEAD_PAGE)))
+                self.end_headers()
+                self.wfile.write(NO_HEAD_PAGE)
+                return
+            if self.headers.get("If-None-Match") == shop.etag:
+                self.send_response(304)
+                self.send_header("ETag", shop.etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(shop.page)))
+            self.send_header("ETag", shop.etag)
+            self.end_headers()
+            try:
+                for start in range(0, len(shop.page), 65536):
+                    self.wfile.write(shop.page[start:start + 65536])
+                    with shop.lock:
+                        shop.sent += min(65536, len(shop.page) - start)
+                    time.sleep(0.0065)  # ~10 MB/sn
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+    return Handler
+
+
+def timed(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def old_scrape(url):
+    response = requests.get(url, headers=bulk_import.HEADERS, timeout=10)
+    soup = BeautifulSoup(response.content, "html.parser")
+    return soup.find("meta", property="og:image")["content"]
+
+
+async def importer_meta(importer, urls):
+    try:
+        for url in urls:
+            await importer.page_meta(url)
+    finally:
+        await importer.close()
+
+
+async def importer_first(importer, url):
+    try:
+        return await importer.page_meta(url)
+    finally:
+        await importer.close()
+
+
+def run_importer(shop, importer, urls):
+    time.sleep(0.2)  # Kesilen önceki yanıtların sunucu thread'leri bitsin
+    shop.sent = 0
+    start = time.perf_counter()
+    asyncio.run(importer_meta(importer, urls))
+    return (time.perf_counter() - start) / len(urls), shop.sent / len(urls)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    page = product_page(1)
+    shop = Shop(latency, page)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(shop))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"sayfa {len(page) / 1e6:.2f} MB (head {product_meta.head_end(page) / 1e3:.0f} KB), gecikme {latency * 1000:.0f} ms")
+
+    strainer = SoupStrainer(["meta", "title", "img"])
+    print("-- sadece parse")
+    print(f"tam BeautifulSoup      : {timed(lambda: BeautifulSoup(page, 'html.parser'), n) * 1000:8.2f} ms")
+    print(f"SoupStrainer           : {timed(lambda: BeautifulSoup(page, 'html.parser', parse_only=strainer), n) * 1000:8.2f} ms")
+    print(f"parse_head             : {timed(lambda: product_meta.parse_head(page, base), n * 10) * 1000:8.2f} ms")
+
+    print("-- kaçırma yolu (istek başına)")
+    shop.sent = 0
+    old = timed(lambda: old_scrape(f"{base}/p/1"), n)
+    print(f"eski (tam indir+parse) : {old * 1000:8.1f} ms  {shop.sent / n / 1e6:.2f} MB")
+    urls = [f"{base}/p/{i}" for i in range(n)]
+    t, sent = run_importer(shop, bulk_import.Importer(None, allow_private=True), urls)
+    print(f"Importer, önbelleksiz  : {t * 1000:8.1f} ms  {sent / 1e6:.2f} MB (</head>'de kesildi)")
+
+    db = os.path.join(tempfile.mkdtemp(), "meta.db")
+    conn = sqlite3.connect(db)
+    product_meta.install(conn.cursor())
+    conn.commit()
+    conn.close()
+    cache = product_meta.MetaCache(db)
+    t, sent = run_importer(shop, bulk_import.Importer(None, allow_private=True, meta_cache=cache), urls)
+    print(f"Importer, önbellek boş : {t * 1000:8.1f} ms  {sent / 1e6:.2f} MB")
+
+    print("-- yeniden doğrulama (kayıt eski)")
+    stale = product_meta.MetaCache(db, fresh_seconds=0)
+    t, sent = run_importer(shop, bulk_import.Importer(None, allow_private=True, meta_cache=stale), urls)
+    print(f"koşullu GET -> 304     : {t * 1000:8.1f} ms  {sent / 1e6:.2f} MB")
+
+    print("-- isabet (taze kayıt, utm_source eklenmiş link)")
+    hit_urls = [f"{base}/p/{i % n}?utm_source=insta&boutiqueId=61" for i in range(n * 100)]
+    t, _ = run_importer(shop, bulk_import.Importer(None, allow_private=True, meta_cache=cache), hit_urls)
+    print(f"bellek LRU             : {t * 1e6:8.1f} µs")
+    t, _ = run_importer(shop, bulk_import.Importer(None, allow_private=True, meta_cache=product_meta.MetaCache(db, size=1)), hit_urls)
+    print(f"SQLite (LRU'da yok)    : {t * 1e6:8.1f} µs")
+
+    print("-- head'de bilgi olmayan sayfa (tam tarama)")
+    importer = bulk_import.Importer(None, allow_private=True)
+    start = time.perf_counter()
+    meta = asyncio.run(importer_first(importer, f"{base}/nohead"))
+    print(f"{meta['image_url']} / {meta['title']}  {(time.perf_counter() - start) * 1000:.1f} ms")
+    assert meta["image_url"] == f"{base}/img/keten.jpg", meta
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
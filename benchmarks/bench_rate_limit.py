@@ -0,0 +1,112 @@
+"""
+Hız sınırlayıcı ölçümü: istek başına ek maliyet ve worker'lar arası doğruluk.
+
+Kullanım:
+    python benchmarks/bench_rate_limit.py [istek_sayisi]
+
+1) take() süresi: MemoryBackend / SQLiteBackend (1000 farklı anahtar)
+2) Uçtan uca: küçük bir FastAPI uygulamasına middleware'siz, kuralsız
+   route, bellek ve SQLite backend'li middleware ile sıralı istek
+3) Ortak durum: 4 süreç aynı SQLite kovasından aynı anda jeton ister;
+   izin verilen toplam, kapasite + geçen sürede dolan jeton kadar olmalı
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import throttle  # noqa: E402
+
+RULES = {"/vote": (1_000_000, 1_000_000)}
+
+
+def bench_take(backend, n):
+    start = time.perf_counter()
+    for i in range(n):
+        backend.take(f"/vote|ip:10.0.{i % 1000 // 256}.{i % 256}", 100, 1.0)
+    return (time.perf_counter() - start) / n
+
+
+def make_app(limiter):
+    app = FastAPI()
+
+    if limiter is not None:
+        @app.middleware("http")
+        async def rate_limit(request, call_next):
+            if limiter.rule_for(request.url.path):
+                identity = f"ip:{throttle.client_ip(request)}"
+                if limiter.backend.blocking:
+                    allowed, retry = await asyncio.to_thread(limiter.take, request.url.path, identity)
+                else:
+                    allowed, retry = limiter.take(request.url.path, identity)
+                if not allowed:
+                    return JSONResponse(status_code=429, content={}, headers={"Retry-After": str(int(retry) + 1)})
+            return await call_next(request)
+
+    @app.post("/vote")
+    async def vote():
+        return {"ok": True}
+
+    return app
+
+
+async def bench_http(app, n):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(50):
+            await client.post("/vote")
+        start = time.perf_counter()
+        for _ in range(n):
+            await client.post("/vote")
+        return (time.perf_counter() - start) / n
+
+
+def _worker(path, attempts, queue):
+    backend = throttle.SQLiteBackend(path)
+    allowed = sum(1 for _ in range(attempts) if backend.take("paylasilan", 50, 10.0)[0])
+    queue.put(allowed)
+
+
+def bench_shared(path, processes=4, attempts=300):
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_worker, args=(path, attempts, queue)) for _ in range(processes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    total = sum(queue.get() for _ in procs)
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+    print(f"{processes} süreç x {attempts} deneme ({elapsed:.2f} sn): izin {total}, "
+          f"beklenen üst sınır ~{50 + int(elapsed * 10)} (kapasite 50 + 10/sn)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tmp = tempfile.mkdtemp()
+    memory = throttle.MemoryBackend()
+    sqlite_backend = throttle.SQLiteBackend(os.path.join(tmp, "rl.db"))
+    print(f"take() bellek : {bench_take(memory, n * 10) * 1e6:8.2f} µs")
+    print(f"take() sqlite : {bench_take(sqlite_backend, n) * 1e6:8.2f} µs")
+
+    base = asyncio.run(bench_http(make_app(None), n))
+    noop = asyncio.run(bench_http(make_app(throttle.RateLimiter({}, memory)), n))
+    mem = asyncio.run(bench_http(make_app(throttle.RateLimiter(RULES, memory)), n))
+    sql = asyncio.run(bench_http(make_app(throttle.RateLimiter(RULES, sqlite_backend)), n))
+    print(f"istek (middleware yok)   : {base * 1e6:8.1f} µs")
+    print(f"istek (kuralsız route)   : {noop * 1e6:8.1f} µs  (+{(noop - base) * 1e6:.1f}, sadece middleware katmanı)")
+    print(f"istek (bellek backend)   : {mem * 1e6:8.1f} µs  (+{(mem - base) * 1e6:.1f})")
+    print(f"istek (sqlite backend)   : {sql * 1e6:8.1f} µs  (+{(sql - base) * 1e6:.1f})")
+
+    bench_shared(os.path.join(tmp, "shared.db"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+rembg worker havuzu verim testi (CPU).
+
+Kullanım:
+    python benchmarks/bench_rembg_workers.py [resim_sayisi] [model]
+
+Her worker sayısı (1, 2, 4, 8) için havuzu açar, modeli önceden yükler ve
+aynı anda gönderilen N resmin saniyede kaç tanesinin işlendiğini yazar.
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "static"))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+import rembg_backend  # noqa: E402
+
+
+def sample_image(i, size=(1024, 1024)):
+    img = Image.new("RGB", size, (235, 235, 235))
+    d = ImageDraw.Draw(img)
+    d.rectangle((200 + i % 50, 150, 800, 900), fill=(30 + i % 200, 60, 120))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+async def run(images):
+    await asyncio.gather(*(rembg_backend.remove_background(b) for b in images))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    model = sys.argv[2] if len(sys.argv) > 2 else rembg_backend.REMBG_MODEL
+    images = [sample_image(i) for i in range(count)]
+    cores = os.cpu_count() or 1
+
+    print(f"model={model} resim={count} cpu={cores}")
+    for workers in (1, 2, 4, 8):
+        threads = max(1, cores // workers)
+        rembg_backend.start(workers=workers, threads=threads, model_name=model)
+        t0 = time.perf_counter()
+        asyncio.run(run(images))
+        elapsed = time.perf_counter() - t0
+        rembg_backend.shutdown()
+        print(f"workers={workers} threads={threads}  {count / elapsed:.2f} resim/sn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Bavul planlayıcı testi: 1000 parçalık dolapta 14 günlük plan süresi.
+
+Kullanım:
+    python benchmarks/bench_travel_planner.py [parca_sayisi] [gun]
+
+Rastgele renk/kategori dağılımıyla sentetik dolap üretilir, planlayıcı
+birkaç kez çalıştırılır; medyan süre, bavuldaki parça sayısı ve eski
+random.choice yöntemindeki farklı parça sayısı yazılır. Hedef < 100 ms.
+
+Ardından küçük dolap kontrolü: 1 elbise, 3 üst, 2 alt ile 7 ve 10 gün.
+10 günde dolap tekrarsız plana yetmez; yine de tek elbise her gün
+giyilmemeli, sınırı sadece eksik kalan kategori birer gün aşmalı.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("GROQ_API_KEY", "x")
+os.environ.setdefault("HF_TOKEN", "x")
+
+from main import calculate_compatibility_score  # noqa: E402
+from travel_planner import MAX_REWEAR, plan_trip  # noqa: E402
+
+COLORS = ["Siyah", "Beyaz", "Gri", "Lacivert", "Mavi", "Bej", "Kahverengi", "Kırmızı", "Yeşil",
+          "Haki", "Sarı", "Pembe", "Turuncu", "Mor", "Antrasit", "Turkuaz", None]
+CATEGORIES = ["ust_giyim"] * 45 + ["alt_giyim"] * 25 + ["elbise"] * 10 + ["ayakkabi"] * 12 + ["aksesuar"] * 8
+
+
+def wardrobe(count):
+    random.seed(7)
+    return [{
+        "id": i + 1,
+        "url": f"/static/uploads/{i + 1}.png",
+        "category": random.choice(CATEGORIES),
+        "color_name": random.choice(COLORS),
+        "wear_count": random.randint(0, 30),
+        "is_clean": 1 if random.random() < 0.8 else 0,
+    } for i in range(count)]
+
+
+def old_random_plan(items, days):
+    tops = [x for x in items if x["category"] == "ust_giyim"]
+    bottoms = [x for x in items if x["category"] == "alt_giyim"]
+    dresses = [x for x in items if x["category"] == "elbise"]
+    shoes = [x for x in items if x["category"] == "ayakkabi"]
+    packed = set()
+    for _ in range(days):
+        if shoes:
+            packed.add(random.choice(shoes)["id"])
+        if dresses and (random.random() < 0.3 or not (tops and bottoms)):
+            packed.add(random.choice(dresses)["id"])
+        elif tops and bottoms:
+            packed.update((random.choice(tops)["id"], random.choice(bottoms)["id"]))
+    return len(packed)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 14
+    items = wardrobe(count)
+
+    times = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        plan, packing = plan_trip(items, days, calculate_compatibility_score)
+        times.append((time.perf_counter() - t0) * 1000)
+
+    med = statistics.median(times)
+    if plan is None:
+        print(f"{count} parca, {days} gun: cozum yok ({med:.1f} ms)")
+        return
+    print(f"{count} parca, {days} gun: medyan {med:.1f} ms, en kotu {max(times):.1f} ms")
+    print(f"bavul: {len(packing)} parca (eski yontem ~{old_random_plan(items, days)} parca)")
+    for day in plan:
+        print(f"  gun {day['day']:2d} {day['type']:6s} ust={day['ust_id']} alt={day['alt_id']} "
+              f"ayakkabi={day['shoe_id']} puan={day['score']}")
+    print("OK" if med < 100 else "YAVAS")
+    small_wardrobe()
+
+
+def small_wardrobe():
+    items = [{"id": 1, "url": "/d.png", "category": "elbise", "color_name": "Kırmızı", "wear_count": 0, "is_clean": 1}]
+    items += [{"id": 10 + i, "url": f"/t{i}.png", "category": "ust_giyim", "color_name": c, "wear_count": 0, "is_clean": 1}
+              for i, c in enumerate(["Kırmızı", "Pembe", "Turuncu"])]
+    items += [{"id": 20 + i, "url": f"/b{i}.png", "category": "alt_giyim", "color_name": c, "wear_count": 0, "is_clean": 1}
+              for i, c in enumerate(["Mor", "Yeşil"])]
+    for days in (7, 10):
+        plan, packing = plan_trip(items, days, calculate_compatibility_score)
+        worn = {e["id"]: e["days"] for e in packing if e["category"] != "ayakkabi"}
+        over = {i: n for i, n in worn.items() if n > MAX_REWEAR[next(e["category"] for e in packing if e["id"] == i)]}
+        print(f"-- küçük dolap, {days} gün: {[d['type'] for d in plan].count('dress')} elbise günü, "
+              f"parça/gün {worn}, sınır aşan {over or 'yok'}")
+
+
+if __name__ == "__main__":
+    main()
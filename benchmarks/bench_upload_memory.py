@@ -0,0 +1,108 @@
+"""
+Yükleme bellek profili: eski `await file.read()` yolu ile diske akıtma yolu.
+
+Kullanım:
+    python benchmarks/bench_upload_memory.py [eşzamanlı] [MB]
+
+Varsayılan: 50 eşzamanlı, 10 MB'lık yükleme. Her yol ayrı bir alt süreçte
+çalışır ve sürecin tepe RSS'i (resource.getrusage ru_maxrss) yazılır;
+PIL'in C tarafındaki tamponları da dahildir. "boş" satırı aynı
+hazırlığı yapıp hiç resim işlemeyen sürecin RSS'idir (karşılaştırma tabanı).
+"""
+import asyncio
+import io
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PIL import Image  # noqa: E402
+from starlette.datastructures import UploadFile  # noqa: E402
+
+from image_prep import open_prepared  # noqa: E402
+from upload_ingest import spool_upload  # noqa: E402
+
+
+def sample_jpeg(mb):
+    # Gürültü JPEG'i iyi sıkışmaz; sonuna dolgu ekleyerek istenen boyuta getir
+    img = Image.effect_noise((4000, 3000), 80).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    data = buf.getvalue()
+    return data + b"\0" * max(0, mb * 1024 * 1024 - len(data))
+
+
+def make_upload(sample_path):
+    # Starlette'in multipart parser'ı gibi: 1 MB üstü diske taşan SpooledTemporaryFile
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    with open(sample_path, "rb") as f:
+        shutil.copyfileobj(f, spool)
+    spool.seek(0)
+    return UploadFile(file=spool, filename="a.jpg")
+
+
+async def old_path(upload):
+    contents = await upload.read()
+    img = Image.open(io.BytesIO(contents))
+    img = img.convert("RGB")
+    img.thumbnail((1024, 1024))
+    return img.size
+
+
+async def new_path(upload):
+    with await spool_upload(upload) as spooled:
+        return open_prepared(spooled.path).size
+
+
+async def no_path(upload):
+    return None
+
+
+CASES = {"boş": no_path, "await file.read()": old_path, "spool_upload": new_path}
+
+
+async def run_all(fn, uploads):
+    return await asyncio.gather(*(fn(u) for u in uploads))
+
+
+def child(case, concurrency, sample_path):
+    """Alt süreç: tek yolu çalıştırır, tepe RSS'i (byte) yazar."""
+    uploads = [make_upload(sample_path) for _ in range(concurrency)]
+    asyncio.run(run_all(CASES[case], uploads))
+    for u in uploads:
+        u.file.close()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux'ta KB, macOS'ta byte
+    print(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+        return
+
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    mb = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    fd, sample_path = tempfile.mkstemp(suffix=".jpg")
+    with os.fdopen(fd, "wb") as f:
+        f.write(sample_jpeg(mb))
+    print(f"{concurrency} eşzamanlı x {os.path.getsize(sample_path) / 1e6:.1f} MB")
+
+    try:
+        base = None
+        for name in CASES:
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, str(concurrency), sample_path],
+                                 capture_output=True, text=True, check=True).stdout
+            peak = int(out.split()[-1])
+            base = peak if base is None else base
+            print(f"{name:20s} tepe RSS {peak / 1e6:8.1f} MB  (+{(peak - base) / 1e6:.1f})")
+    finally:
+        os.remove(sample_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Analitik hesaplama testi: milyonlarca wear_logs satırı olan veritabanında süre.
+
+Kullanım:
+    python benchmarks/bench_wardrobe_analytics.py [toplam_log] [kullanici_sayisi]
+
+Geçici veritabanına kullanıcılar, dolapları ve son 3 yıla yayılmış giyim
+kayıtları (parçaları wear_log_items'ta, logların üçte birinde aksesuar)
+yazılır; bir "ağır" kullanıcı tüm logların %10'una sahiptir.
+Normal ve ağır kullanıcı için soğuk hesap (indeksten okuma + NumPy),
+önbellekten dönüş ve yeni kayıttan sonraki artımlı hesap süreleri yazılır;
+aksesuarların kategori payında göründüğü kontrol edilir.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import wardrobe_analytics  # noqa: E402
+
+CATEGORIES = ["ust_giyim", "alt_giyim", "elbise", "ayakkabi", "aksesuar"]
+COLORS = ["Siyah", "Beyaz", "Gri", "Lacivert", "Mavi", "Bej", "Kırmızı", None]
+ITEMS_PER_USER = 150
+
+
+def setup(path, logs, users):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE clothes (id INTEGER PRIMARY KEY, username TEXT, url TEXT, category TEXT, color_name TEXT, wear_count INTEGER, price REAL, created_at TIMESTAMP)")
+    conn.execute("CREATE TABLE wear_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, top_id INTEGER, bottom_id INTEGER, shoe_id INTEGER, wear_date TEXT, is_reviewed INTEGER)")
+    conn.execute("CREATE TABLE clothes_sync_state (username TEXT PRIMARY KEY, version INTEGER)")
+    conn.execute("CREATE INDEX idx_wear_logs_user_id ON wear_logs(username, id, wear_date, top_id, bottom_id, shoe_id)")
+    conn.execute("CREATE TABLE wear_log_items (log_id INTEGER NOT NULL, item_id INTEGER NOT NULL, PRIMARY KEY (log_id, item_id)) WITHOUT ROWID")
+    random.seed(5)
+    conn.executemany("INSERT INTO clothes VALUES (?, ?, ?, ?, ?, 0, ?, date('now', ?))", [
+        (i, f"user{(i - 1) // ITEMS_PER_USER}", f"/static/uploads/{i}.png", CATEGORIES[i % 5], random.choice(COLORS),
+         random.choice([None, 199.9, 450.0]), f"-{random.randint(0, 1500)} day") for i in range(1, users * ITEMS_PER_USER + 1)])
+
+    def rows():
+        for _ in range(logs):
+            u = 0 if random.random() < 0.1 else random.randrange(users)
+            base = u * ITEMS_PER_USER
+            yield (f"user{u}", base + random.randint(1, ITEMS_PER_USER), base + random.randint(1, ITEMS_PER_USER),
+                   random.choice([None, base + random.randint(1, ITEMS_PER_USER)]), f"-{random.randint(0, 1100)} day")
+    conn.executemany("INSERT INTO wear_logs (username, top_id, bottom_id, shoe_id, wear_date, is_reviewed) VALUES (?, ?, ?, ?, date('now', ?), 1)", rows())
+    for col in ("top_id", "bottom_id", "shoe_id"):
+        conn.execute(f"INSERT OR IGNORE INTO wear_log_items SELECT id, {col} FROM wear_logs WHERE {col} > 0")
+    # Aksesuarlar sadece wear_log_items'ta (id'si 5'e bölünen parçalar "aksesuar")
+    conn.execute(f"""INSERT OR IGNORE INTO wear_log_items SELECT w.id, (CAST(substr(w.username, 5) AS INTEGER) * {ITEMS_PER_USER}) + 5 * (1 + w.id % {ITEMS_PER_USER // 5})
+                     FROM wear_logs w WHERE w.id % 3 = 0""")
+    conn.commit()
+    return conn
+
+
+def measure(conn, username):
+    t0 = time.perf_counter()
+    wardrobe_analytics.get(conn, username)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    wardrobe_analytics.get(conn, username)
+    warm = time.perf_counter() - t0
+
+    base = int(username[4:]) * ITEMS_PER_USER
+    cur = conn.execute("INSERT INTO wear_logs (username, top_id, bottom_id, wear_date) VALUES (?, ?, ?, date('now'))", (username, base + 1, base + 2))
+    conn.executemany("INSERT INTO wear_log_items VALUES (?, ?)", [(cur.lastrowid, base + 1), (cur.lastrowid, base + 2), (cur.lastrowid, base + 5)])
+    conn.commit()
+    t0 = time.perf_counter()
+    after = wardrobe_analytics.get(conn, username)
+    incremental = time.perf_counter() - t0
+    # Artımlı sonuç baştan hesapla aynı olmalı
+    assert after == wardrobe_analytics.compute(conn, username) | {"computed_at": after["computed_at"]}
+    accessory = next(c for c in after["windows"]["all"]["category_share"] if c["name"] == "aksesuar")
+
+    logs = conn.execute("SELECT COUNT(*) FROM wear_logs WHERE username = ?", (username,)).fetchone()[0]
+    print(f"{username:8s} {logs:8d} log: soguk {cold * 1000:7.1f} ms | onbellek {warm * 1000:5.2f} ms | "
+          f"yeni kayittan sonra {incremental * 1000:6.1f} ms | aksesuar payi {accessory['share']:.1%}")
+
+
+def main():
+    logs = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        conn = setup(os.path.join(tmp, "analytics.db"), logs, users)
+        print(f"{logs} log, {users} kullanici hazirlandi ({time.perf_counter() - t0:.1f} s)")
+        measure(conn, "user7")
+        measure(conn, "user0")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
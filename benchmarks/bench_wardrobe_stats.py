@@ -0,0 +1,96 @@
+"""
+Hazır istatistik testi: tutarlılık (özellik testi) + okuma süresi.
+
+Kullanım:
+    python benchmarks/bench_wardrobe_stats.py [islem_sayisi]
+
+Geçici bir veritabanında clothes/outfits üzerinde rastgele INSERT, UPDATE
+(kategori, stil, renk, kullanıcı, giyilme sayısı) ve DELETE işlemleri yapılır;
+her adımdan sonra trigger'ların tuttuğu satır GROUP BY sonucuyla
+karşılaştırılır. Sonra eski beş sorguluk yol ile tek satır okuma ölçülür.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import wardrobe_stats  # noqa: E402
+
+USERS = ["ayse", "mehmet", "zeynep"]
+CATEGORIES = ["ust_giyim", "alt_giyim", "elbise", "ayakkabi", "aksesuar", None]
+STYLES = ["Günlük", "Spor", "Şık", "", None]
+SEASONS = ["Yaz", "Kış", "4 Mevsim", None]
+COLORS = ["Siyah", "Beyaz", "Lacivert", 'Garip"Renk', None]
+
+
+def setup(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE clothes (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, url TEXT, category TEXT, season TEXT, style TEXT, color_name TEXT, wear_count INTEGER DEFAULT 0, is_clean INTEGER DEFAULT 1)")
+    conn.execute("CREATE TABLE outfits (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, top_id INTEGER, bottom_id INTEGER)")
+    # Kurulumdan önce var olan veri de rebuild ile doğru hesaplanmalı
+    for _ in range(50):
+        conn.execute("INSERT INTO clothes (username, category, season, style, color_name) VALUES (?, ?, ?, ?, ?)",
+                     (random.choice(USERS), random.choice(CATEGORIES), random.choice(SEASONS), random.choice(STYLES), random.choice(COLORS)))
+    wardrobe_stats.install(conn.cursor())
+    conn.commit()
+    return conn
+
+
+def random_op(conn):
+    op = random.random()
+    ids = [r[0] for r in conn.execute("SELECT id FROM clothes")]
+    if op < 0.35 or not ids:
+        conn.execute("INSERT INTO clothes (username, category, season, style, color_name, wear_count) VALUES (?, ?, ?, ?, ?, ?)",
+                     (random.choice(USERS), random.choice(CATEGORIES), random.choice(SEASONS), random.choice(STYLES), random.choice(COLORS), random.randint(0, 5)))
+    elif op < 0.55:
+        field, values = random.choice([("category", CATEGORIES), ("style", STYLES), ("season", SEASONS), ("color_name", COLORS), ("username", USERS)])
+        conn.execute(f"UPDATE clothes SET {field} = ? WHERE id = ?", (random.choice(values), random.choice(ids)))
+    elif op < 0.65:
+        conn.execute("UPDATE clothes SET wear_count = wear_count + 1 WHERE id = ?", (random.choice(ids),))
+    elif op < 0.75:
+        conn.execute("UPDATE clothes SET is_clean = 0 WHERE username = ?", (random.choice(USERS),))
+    elif op < 0.85:
+        conn.execute("DELETE FROM clothes WHERE id = ?", (random.choice(ids),))
+    elif op < 0.95:
+        conn.execute("INSERT INTO outfits (username, top_id) VALUES (?, 1)", (random.choice(USERS),))
+    else:
+        conn.execute("DELETE FROM outfits WHERE id = (SELECT MIN(id) FROM outfits)")
+    conn.commit()
+
+
+def timed(fn, repeat=2000):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main():
+    ops = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = setup(os.path.join(tmp, "stats.db"))
+        for i in range(ops):
+            random_op(conn)
+            bad = wardrobe_stats.verify(conn)
+            if bad:
+                print(f"HATA: {i}. islemden sonra tutarsiz: {bad}")
+                sys.exit(1)
+        print(f"{ops} rastgele islem: hazir istatistik her adimda GROUP BY ile ayni")
+
+        # Okuma süresi için büyük dolap
+        conn.executemany("INSERT INTO clothes (username, category, season, style, color_name) VALUES ('ayse', ?, ?, ?, ?)",
+                         [(random.choice(CATEGORIES), random.choice(SEASONS), random.choice(STYLES), random.choice(COLORS)) for _ in range(5000)])
+        conn.commit()
+        old = timed(lambda: wardrobe_stats.compute(conn, "ayse"), 200)
+        new = timed(lambda: wardrobe_stats.read(conn, "ayse"))
+        print(f"5000+ parcalik dolap: GROUP BY {old:.0f} us, tek satir {new:.0f} us")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+XP yazma kilidi çekişmesi: olay başına UPDATE (eski) ve toplu yazma (xp_ledger).
+
+Kullanım:
+    python benchmarks/bench_xp_ledger.py [thread_sayisi] [thread_basina_olay]
+
+Geçici bir veritabanında birçok thread aynı anda XP olayı üretir; bu sırada
+ayrı bir thread normal istekleri taklit ederek yorum ekler. Her iki yol için
+olay/saniye, "database is locked" hataları ve yorum yazma gecikmesi
+(p50 / p99) ölçülür; sonunda kullanıcıların XP toplamı kontrol edilir.
+"""
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import xp_ledger  # noqa: E402
+import xp_rollup  # noqa: E402
+
+USERS = [f"user{i}" for i in range(50)]
+
+
+def league(xp):
+    return {"name": "Altın" if xp >= 500 else "Bronz", "icon": ""}
+
+
+def setup(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (username TEXT UNIQUE, xp INTEGER DEFAULT 0)")
+    conn.execute("CREATE TABLE xp_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, action_type TEXT, xp_amount INTEGER, log_date TEXT)")
+    xp_rollup.install(conn.cursor())
+    conn.execute("CREATE TABLE notifications (id INTEGER PRIMARY KEY AUTOINCREMENT, user_to TEXT, user_from TEXT, type TEXT, message TEXT)")
+    conn.execute("CREATE TABLE comments (id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT)")
+    conn.executemany("INSERT INTO users (username) VALUES (?)", [(u,) for u in USERS])
+    conn.commit()
+    conn.close()
+
+
+def old_add(path, username, points):
+    # Eski update_user_xp: olay başına bağlantı + UPDATE + commit
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute("UPDATE users SET xp = xp + ? WHERE username = ?", (points, username))
+    conn.commit()
+    conn.close()
+
+
+def run(mode, threads, per_thread):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    setup(path)
+    ledger = xp_ledger.XPLedger(path, league, interval=0.05)
+    errors = [0]
+    stop = threading.Event()
+    latencies = []
+
+    def producer(t):
+        for i in range(per_thread):
+            user = USERS[(t * per_thread + i) % len(USERS)]
+            try:
+                if mode == "eski":
+                    old_add(path, user, 1)
+                else:
+                    ledger.add(user, "bench", 1)
+            except sqlite3.OperationalError:
+                errors[0] += 1
+
+    def foreground():
+        # Diğer istekler: yorum ekleme (aynı yazma kilidini ister)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                conn = sqlite3.connect(path, timeout=5)
+                conn.execute("INSERT INTO comments (text) VALUES ('x')")
+                conn.commit()
+                conn.close()
+                latencies.append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                errors[0] += 1
+            time.sleep(0.002)
+
+    fg = threading.Thread(target=foreground)
+    fg.start()
+    workers = [threading.Thread(target=producer, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    ledger.close()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    fg.join()
+
+    conn = sqlite3.connect(path)
+    total = conn.execute("SELECT SUM(xp) FROM users").fetchone()[0]
+    conn.close()
+    latencies.sort()
+    events = threads * per_thread
+    print(f"{mode:7s} {events / elapsed:10.0f} olay/sn  kilit hatası: {errors[0]:4d}  "
+          f"yorum p50: {statistics.median(latencies) * 1000:6.2f} ms  "
+          f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms  "
+          f"XP toplamı: {total} / {events - errors[0]}")
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    print(f"{threads} thread x {per_thread} olay")
+    run("eski", threads, per_thread)
+    run("ledger", threads, per_thread)
@@ -0,0 +1,80 @@
+"""
+Lig sıralama indeksi ölçümü: Fenwick ağacı (xp_rank) ve SQL sıralaması.
+
+Kullanım:
+    python benchmarks/bench_xp_rank.py [kullanici_sayisi]
+
+Varsayılan 1M kullanıcıya uzun kuyruklu (çoğu düşük, azı yüksek) XP
+dağıtılır. Karşılaştırılanlar:
+- indeks kurulumu (users tablosundan okuyup toplu yükleme)
+- "kaçıncıyım": COUNT(*) WHERE xp > ? (xp indeksiyle ve indekssiz) / rank()
+- lig ilk 20'si: ORDER BY xp DESC LIMIT 20 / top(20)
+- XP güncellemesi: add()
+Rastgele örneklerde sonuçların SQL ile aynı olduğu da kontrol edilir.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import xp_rank  # noqa: E402
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def fmt(seconds):
+    return f"{seconds * 1e6:10.1f} µs" if seconds < 1e-3 else f"{seconds * 1e3:10.1f} ms"
+
+
+def main(n):
+    rnd = random.Random(42)
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (username TEXT UNIQUE, xp INTEGER DEFAULT 0)")
+    conn.executemany("INSERT INTO users VALUES (?, ?)",
+                     ((f"user{i}", int(rnd.paretovariate(1.2) * 20) - 20) for i in range(n)))
+    conn.commit()
+    users = [f"user{rnd.randrange(n)}" for _ in range(200)]
+    print(f"{n} kullanıcı")
+
+    start = time.perf_counter()
+    index = xp_rank.RankIndex()
+    index.load(conn.execute("SELECT username, xp FROM users").fetchall())
+    print(f"indeks kurulumu          {fmt(time.perf_counter() - start)}")
+
+    def sql_rank(user):
+        xp = conn.execute("SELECT xp FROM users WHERE username = ?", (user,)).fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM users WHERE xp > ?", (xp,)).fetchone()[0] + 1
+
+    def sql_top():
+        return conn.execute("SELECT username, xp FROM users ORDER BY xp DESC, username LIMIT 20").fetchall()
+
+    print(f"sıra (SQL, indekssiz)    {fmt(timed(lambda: sql_rank(rnd.choice(users)), 5))}")
+    print(f"ilk 20 (SQL, indekssiz)  {fmt(timed(sql_top, 3))}")
+    conn.execute("CREATE INDEX idx_users_xp ON users(xp)")
+    print(f"sıra (SQL, xp indeksi)   {fmt(timed(lambda: sql_rank(rnd.choice(users)), 20))}")
+    print(f"ilk 20 (SQL, xp indeksi) {fmt(timed(sql_top, 20))}")
+    print(f"sıra (Fenwick)           {fmt(timed(lambda: index.rank(rnd.choice(users)), 10000))}")
+    print(f"ilk 20 (Fenwick)         {fmt(timed(lambda: index.top(20), 1000))}")
+    print(f"XP ekleme (Fenwick)      {fmt(timed(lambda: index.add(rnd.choice(users), rnd.randrange(1, 20)), 10000))}")
+
+    # Doğruluk: güncellemelerden sonra SQL ile karşılaştır
+    for user, xp in index.scores.items() if n <= 1000 else ((u, index.get(u)) for u in users):
+        conn.execute("UPDATE users SET xp = ? WHERE username = ?", (xp, user))
+    for user in users:
+        assert index.rank(user) == sql_rank(user), user
+    assert [(u, x) for _, u, x in index.top(20)] == sql_top()
+    print("SQL ile aynı sonuç: TAMAM")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,397 @@
+"""
+İçerik adresli (content-addressed) dosya deposu.
+
+Her dosya işlenmiş byte'larının SHA-256'sı ile adlandırılır:
+    /static/uploads/<sha256>.png
+Aynı ürün fotoğrafı iki kez yüklense/import edilse de depoya bir kez yazılır.
+Dosya adı içerikten türediği için asla değişmez (uzun cache süresi güvenli).
+
+Depolama arka ucu değiştirilebilir (.env):
+    STORAGE_BACKEND        -> "local" (varsayılan) veya "s3"
+    S3_BUCKET, S3_PREFIX   -> Bucket ve anahtar öneki
+    S3_ENDPOINT_URL        -> MinIO vb. S3 uyumlu servisler için
+    STORAGE_CACHE_DIR      -> S3 için okuma önbelleği klasörü
+    STORAGE_CACHE_MAX_MB   -> Önbellek sınırı (varsayılan 1024 MB)
+S3 kimlik bilgileri boto3'ün standart AWS_* değişkenlerinden okunur.
+boto3 isteğe bağlıdır (requirements.txt'de yok); sadece s3 arka ucu için
+kurulmalı: pip install boto3. Kontrol: benchmarks/bench_blob_store.py
+
+Referans sayımı: bir blob'u clothes.url, users.avatar_url, social_feed
+(top/bottom/shoe_url) ve kayıtlı planların önizlemeleri kullanabilir.
+blob_refs tablosu anahtar başına referans sayısını tutar; bu kolonlardaki
+ekleme / silme / değişiklikte tetikleyiciler günceller (tablo taranmaz).
+Bir kayıt silindiğinde release() çağrılır; hiçbir yerde referansı kalmayan
+blob depodan silinir.
+
+Yazma / silme yarışı: put_bytes önce anahtarı BLOB_PENDING_SECONDS için
+"bekliyor" işaretler (referans veren satır birazdan yazılacak), sonra
+depoya bakar. release() kontrol + silmeyi yazma kilidi altında yapar; bu
+yüzden aynı içerik o anda başka bir istekte yazılıyorsa blob silinmez,
+silme önce davrandıysa put_bytes dosyayı yeniden yazar.
+
+Yetim blob: put_bytes'tan sonra referans veren satır hiç yazılmazsa (INSERT
+hatası, süreç çökmesi) blob'u release() ile silecek kimse yoktur. sweep()
+işareti süresi dolmuş ve referansı olmayan anahtarları bulup siler; günlük
+bakımda çalışır (main.daily_maintenance).
+"""
+import hashlib
+import io
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+CHUNK_SIZE = 1024 * 1024
+KEY_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+URL_PREFIX = "/static/uploads/"
+# Eski kayıtlarda görülen url önekleri (uuid isimli dosyalar)
+LEGACY_PREFIXES = ("/static/uploads/", "/uploads/")
+
+BLOB_PENDING_SECONDS = int(os.getenv("BLOB_PENDING_SECONDS", "600"))
+
+# Blob url'i tutan kolonlar: (tablo, kolon, JSON mu). Planlar url'leri JSON içinde tutuyor
+REF_COLUMNS = (
+    ("clothes", "url", False),
+    ("users", "avatar_url", False),
+    ("social_feed", "top_url", False),
+    ("social_feed", "bottom_url", False),
+    ("social_feed", "shoe_url", False),
+    ("user_plans", "data", True),
+)
+
+backend = None
+db_file = None
+
+
+# --- ARKA UÇLAR ---
+
+class LocalBackend:
+    """Yerel disk (tek sunucu)."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def put_file(self, key, fileobj):
+        # Yarım dosya görünmesin diye önce geçici dosyaya yaz, sonra atomik taşı
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                shutil.copyfileobj(fileobj, out, CHUNK_SIZE)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def local_path(self, key):
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+class S3Backend:
+    """
+    S3 API'si konuşan her servis (AWS S3, MinIO, R2...).
+    Büyük dosyalar boto3 TransferConfig ile multipart yüklenir; okumalar
+    yerel disk önbelleğinden geçer (read-through). Önbelleğin toplam boyutu
+    bellekte tutulur; klasör sadece sınır aşılınca taranır.
+    """
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, cache_dir=None,
+                 cache_max_bytes=1024 * 1024 * 1024, multipart_threshold=8 * 1024 * 1024, client=None):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise RuntimeError("S3 depolama için 'boto3' kurulu olmalı (pip install boto3).")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = client or boto3.client("s3", endpoint_url=endpoint_url)
+        self.transfer = TransferConfig(multipart_threshold=multipart_threshold, multipart_chunksize=multipart_threshold)
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "giyim_blob_cache")
+        self.cache_max_bytes = cache_max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.cache_lock = threading.Lock()
+        self.cache_bytes = sum(size for _, size, _ in self._cache_entries())
+
+    def _obj(self, key):
+        return self.prefix + key
+
+    def exists(self, key):
+        # Önbellekteki kopya başka bir node silmiş olabilir; kaynak her zaman bucket
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._obj(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put_file(self, key, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, self._obj(key), Config=self.transfer)
+
+    def local_path(self, key):
+        """Önbellekteki kopyanın yolu; yoksa S3'ten indirip önbelleğe koyar."""
+        path = os.path.join(self.cache_dir, key)
+        if os.path.exists(path):
+            os.utime(path)  # LRU için son kullanım zamanı
+            return path
+
+        from botocore.exceptions import ClientError
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp_")
+        os.close(fd)
+        try:
+            self.client.download_file(self.bucket, self._obj(key), tmp, Config=self.transfer)
+            os.replace(tmp, path)
+        except ClientError:
+            os.remove(tmp)
+            return None
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        with self.cache_lock:
+            self.cache_bytes += os.path.getsize(path)
+            if self.cache_bytes > self.cache_max_bytes:
+                self._trim_cache(keep=key)
+        return path
+
+    def _cache_entries(self):
+        """(son kullanım, boyut, ad) listesi; yarım indirmeler hariç."""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(".tmp_"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.name))
+        return entries
+
+    def _trim_cache(self, keep=None):
+        """
+        self.cache_lock altında, sınır aşılınca çağrılır: en uzun süredir
+        kullanılmayanlar sınırın %90'ına inene kadar silinir (her kaçırmada
+        yeniden taranmasın diye pay bırakılır). `keep` az önce indirilip
+        döndürülecek dosyadır, silinmez.
+        """
+        entries = self._cache_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.cache_max_bytes * 0.9:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.cache_bytes = total
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._obj(key))
+        path = os.path.join(self.cache_dir, key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return True
+        with self.cache_lock:
+            self.cache_bytes -= size
+        return True
+
+
+def configure(local_dir, url_prefix=URL_PREFIX, backend_name=None, db=None):
+    """Uygulama açılışında çağrılır. Arka ucu .env'e göre seçer; db: blob_refs'in olduğu veritabanı."""
+    global backend, URL_PREFIX, db_file
+    URL_PREFIX = url_prefix
+    db_file = db
+    backend_name = backend_name or os.getenv("STORAGE_BACKEND", "local")
+
+    if backend_name == "s3":
+        backend = S3Backend(
+            bucket=os.environ["S3_BUCKET"],
+            prefix=os.getenv("S3_PREFIX", "uploads"),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+            cache_dir=os.getenv("STORAGE_CACHE_DIR") or None,
+            cache_max_bytes=int(os.getenv("STORAGE_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+        )
+    else:
+        backend = LocalBackend(local_dir)
+    return backend
+
+
+# --- ANAHTAR / URL ---
+
+def is_valid_key(key):
+    return bool(key) and KEY_RE.match(key) is not None and ".." not in key
+
+
+def url_for(key):
+    """Blob anahtarından frontend'in kullanacağı url'i üretir."""
+    return f"{URL_PREFIX}{key}"
+
+
+def key_from_url(url):
+    """url -> blob anahtarı (depoya ait değilse None)."""
+    if not url:
+        return None
+    for prefix in (URL_PREFIX,) + LEGACY_PREFIXES:
+        if url.startswith(prefix):
+            key = url[len(prefix):]
+            return key if is_valid_key(key) else None
+    return None
+
+
+# --- YAZMA / OKUMA ---
+
+def _hold(key):
+    """Anahtarı BLOB_PENDING_SECONDS boyunca release()'e karşı korur (referans veren satır henüz yazılmadı)."""
+    if db_file is None:
+        return
+    conn = sqlite3.connect(db_file, timeout=30)
+    try:
+        conn.execute("""INSERT INTO blob_refs (key, pending_until) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET pending_until = excluded.pending_until""", (key, time.time() + BLOB_PENDING_SECONDS))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def put_bytes(data, ext):
+    """Byte'ları depoya yazar, anahtarı döner. Aynı içerik zaten varsa yazmaz."""
+    key = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+    # Önce işaret, sonra varlık kontrolü: araya giren release() ya işareti görür ya da silmeyi bitirmiştir
+    _hold(key)
+    if not backend.exists(key):
+        backend.put_file(key, io.BytesIO(data))
+    return key
+
+
+def put_image(img, format="PNG", **save_kwargs):
+    """PIL resmini encode edip depoya yazar. Dönüş: anahtar"""
+    buf = io.BytesIO()
+    img.save(buf, format=format, **save_kwargs)
+    ext = "jpg" if format.upper() == "JPEG" else format.lower()
+    return put_bytes(buf.getvalue(), ext)
+
+
+def local_path(key):
+    """Sunmak için diskteki yol (S3'te önbellek üzerinden). Yoksa None."""
+    if not is_valid_key(key):
+        return None
+    return backend.local_path(key)
+
+
+# --- REFERANS SAYIMI ---
+
+def _key_sql(expr):
+    """SQL: url ifadesi -> blob anahtarı (depoya ait değilse NULL)."""
+    cases = " ".join(f"WHEN substr({expr}, 1, {len(p)}) = '{p}' THEN substr({expr}, {len(p) + 1})"
+                     for p in dict.fromkeys((URL_PREFIX,) + LEGACY_PREFIXES))
+    return f"CASE {cases} END"
+
+
+def _refs_sql(row, column, is_json, from_table=False):
+    """SQL: `row` satırının (NEW / OLD / tablo) kolonundaki blob anahtarları, k kolonu olarak."""
+    value = f"{row}.{column}"
+    if not is_json:
+        return f"SELECT {_key_sql(value)} AS k" + (f" FROM {row}" if from_table else "")
+    tables = f"{row}, " if from_table else ""
+    return (f"SELECT {_key_sql('j.value')} AS k FROM {tables}json_tree(CASE WHEN json_valid({value}) THEN {value} ELSE '[]' END) AS j "
+            f"WHERE j.type = 'text'")
+
+
+def _add_refs_sql(refs):
+    # Referans veren satır yazıldı: put_bytes'ın "bekliyor" işareti artık gerekmez
+    return f"""INSERT INTO blob_refs (key, refs) SELECT k, COUNT(*) FROM ({refs}) WHERE k IS NOT NULL GROUP BY k
+        ON CONFLICT(key) DO UPDATE SET refs = refs + excluded.refs, pending_until = 0"""
+
+
+def _remove_refs_sql(refs):
+    return f"UPDATE blob_refs SET refs = refs - (SELECT COUNT(*) FROM ({refs}) WHERE k = blob_refs.key) WHERE key IN (SELECT k FROM ({refs}))"
+
+
+def install(cursor):
+    """blob_refs tablosu + REF_COLUMNS tetikleyicileri; tablo ilk kez kuruluyorsa mevcut satırlardan sayılır."""
+    created = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blob_refs'").fetchone() is None
+    cursor.execute('''CREATE TABLE IF NOT EXISTS blob_refs (
+        key TEXT PRIMARY KEY,
+        refs INTEGER DEFAULT 0,
+        pending_until REAL DEFAULT 0
+    ) WITHOUT ROWID''')
+    for table, column, is_json in REF_COLUMNS:
+        name = f"trg_blob_{table}_{column}"
+        new, old = _refs_sql("NEW", column, is_json), _refs_sql("OLD", column, is_json)
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table} BEGIN {_add_refs_sql(new)}; END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table} BEGIN {_remove_refs_sql(old)}; END")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {column} ON {table}
+            WHEN OLD.{column} IS NOT NEW.{column} BEGIN {_remove_refs_sql(old)}; {_add_refs_sql(new)}; END""")
+    if created:
+        cursor.execute(_add_refs_sql(" UNION ALL ".join(_refs_sql(table, column, is_json, from_table=True)
+                                                       for table, column, is_json in REF_COLUMNS)))
+
+
+def count_refs(conn, key):
+    """Blob'u kullanan kayıt sayısı; az önce yazılıp henüz referans almamış blob 1 sayılır."""
+    row = conn.execute("SELECT refs, pending_until FROM blob_refs WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return 0
+    refs, pending_until = row
+    return max(refs or 0, 0) + (1 if (pending_until or 0) > time.time() else 0)
+
+
+def release(conn, urls):
+    """
+    Silinen/değişen kayıtların url'lerini verin; referansı kalmayan blob'lar
+    depodan silinir. conn'daki değişiklikler commit edilmiş olmalı.
+    Dönüş: silinen anahtarlar
+    """
+    removed = []
+    for key in {key_from_url(u) for u in urls} - {None}:
+        # Yazma kilidi silme bitene kadar tutulur; aynı anda put_bytes bu anahtarı işaretleyemez
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if count_refs(conn, key) > 0:
+                conn.rollback()
+                continue
+            conn.execute("DELETE FROM blob_refs WHERE key = ?", (key,))
+            if backend.delete(key):
+                removed.append(key)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return removed
+
+
+def sweep(conn):
+    """
+    Referansı olmayan ve "bekliyor" işareti BLOB_PENDING_SECONDS'ı geçmiş
+    blob'ları siler (yazıldı ama kaydı hiç eklenmedi). Dönüş: silinen anahtarlar
+    """
+    keys = [k for k, in conn.execute("SELECT key FROM blob_refs WHERE refs <= 0 AND pending_until < ?", (time.time(),))]
+    conn.commit()
+    # release() her anahtarı yazma kilidi altında tekrar kontrol eder
+    return release(conn, [url_for(k) for k in keys])
@@ -0,0 +1,289 @@
+"""
+Linkten ürün içe aktarma (tekli ve toplu).
+
+Eskiden /import/url sayfayı ve resmi senkron requests.get ile (resimde
+timeout bile yoktu) indiriyor, o sürede event loop'u kilitliyordu. Artık:
+- Tek bir httpx.AsyncClient (bağlantı havuzu + keep-alive) kullanılır
+- Aynı anda en fazla IMPORT_CONCURRENCY indirme, aynı siteye en fazla
+  IMPORT_PER_HOST bağlantı (mağazalar toplu istekte bizi engellemesin)
+- Sayfa ve resim parça parça okunur; IMPORT_HTML_MAX_BYTES /
+  IMPORT_IMAGE_MAX_BYTES aşılınca indirme kesilir
+- Sayfada </head> gelince ürün bilgisi bulunduysa sayfanın geri kalanı
+  indirilmez; bilgi product_meta önbelleğinden gelir / oraya yazılır
+- Sadece dış adresler: link (ve yönlendirme) hedefi loopback / özel ağ /
+  link-local bir IP'ye çözülüyorsa istek atılmaz (IMPORT_ALLOW_PRIVATE=1
+  sadece yerel test için). httpx bağlanırken adı tekrar çözdüğü için
+  (DNS rebinding) yanıt gelince bağlanılan IP de kontrol edilir; iç adrese
+  bağlanıldıysa gövde okunmaz. İstek yine de o adrese gitmiş olabilir:
+  bu kontrol yanıtın sızmasını engeller, isteğin kendisini değil
+- İndirilen resim işleme fonksiyonuna (main.save_imported: arka plan
+  silme, renk, kayıt) IMPORT_PROCESS_WORKERS thread'de verilir
+
+Toplu işlerde her link için durum tutulur: queued -> fetching ->
+processing -> done / error. İşler bellekte IMPORT_JOB_TTL saniye kalır.
+
+Ölçüm: benchmarks/bench_bulk_import.py
+"""
+import asyncio
+import contextlib
+import ipaddress
+import os
+import socket
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import httpx
+
+import product_meta
+
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "8"))
+IMPORT_PER_HOST = int(os.getenv("IMPORT_PER_HOST", "2"))
+IMPORT_PROCESS_WORKERS = int(os.getenv("IMPORT_PROCESS_WORKERS", "2"))
+IMPORT_TIMEOUT = float(os.getenv("IMPORT_TIMEOUT", "10"))
+IMPORT_HTML_MAX_BYTES = int(os.getenv("IMPORT_HTML_MAX_BYTES", str(2 * 1024 * 1024)))
+IMPORT_IMAGE_MAX_BYTES = int(os.getenv("IMPORT_IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+IMPORT_MAX_URLS = int(os.getenv("IMPORT_MAX_URLS", "20"))
+IMPORT_JOB_TTL = int(os.getenv("IMPORT_JOB_TTL", "3600"))
+IMPORT_ALLOW_PRIVATE = os.getenv("IMPORT_ALLOW_PRIVATE", "0") == "1"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+class FetchError(Exception):
+    """Link veya resim indirilemedi / ürün bilgisi bulunamadı."""
+
+
+def _is_public(address):
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_public_host(host):
+    """Host'un bütün adresleri dış (genel) IP değilse FetchError."""
+    if not host:
+        raise FetchError("Geçersiz link.")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise FetchError("Site bulunamadı.")
+    if not infos or not all(_is_public(info[4][0].split("%")[0]) for info in infos):
+        raise FetchError("Bu adrese izin verilmiyor.")
+
+
+class Importer:
+    def __init__(self, process_fn, concurrency=None, per_host=None, workers=None, meta_cache=None, allow_private=None):
+        """
+        process_fn(username, page_url, meta, image_bytes, category) -> dict (thread'de çalışır, hata varsa {"error": ...})
+        meta_cache: product_meta.MetaCache (yoksa her seferinde sayfa indirilir)
+        allow_private: yerel / özel ağ adreslerine izin (varsayılan IMPORT_ALLOW_PRIVATE)
+        """
+        self.process_fn = process_fn
+        self.meta_cache = meta_cache
+        self.allow_private = IMPORT_ALLOW_PRIVATE if allow_private is None else allow_private
+        self.concurrency = concurrency or IMPORT_CONCURRENCY
+        self.per_host = per_host or IMPORT_PER_HOST
+        self.slots = asyncio.Semaphore(self.concurrency)
+        self.process_slots = asyncio.Semaphore(workers or IMPORT_PROCESS_WORKERS)
+        self.host_slots = {}   # host -> [semaphore, kullanan istek sayısı]; boşalan host silinir
+        self.client = None
+        self.jobs = {}
+        self.tasks = set()
+
+    def _client(self):
+        # İlk istekte, çalışan event loop içinde oluşturulur
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=httpx.Timeout(IMPORT_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                follow_redirects=True,
+                # Yönlendirmeler dahil her istekten önce hedef adres, yanıtta bağlanılan IP kontrolü
+                event_hooks={"request": [self._guard], "response": [self._guard_peer]},
+            )
+        return self.client
+
+    async def _guard(self, request):
+        if not self.allow_private:
+            await check_public_host(request.url.host)
+
+    async def _guard_peer(self, response):
+        if self.allow_private:
+            return
+        stream = response.extensions.get("network_stream")
+        peer = stream.get_extra_info("server_addr") if stream is not None else None
+        if peer and not _is_public(peer[0].split("%")[0]):
+            raise FetchError("Bu adrese izin verilmiyor.")
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        slot = self.host_slots.get(host)
+        if slot is None:
+            slot = self.host_slots[host] = [asyncio.Semaphore(self.per_host), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self.host_slots[host]
+
+    async def _download(self, url, max_bytes, what):
+        """Gövdeyi parça parça okur; sınır aşılırsa bağlantıyı keser."""
+        if urlsplit(url).scheme not in ("http", "https"):
+            raise FetchError("Geçersiz link.")
+        async with self._host_slot(url):
+            try:
+                async with self._client().stream("GET", url) as response:
+                    if response.status_code != 200:
+                        raise FetchError(f"{what} indirilemedi (HTTP {response.status_code}).")
+                    length = response.headers.get("content-length")
+                    if length and length.isdigit() and int(length) > max_bytes:
+                        raise FetchError(f"{what} çok büyük.")
+                    chunks, size = [], 0
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise FetchError(f"{what} çok büyük.")
+                        chunks.append(chunk)
+                    return b"".join(chunks), str(response.url)
+            except httpx.TimeoutException:
+                raise FetchError(f"{what} zaman aşımına uğradı.")
+            except httpx.HTTPError:
+                raise FetchError(f"{what} indirilemedi.")
+
+    async def _fetch_page(self, url, headers=None):
+        """
+        Ürün sayfası; head'de bilgi bulunursa gövdenin kalanı okunmaz.
+        Dönüş: (meta, ETag, Last-Modified); 304 gelirse meta None
+        """
+        if urlsplit(url).scheme not in ("http", "https"):
+            raise FetchError("Geçersiz link.")
+        async with self._host_slot(url):
+            try:
+                async with self._client().stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and headers:
+                        return None, None, None
+                    if response.status_code != 200:
+                        raise FetchError(f"Sayfa indirilemedi (HTTP {response.status_code}).")
+                    page_url, encoding = str(response.url), response.charset_encoding
+                    validators = response.headers.get("etag"), response.headers.get("last-modified")
+                    html = bytearray()
+                    head_checked = False
+                    async for chunk in response.aiter_bytes():
+                        html += chunk
+                        if len(html) > IMPORT_HTML_MAX_BYTES:
+                            raise FetchError("Sayfa çok büyük.")
+                        # Head'de bilgi varsa gövdenin kalanı okunmaz; yoksa tam sayfa okunmaya devam eder
+                        if not head_checked and product_meta.head_end(html) >= 0:
+                            head_checked = True
+                            meta = product_meta.parse_head(html, page_url, encoding)
+                            if meta:
+                                return meta, *validators
+            except httpx.TimeoutException:
+                raise FetchError("Sayfa zaman aşımına uğradı.")
+            except httpx.HTTPError:
+                raise FetchError("Sayfa indirilemedi.")
+        meta = await asyncio.to_thread(product_meta.parse_product, bytes(html), page_url)
+        if not meta:
+            raise FetchError("Resim bulunamadı.")
+        return meta, *validators
+
+    async def page_meta(self, url):
+        """Ürün bilgisi: önbellekte tazeyse ağa gitmeden, eskiyse koşullu GET ile."""
+        if self.meta_cache is None:
+            meta, _, _ = await self._fetch_page(url)
+            return meta
+        key = product_meta.normalize_url(url)
+        entry = self.meta_cache.get(key)
+        if entry and self.meta_cache.is_fresh(entry):
+            return entry
+        meta, etag, last_modified = await self._fetch_page(url, self.meta_cache.validators(entry) if entry else None)
+        if meta is None:
+            return self.meta_cache.touch(key, entry)
+        return self.meta_cache.put(key, meta, etag, last_modified)
+
+    async def fetch_product(self, url):
+        """Sayfa + ürün resmi. Dönüş: (meta, resim byte'ları); hata -> FetchError"""
+        async with self.slots:
+            meta = await self.page_meta(url)
+            image, _ = await self._download(meta["image_url"], IMPORT_IMAGE_MAX_BYTES, "Resim")
+        return meta, image
+
+    async def import_one(self, username, url, category=None, item=None):
+        """İndir + işle. Dönüş: process_fn'in sonucu veya {"error": ...}"""
+        try:
+            meta, image = await self.fetch_product(url)
+        except FetchError as e:
+            return {"error": str(e)}
+        if item is not None:
+            item["status"] = "processing"
+            item["title"] = meta["title"]
+        async with self.process_slots:
+            return await asyncio.to_thread(self.process_fn, username, url, meta, image, category)
+
+    # --- Toplu işler ---
+    def submit(self, username, urls, category=None):
+        """İşi arka planda başlatır; ilerleme progress(job_id) ile okunur."""
+        self._expire()
+        urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))[:IMPORT_MAX_URLS]
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "username": username,
+            "created": time.time(),
+            "finished": None,
+            "items": [{"url": u, "status": "queued"} for u in urls],
+        }
+        self.jobs[job["job_id"]] = job
+        task = asyncio.create_task(self._run(job, category))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return self.progress(job["job_id"])
+
+    async def _run(self, job, category):
+        await asyncio.gather(*(self._run_item(job, item, category) for item in job["items"]))
+        job["finished"] = time.time()
+
+    async def _run_item(self, job, item, category):
+        item["status"] = "fetching"
+        try:
+            result = await self.import_one(job["username"], item["url"], category, item)
+        except Exception as e:  # İşleme hatası diğer linkleri durdurmasın
+            result = {"error": f"İşlenemedi: {e}"}
+        if "error" in result:
+            item.update(status="error", error=result["error"])
+        else:
+            item.update(status="done", result=result)
+
+    def progress(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        counts = {}
+        for item in job["items"]:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return {
+            "job_id": job_id,
+            "username": job["username"],
+            "total": len(job["items"]),
+            "done": counts.get("done", 0),
+            "failed": counts.get("error", 0),
+            "finished": job["finished"] is not None,
+            "items": job["items"],
+        }
+
+    def _expire(self):
+        cutoff = time.time() - IMPORT_JOB_TTL
+        for job_id in [j for j, job in self.jobs.items() if job["finished"] and job["finished"] < cutoff]:
+            del self.jobs[job_id]
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
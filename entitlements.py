@@ -0,0 +1,117 @@
+"""
+Premium / ücretsiz paket hakları.
+
+Her yüklemede ve kombin önerisinde premium durumu, bitiş tarihi ve kullanım
+sayaçları tek sorguyla okunur:
+- premium: users.is_premium + users.premium_expiry (süresi geçmişse ücretsiz)
+- dolap sayısı: user_wardrobe_stats.clothes (trigger'larla hazır tutulur)
+- günlük kombin: xp_daily özet satırından (bkz. xp_rollup.py)
+
+Sonuç kullanıcı başına ENTITLEMENT_TTL saniye bellekte kalır. Başarılı işlem
+sonrası record() sayacı önbellekte de artırır (write-through), yani limit
+kontrolü her seferinde yeniden saymaz. Birden fazla worker çalışıyorsa
+sapma en fazla TTL kadar sürer.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+ENTITLEMENT_TTL = float(os.getenv("ENTITLEMENT_TTL", "30"))
+CACHE_MAX_USERS = 4096
+
+# Ücretsiz paket limitleri
+FREE_LIMITS = {
+    "upload": 30,   # Dolapta en fazla parça
+    "ai_gen": 1,    # Günde kombin önerisi
+}
+LIMIT_MESSAGES = {
+    "upload": "Free pakette en fazla {limit} kıyafet yükleyebilirsin. Sınırsız dolap için Premium'a geç! 👑",
+    "ai_gen": "Günlük kombin hakkın doldu. Sınırsız stilist için Premium'a geç! 👑",
+}
+
+_QUERY = """
+    SELECT
+        (SELECT is_premium FROM users WHERE username = :u),
+        (SELECT premium_expiry FROM users WHERE username = :u),
+        (SELECT clothes FROM user_wardrobe_stats WHERE username = :u),
+        (SELECT count FROM xp_daily WHERE username = :u AND action_type = 'ai_gen' AND day = :d)
+"""
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class Entitlement:
+    """Kullanıcının anlık hakları (önbellekte tutulan kayıt)."""
+
+    def __init__(self, is_premium, expiry, upload, ai_gen, day):
+        self.is_premium = is_premium
+        self.expiry = expiry
+        self.used = {"upload": upload, "ai_gen": ai_gen}
+        self.day = day
+        self.loaded_at = time.monotonic()
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def _active(is_premium, expiry, day):
+    # Bitiş tarihi yoksa süresiz; o gün dahil geçerli
+    return is_premium == 1 and (not expiry or expiry[:10] >= day)
+
+
+def load(conn, username):
+    """Önbelleğe bakmadan tek sorguyla okur."""
+    day = _today()
+    is_prem, expiry, clothes, ai_gen = conn.execute(_QUERY, {"u": username, "d": day}).fetchone()
+    return Entitlement(_active(is_prem, expiry, day), expiry, clothes or 0, ai_gen or 0, day)
+
+
+def get(db_file, username):
+    """Önbellekteki kayıt (süresi dolduysa veya gün döndüyse veritabanından yeniden okunur)."""
+    with _lock:
+        entry = _cache.get(username)
+    if entry is not None and time.monotonic() - entry.loaded_at < ENTITLEMENT_TTL and entry.day == _today():
+        return entry
+
+    conn = sqlite3.connect(db_file)
+    try:
+        entry = load(conn, username)
+    finally:
+        conn.close()
+    with _lock:
+        if len(_cache) >= CACHE_MAX_USERS and username not in _cache:
+            _cache.pop(next(iter(_cache)))
+        _cache[username] = entry
+    return entry
+
+
+def check(db_file, username, feature):
+    """Dönüş: (izin var mı?, hata mesajı)"""
+    entry = get(db_file, username)
+    if entry.is_premium or feature not in FREE_LIMITS:
+        return True, None
+    limit = FREE_LIMITS[feature]
+    if entry.used[feature] >= limit:
+        return False, LIMIT_MESSAGES[feature].format(limit=limit)
+    return True, None
+
+
+def record(username, feature, amount=1):
+    """Başarılı işlemden sonra önbellekteki sayacı günceller (kayıt yoksa bir sonraki okumada sayılır)."""
+    with _lock:
+        entry = _cache.get(username)
+        if entry is not None and feature in entry.used:
+            entry.used[feature] = max(entry.used[feature] + amount, 0)
+
+
+def invalidate(username=None):
+    """Premium satın alma vb. durumlarda önbelleği boşaltır."""
+    with _lock:
+        if username is None:
+            _cache.clear()
+        else:
+            _cache.pop(username, None)
@@ -0,0 +1,93 @@
+"""
+Yüklenen fotoğrafları arka plan silmeden ÖNCE hazırlar.
+
+- Decompression bomb kontrolü (piksel sayısı, resim çözülmeden önce bakılır)
+- JPEG'lerde draft modu ile küçük ölçekte çözme (12 MP'yi tam açmadan)
+- EXIF yönünü uygular (telefon fotoğrafları yan gelmesin)
+- Image.reduce + thumbnail ile uzun kenarı UPLOAD_MAX_EDGE'e indirir
+- EXIF/GPS vb. tüm metadata'yı atar (yeniden encode edilir)
+"""
+import io
+import os
+
+from PIL import Image, ImageOps
+
+# RMBG-1.4 zaten 1024x1024 girişle çalışır, daha büyüğünü göndermek israf
+UPLOAD_MAX_EDGE = int(os.getenv("UPLOAD_MAX_EDGE", "1024"))
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", str(50_000_000)))
+
+# PIL'in kendi bomba korumasını da aynı sınıra çek
+Image.MAX_IMAGE_PIXELS = UPLOAD_MAX_PIXELS
+
+
+class InvalidImageError(ValueError):
+    """Resim açılamadı veya izin verilen boyutu aşıyor."""
+
+
+def open_prepared(src, max_edge=None):
+    """
+    src: bytes veya dosya benzeri nesne.
+    Dönüş: yönü düzeltilmiş, küçültülmüş, metadata'sız PIL Image (RGB/RGBA).
+    """
+    max_edge = max_edge or UPLOAD_MAX_EDGE
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+
+    try:
+        img = Image.open(src)
+    except Image.DecompressionBombError:
+        raise InvalidImageError("Resim çok büyük.")
+    except Exception:
+        raise InvalidImageError("Geçersiz resim dosyası.")
+
+    w, h = img.size
+    if w * h > UPLOAD_MAX_PIXELS:
+        raise InvalidImageError("Resim çok büyük.")
+
+    # JPEG: decoder'a doğrudan 1/2, 1/4, 1/8 ölçekte çözmesini söyle
+    # (draft, her iki kenarın da istenen boyuttan büyük kalmasını şart koşar)
+    if img.format == "JPEG" and max(w, h) > max_edge:
+        scale = max_edge / max(w, h)
+        img.draft("RGB", (int(w * scale), int(h * scale)))
+
+    try:
+        try:
+            img = ImageOps.exif_transpose(img)
+        except Exception:
+            img.load()
+
+        # reduce P / 1 / I / I;16 modlarını kabul etmez: küçültmeden önce hedef moda çevir
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+        # Büyük adımları ucuz reduce ile, son ayarı thumbnail ile yap
+        factor = max(img.size) // max_edge
+        if factor >= 2:
+            img = img.reduce(factor)
+        if max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    except Image.DecompressionBombError:
+        raise InvalidImageError("Resim çok büyük.")
+    except Exception:
+        # Bozuk/yarım dosya veya desteklenmeyen mod: 500 yerine kullanıcıya anlaşılır hata
+        raise InvalidImageError("Geçersiz resim dosyası.")
+
+    # Kopyalarken info sözlüğü (exif, icc, dpi...) taşınmasın
+    img.info = {}
+    return img
+
+
+def encode(img, quality=90):
+    """Hazırlanmış resmi gönderilecek/saklanacak byte'lara çevirir (metadata'sız)."""
+    buf = io.BytesIO()
+    if img.mode == "RGBA":
+        img.save(buf, format="PNG", optimize=True)
+    else:
+        img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def prepare_upload(src, max_edge=None):
+    """open_prepared + encode. Dönüş: (Image, bytes)"""
+    img = open_prepared(src, max_edge)
+    return img, encode(img)
@@ -0,0 +1,174 @@
+"""
+Çamaşır günlerini hesaba katan çok günlük kombin planlayıcısı.
+
+Günler sırayla simüle edilir:
+- Giyilen parça kirlenir (üst/elbise 1 giyimde, alt WEARS_BEFORE_WASH'taki
+  kadar giyimde; ayakkabı kirlenmez)
+- Çamaşır günü akşamı kirli her şey yıkanır, ertesi gün temizdir
+- Bir parça REPEAT_WINDOW gün içinde tekrar planlanmaz (ayakkabı hariç);
+  temiz parça yetmezse o gün için bu kural gevşetilir
+
+Artımlı planlama: elle düzenlenen gün ve öncesi sabit kalır; sonraki
+otomatik günlerden sadece yeni duruma göre geçersiz hale gelenler
+(kirli/tekrar eden parça) yeniden seçilir, diğerleri aynen korunur.
+"""
+import os
+from datetime import datetime, timedelta
+
+REPEAT_WINDOW = int(os.getenv("SCHEDULE_REPEAT_WINDOW", "3"))
+DEFAULT_LAUNDRY_DAYS = (6,)  # Pazar (datetime.weekday)
+
+# Kaç giyimden sonra kirli sayılır (None: hiç kirlenmez)
+WEARS_BEFORE_WASH = {
+    "ust_giyim": 1,
+    "elbise": 1,
+    "alt_giyim": int(os.getenv("SCHEDULE_BOTTOM_WEARS", "3")),
+    "ayakkabi": None,
+}
+
+
+class WardrobeState:
+    """Simülasyon boyunca her parçanın kirlilik ve son giyilme durumu."""
+
+    def __init__(self, items):
+        self.items = {x["id"]: x for x in items}
+        self.wears = {}
+        self.last_worn = {}
+        for x in items:
+            limit = WEARS_BEFORE_WASH.get(x["category"])
+            # Şu an kirli olanlar ilk çamaşır gününe kadar kirli
+            self.wears[x["id"]] = limit if (limit and x["is_clean"] == 0) else 0
+
+    def is_clean(self, item_id):
+        item = self.items.get(item_id)
+        if item is None:
+            return False
+        limit = WEARS_BEFORE_WASH.get(item["category"])
+        return limit is None or self.wears[item_id] < limit
+
+    def is_available(self, item_id, day, window):
+        if not self.is_clean(item_id):
+            return False
+        if WEARS_BEFORE_WASH.get(self.items[item_id]["category"]) is None:
+            return True
+        last = self.last_worn.get(item_id)
+        return last is None or day - last > window
+
+    def wear(self, item_ids, day):
+        for item_id in item_ids:
+            if item_id in self.items:
+                self.wears[item_id] += 1
+                self.last_worn[item_id] = day
+
+    def wash(self):
+        for item_id in self.wears:
+            self.wears[item_id] = 0
+
+
+def outfit_ids(outfit):
+    return [i for i in (outfit.get("top_id"), outfit.get("bottom_id"), outfit.get("shoe_id")) if i]
+
+
+def _pick(state, day, window, score):
+    """O gün için temiz ve yakın zamanda giyilmemiş parçalardan en uyumlu kombin."""
+    outfit = _pick_from(state, day, window, score)
+    if outfit is None and window > 0:
+        # Tekrar penceresi yüzünden boş kalmasın, temiz olan her şeye bak
+        outfit = _pick_from(state, day, 0, score)
+    return outfit
+
+
+def _pick_from(state, day, window, score):
+    by_cat = {"ust_giyim": [], "alt_giyim": [], "elbise": [], "ayakkabi": []}
+    for x in state.items.values():
+        if x["category"] in by_cat and state.is_available(x["id"], day, window):
+            by_cat[x["category"]].append(x)
+
+    def worn(x):
+        return x["wear_count"] or 0
+
+    # Uyum sadece renge bağlı: her renkten en az giyilmiş parça temsilci olur,
+    # böylece çift araması parça sayısından bağımsız (renk x renk) kalır
+    def by_color(group):
+        reps = {}
+        for x in group:
+            cur = reps.get(x["color_name"])
+            if cur is None or (worn(x), x["id"]) < (worn(cur), cur["id"]):
+                reps[x["color_name"]] = x
+        return list(reps.values())
+
+    best = None
+    for t in by_color(by_cat["ust_giyim"]):
+        for b in by_color(by_cat["alt_giyim"]):
+            # Uyum puanı önce, eşitlikte az giyilmiş parçalar
+            key = (score(t["color_name"], b["color_name"]), -(worn(t) + worn(b)), -t["id"], -b["id"])
+            if best is None or key > best[0]:
+                best = (key, t, b)
+
+    if best:
+        _, main, bottom = best
+    elif by_cat["elbise"]:
+        main, bottom = min(by_cat["elbise"], key=lambda x: (worn(x), x["id"])), None
+    else:
+        return None
+
+    colors = [main["color_name"]] + ([bottom["color_name"]] if bottom else [])
+    shoe = None
+    if by_cat["ayakkabi"]:
+        shoe = max(by_cat["ayakkabi"], key=lambda s: (sum(score(c, s["color_name"]) for c in colors), -worn(s), -s["id"]))
+
+    return {
+        "top_id": main["id"],
+        "bottom_id": bottom["id"] if bottom else 0,
+        "shoe_id": shoe["id"] if shoe else None,
+    }
+
+
+def _valid(state, outfit, day, window):
+    return all(state.items.get(i) is not None and state.is_available(i, day, window) for i in outfit_ids(outfit))
+
+
+def schedule(items, dates, fixed, existing, laundry_days, score_fn, window=None, fill=True):
+    """
+    items    : kullanıcının kıyafetleri (id, category, color_name, is_clean, wear_count)
+    dates    : sıralı "YYYY-MM-DD" listesi (simüle edilecek günler)
+    fixed    : {tarih: kombin} dokunulmayacak günler (elle girilenler, düzenlenen gün ve öncesi)
+    existing : {tarih: kombin} otomatik planlanmış günler; hâlâ geçerliyse korunur
+    fill     : False ise planı olmayan günler boş bırakılır (sadece simüle edilir)
+    Dönüş    : {tarih: kombin} sadece yeni yazılması gereken günler
+               (kombin None ise o gün için uygun parça kalmadı)
+    """
+    window = REPEAT_WINDOW if window is None else window
+    laundry_days = set(DEFAULT_LAUNDRY_DAYS if laundry_days is None else laundry_days)
+    state = WardrobeState([dict(x) for x in items])
+    cache = {}
+
+    def score(c1, c2):
+        if (c1, c2) not in cache:
+            cache[(c1, c2)] = score_fn(c1, c2)
+        return cache[(c1, c2)]
+
+    changes = {}
+    for day, date_str in enumerate(dates):
+        if date_str in fixed:
+            outfit = fixed[date_str]
+        elif date_str in existing and _valid(state, existing[date_str], day, window):
+            outfit = existing[date_str]
+        elif date_str not in existing and not fill:
+            outfit = None
+        else:
+            outfit = _pick(state, day, window, score)
+            changes[date_str] = outfit
+
+        if outfit:
+            state.wear(outfit_ids(outfit), day)
+        if datetime.strptime(date_str, "%Y-%m-%d").weekday() in laundry_days:
+            state.wash()
+
+    return changes
+
+
+def date_range(start, days):
+    """start ("YYYY-MM-DD") dahil days günlük tarih listesi."""
+    first = datetime.strptime(start, "%Y-%m-%d")
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
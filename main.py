@@ -2,31 +2,49 @@ import os
 import sys
 import requests # ✅ API istekleri için şart
 import io
-import uuid
 import sqlite3
 import math
 import colorsys
 import json
 import random
-import bcrypt
 import numpy as np
 import re
 import imagehash 
 import gc
+import hashlib
+import asyncio
 from collections import Counter
 from pydantic import BaseModel
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
 from groq import Groq
 
 # FastAPI Importları
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Depends
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response
 from dotenv import load_dotenv 
 from PIL import Image
+from image_prep import prepare_upload, open_prepared, InvalidImageError
+from upload_ingest import spool_upload, UploadTooLargeError, UPLOAD_MAX_BYTES
+import blob_store
+import static_cache
+import travel_planner
+import laundry_scheduler
+import wardrobe_stats
+import wardrobe_analytics
+import entitlements
+import xp_ledger
+import xp_rollup
+import xp_rank
+import password_hashing
+import throttle
+import session_tokens
+import bulk_import
+import product_meta
+import affiliate_matcher
+import affiliate_stats
 
 # --- AYARLAR ---
 load_dotenv()
@@ -42,13 +60,30 @@ client = Groq(api_key=GROQ_API_KEY)
 HF_TOKEN = os.getenv("HF_TOKEN") # ✅ Şifreyi sunucudan gizlice al
 HF_API_URL = "https://api-inference.huggingface.co/models/briaai/RMBG-1.4"
 
-# --- YARDIMCI FONKSİYONLAR ---
-def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+# --- GİRİŞ DENEMESİ SINIRLARI ---
+# Hash hesaplanmadan önce kontrol edilir (bkz. throttle.py, password_hashing.py)
+# Kova durumu RATE_LIMIT_BACKEND'e göre bellekte veya worker'lar arası ortak SQLite dosyasında
+rate_backend = throttle.make_backend()
+LOGIN_USER_LIMIT = throttle.TokenBucket(capacity=5, rate=1 / 30, backend=rate_backend, name="login:user:")    # Kullanıcı başına: 5 deneme, sonra 30 sn'de 1
+LOGIN_IP_LIMIT = throttle.TokenBucket(capacity=20, rate=1 / 3, backend=rate_backend, name="login:ip:")        # IP başına: 20 deneme, sonra 3 sn'de 1
+REGISTER_IP_LIMIT = throttle.TokenBucket(capacity=5, rate=1 / 60, backend=rate_backend, name="register:ip:")  # IP başına: 5 kayıt, sonra dakikada 1
+
+async def check_throttle(bucket, key):
+    # SQLite kovası dosyaya yazar: event loop'u bekletmesin
+    if bucket.backend.blocking:
+        allowed, retry_after = await asyncio.to_thread(bucket.take, key)
+    else:
+        allowed, retry_after = bucket.take(key)
+    if not allowed:
+        wait = int(retry_after) + 1
+        raise HTTPException(status_code=429, detail=f"Çok fazla deneme yaptın, {wait} saniye sonra tekrar dene.",
+                            headers={"Retry-After": str(wait)})
 
-def get_password_hash(password):
-    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-    return hashed.decode('utf-8')
+async def hash_or_503(coro):
+    try:
+        return await coro
+    except password_hashing.HashBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
 
 class UserLoginSchema(BaseModel):
     username: str
@@ -65,69 +100,155 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- YÜKLEME BOYUT SINIRI ---
+# Content-Length sınırı aşan yüklemeleri gövde okunmadan reddet (multipart parse bile edilmesin)
+UPLOAD_ROUTES = ("/process/", "/user/upload-avatar")
+
+@app.middleware("http")
+async def limit_upload_size(request, call_next):
+    if request.method == "POST" and request.url.path in UPLOAD_ROUTES:
+        length = request.headers.get("content-length")
+        # Form alanları için 1 MB pay bırakıyoruz
+        if length and length.isdigit() and int(length) > UPLOAD_MAX_BYTES + 1024 * 1024:
+            return JSONResponse(status_code=413, content={"detail": "Dosya çok büyük."})
+    return await call_next(request)
+
+# --- İSTEK HIZI SINIRI ---
+# Pahalı / yazan endpoint'ler için route + kullanıcı (token varsa) veya IP başına token bucket (bkz. throttle.RATE_LIMITS)
+rate_limiter = throttle.RateLimiter(backend=rate_backend)
+
+@app.middleware("http")
+async def rate_limit(request, call_next):
+    rule = rate_limiter.rule_for(request.url.path)
+    if rule:
+        auth = request.headers.get("authorization", "")
+        sub = session_tokens.subject(auth[7:]) if auth.lower().startswith("bearer ") else None
+        identity = f"u:{sub}" if sub else f"ip:{throttle.client_ip(request)}"
+        if rate_backend.blocking:
+            allowed, retry_after = await asyncio.to_thread(rate_limiter.take, request.url.path, identity)
+        else:
+            allowed, retry_after = rate_limiter.take(request.url.path, identity)
+        if not allowed:
+            wait = int(retry_after) + 1
+            return JSONResponse(status_code=429, content={"detail": f"Çok hızlısın! {wait} saniye sonra tekrar dene.", "error": "rate_limited"},
+                                headers={"Retry-After": str(wait), "X-RateLimit-Limit": str(rule[0])})
+    return await call_next(request)
+
 # --- DİZİN AYARLARI ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_DIR = os.path.join(BASE_DIR, "static", "uploads") # Static içine aldık düzenli olsun
 DB_FILE = os.path.join(BASE_DIR, "giyim.db") # Standart isim
 
-# Klasör yoksa oluştur
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# --- OTURUM TOKEN'LARI ---
+# Authorization: Bearer <access_token> gelirse kullanıcı token'dan alınır (DB'ye gidilmez).
+# AUTH_REQUIRED=1 olana kadar token'sız eski istemciler username parametresiyle çalışmaya devam eder.
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "0") == "1"
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login", auto_error=False)
+revocations = session_tokens.RevocationList(DB_FILE)
+
+async def current_user(token: str = Depends(oauth2_scheme)):
+    """Geçerli access token varsa TokenUser, token yoksa None. Geçersiz token -> 401"""
+    if not token:
+        return None
+    try:
+        return session_tokens.TokenUser(session_tokens.decode(token, revocations))
+    except session_tokens.TokenError:
+        raise HTTPException(status_code=401, detail="Oturum süresi doldu, tekrar giriş yap.", headers={"WWW-Authenticate": "Bearer"})
+
+def resolve_username(user, username):
+    """Token varsa kullanıcı adı token'dan gelir (parametreye güvenilmez)."""
+    if user is not None:
+        return user.username
+    if AUTH_REQUIRED or not username:
+        raise HTTPException(status_code=401, detail="Giriş yapmalısın.", headers={"WWW-Authenticate": "Bearer"})
+    return username
+
+# Yüklemeler içerik adresli depoda: /static/uploads/<sha256>.png
+# STORAGE_BACKEND=s3 ise dosyalar S3/MinIO'da, değilse UPLOAD_DIR'da durur
+blob_store.configure(UPLOAD_DIR, "/static/uploads/", db=DB_FILE)
+
+# Yüklenen resimler depodan sunulur (/static mount'undan ÖNCE tanımlı olmalı)
+@app.get("/static/uploads/{key}")
+@app.head("/static/uploads/{key}")
+async def get_upload(key: str, request: Request):
+    # İçerik adresli dosya değişmez: ETag eşleşirse depoya hiç gitmeden 304
+    headers = static_cache.blob_headers(key)
+    cached = static_cache.not_modified(request, headers)
+    if cached:
+        return cached
+    path = await asyncio.to_thread(blob_store.local_path, key)
+    if not path:
+        raise HTTPException(status_code=404, detail="Dosya bulunamadı.")
+    return FileResponse(path, headers=headers)
 
 # Static dosyaları bağla
 app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
 
+# index.html ve sw.js açılışta gzip/brotli olarak hazırlanır, ETag ile 304 döner
+INDEX_ASSET = static_cache.PrecompressedAsset(os.path.join(BASE_DIR, "static", "index.html"), "text/html; charset=utf-8")
+SW_ASSET = static_cache.PrecompressedAsset(os.path.join(BASE_DIR, "sw.js"), "application/javascript")
+for asset in (INDEX_ASSET, SW_ASSET):
+    if asset.exists(): asset.refresh()  # brotli quality 11 burada, ilk istekte değil
+
 # --- ✅ ANA SAYFA (RENDER İÇİN SAĞLIK KONTROLÜ) ---
 @app.get("/")
 @app.head("/")
-async def read_root():
-    return FileResponse(os.path.join(BASE_DIR, "static/index.html"))
+async def read_root(request: Request):
+    return await INDEX_ASSET.response(request)
 
 # ---------------------------------------------------------
 # 🚀 ARKA PLAN SİLME FONKSİYONU (HUGGING FACE KULLANIR)
 # ---------------------------------------------------------
-@app.post("/process/")
-async def process_image(
-    file: UploadFile = File(...), 
-    category: str = Form(...), 
-    season: str = Form(...), 
-    style: str = Form(...), 
-    username: str = Form(...),
-    sub_category: str = Form(None)
-): 
-    # 1. Resmi Okuma
-    contents = await file.read()
-    
-    unique_id = str(uuid.uuid4())
-    filename = f"{unique_id}.png"
-    path = os.path.join(UPLOAD_DIR, filename)
-    url = f"/static/uploads/{filename}"
-    color_name = "Bilinmiyor"
-
-    # 2. Hugging Face'e Gönder (Render Yorulmasın)
+def remove_background(img, prepared):
+    """Hazırlanmış resmi Hugging Face'e gönderir. Dönüş: (resim, renk); API hata verirse küçültülmüş orijinal."""
     headers = {"Authorization": f"Bearer {HF_TOKEN}"}
-    
     try:
-        print(f"🌍 Fotoğraf Hugging Face'e gönderiliyor... ({len(contents)} bytes)")
-        response = requests.post(HF_API_URL, headers=headers, data=contents)
+        print(f"🌍 Fotoğraf Hugging Face'e gönderiliyor... ({len(prepared)} bytes)")
+        response = requests.post(HF_API_URL, headers=headers, data=prepared, timeout=60)
         
         if response.status_code == 200:
             print("✅ Temizlenmiş resim alındı!")
             cleaned_img = Image.open(io.BytesIO(response.content))
-            cleaned_img.save(path, format="PNG")
-            
-            # Basit renk analizi (İstersen burayı açabiliriz)
-            # color_name = analyze_clothing_color(cleaned_img) 
-        else:
-            print(f"⚠️ API Hatası ({response.status_code}): Orijinal kaydediliyor.")
-            with open(path, "wb") as f:
-                f.write(contents)
+            return cleaned_img, analyze_clothing_color(cleaned_img)
+        print(f"⚠️ API Hatası ({response.status_code}): Küçültülmüş orijinal kaydediliyor.")
                 
     except Exception as e:
         print(f"🚨 Bağlantı Hatası: {e}")
-        with open(path, "wb") as f:
-            f.write(contents)
+    return img, "Bilinmiyor"
+
+@app.post("/process/")
+async def process_image(
+    file: UploadFile = File(...), 
+    category: str = Form(...), 
+    season: str = Form(...), 
+    style: str = Form(...), 
+    username: str = Form(None),
+    sub_category: str = Form(None),
+    user = Depends(current_user)
+): 
+    # 1. Limit Kontrolü (token'daki premium bilgisi varsa DB'ye gidilmez)
+    username = resolve_username(user, username)
+    if not (user and user.is_premium):
+        allowed, msg = check_limits(username, 'upload')
+        if not allowed:
+            return {"error": msg}
+
+    # 2. Resmi diske parça parça al + Ön İşleme (EXIF yönü, küçültme, metadata temizliği)
+    try:
+        with await spool_upload(file) as upload:
+            # Decode + küçültme CPU işi: event loop'u bloklamasın diye thread'de
+            prepared_img, prepared = await asyncio.to_thread(prepare_upload, upload.path)
+    except (UploadTooLargeError, InvalidImageError) as e:
+        return {"error": str(e)}
+
+    # 3. Hugging Face'e Gönder (Render Yorulmasın) - istek thread'de, event loop beklemesin
+    final_img, color_name = await asyncio.to_thread(remove_background, prepared_img, prepared)
 
-    # 3. Veritabanına Kayıt
+    # Aynı içerik daha önce kaydedildiyse diske tekrar yazılmaz
+    key = await asyncio.to_thread(blob_store.put_image, final_img, "PNG", optimize=True)
+    url = blob_store.url_for(key)
+
+    # 4. Veritabanına Kayıt
     try:
         conn = sqlite3.connect(DB_FILE)
         # Tablo yoksa oluştur
@@ -142,17 +263,13 @@ async def process_image(
                     (username, url, category, season, style, color_name, sub_category, '0'))
         conn.commit()
         conn.close()
+        entitlements.record(username, 'upload')
     except Exception as db_e:
         print(f"DB Hatası: {db_e}")
         return {"error": "Veritabanı hatası."}
     
-    # 4. XP Verme (Basit)
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.execute("UPDATE users SET xp = xp + 5 WHERE username = ?", (username,))
-        conn.commit()
-        conn.close()
-    except: pass
+    # 5. XP Verme
+    await update_user_xp(username, 5, "upload")
 
     return {"url": url, "color": color_name, "message": "Kıyafet eklendi! (+5 XP)"}
 
@@ -174,8 +291,10 @@ class OutfitSchema(BaseModel):
 
 class WearConfirmSchema(BaseModel):
     top_id: int
-    bottom_id: int
+    bottom_id: int = None  # Elbisede boş
     shoe_id: int = None
+    accessory_ids: list[int] = []
+    username: str = None
 
 class TravelRequest(BaseModel):
     days: int
@@ -196,6 +315,7 @@ class ItemUpdateSchema(BaseModel):
     season: str
     style: str
     sub_category: str = None
+    price: float = None  # Giyim başına maliyet için (opsiyonel)
 
 class ShareSchema(BaseModel):
     user_name: str
@@ -204,6 +324,9 @@ class ShareSchema(BaseModel):
     bottom_id: int
     shoe_id: int = None
 
+class RefreshTokenSchema(BaseModel):
+    refresh_token: str
+
 class UserRegisterSchema(BaseModel):
     full_name: str
     username: str
@@ -233,6 +356,14 @@ class CommentSchema(BaseModel):
 class WashListSchema(BaseModel):
     item_ids: list[int]
 
+class ScheduleSchema(BaseModel):
+    username: str
+    start_date: str = None       # Varsayılan: yarın
+    days: int = 7
+    laundry_days: list[int] = None  # 0=Pazartesi ... 6=Pazar
+    repeat_window: int = None
+    season: str = None
+
 def calculate_league(xp):
     xp = xp or 0
     if xp >= 1500:
@@ -250,15 +381,19 @@ def calculate_league(xp):
         percent = int((xp / 150) * 100)
         return {"name": "Bronz Ligi", "icon": "🥉", "class": "bronze", "next_xp": needed, "progress": percent}
 
-def update_user_xp(username, points):
-    """Kullanıcıya XP kazandırır"""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.execute("UPDATE users SET xp = xp + ? WHERE username = ?", (points, username))
-        conn.commit()
-        conn.close()
-    except:
-        pass
+# XP olayları bellekte toplanıp arka planda toplu yazılır (bkz. xp_ledger.py)
+# Lig sıralama indeksi bellekte tutulur, her XP flush'ından sonra güncellenir (bkz. xp_rank.py)
+league_board = xp_rank.LeagueBoard(DB_FILE, calculate_league)
+def daily_maintenance(conn):
+    """Günde bir kez (XP thread'inde): eski xp_logs satırları ve kaydı hiç yazılmamış yetim blob'lar"""
+    xp_rollup.compact(conn)
+    blob_store.sweep(conn)
+
+xp_log = xp_ledger.XPLedger(DB_FILE, calculate_league, daily_job=daily_maintenance, on_flush=league_board.apply)
+
+async def update_user_xp(username, points, action_type):
+    """Kullanıcıya XP kazandırır. Dönüş: verilen XP (günlük limit dolduysa 0)"""
+    return await xp_log.add_async(username, action_type, points)
 
 def calculate_compatibility_score(color1, color2):
     COLOR_HARMONY = {
@@ -355,6 +490,101 @@ def init_db():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )''')
 
+    # Blob referans sayımı url üzerinden yapılıyor
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clothes_url ON clothes(url)")
+
+    # 5. DELTA SYNC (Dolap değişiklik sayacı)
+    # Her kullanıcının dolabı için artan bir sürüm numarası tutulur. clothes'a
+    # yapılan her INSERT/UPDATE/DELETE trigger ile sayacı artırır ve satıra
+    # yazar; silinenler mezar taşı (tombstone) olarak kalır.
+    for col in ("row_version INTEGER DEFAULT 0", "created_version INTEGER DEFAULT 0"):
+        try: cursor.execute(f"ALTER TABLE clothes ADD COLUMN {col}")
+        except sqlite3.OperationalError: pass
+    cursor.execute('''CREATE TABLE IF NOT EXISTS clothes_sync_state (username TEXT PRIMARY KEY, version INTEGER DEFAULT 0)''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS clothes_tombstones (id INTEGER PRIMARY KEY, username TEXT, version INTEGER)''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clothes_user_version ON clothes(username, row_version)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tombstones_user_version ON clothes_tombstones(username, version)")
+
+    bump = "INSERT INTO clothes_sync_state (username, version) VALUES ({u}, 1) ON CONFLICT(username) DO UPDATE SET version = version + 1;"
+    current = "(SELECT version FROM clothes_sync_state WHERE username = {u})"
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_clothes_sync_insert AFTER INSERT ON clothes BEGIN
+        {bump.format(u="NEW.username")}
+        UPDATE clothes SET row_version = {current.format(u="NEW.username")}, created_version = {current.format(u="NEW.username")} WHERE id = NEW.id;
+        DELETE FROM clothes_tombstones WHERE id = NEW.id;
+    END''')
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_clothes_sync_update AFTER UPDATE ON clothes
+        WHEN NEW.row_version IS OLD.row_version BEGIN
+        {bump.format(u="NEW.username")}
+        UPDATE clothes SET row_version = {current.format(u="NEW.username")} WHERE id = NEW.id;
+    END''')
+    # Kullanıcı adı değişince eski adın istemcisi için parça silinmiş sayılır
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_clothes_sync_move AFTER UPDATE OF username ON clothes
+        WHEN NEW.username IS NOT OLD.username BEGIN
+        {bump.format(u="OLD.username")}
+        INSERT OR REPLACE INTO clothes_tombstones (id, username, version) VALUES (OLD.id, OLD.username, {current.format(u="OLD.username")});
+    END''')
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_clothes_sync_delete AFTER DELETE ON clothes BEGIN
+        {bump.format(u="OLD.username")}
+        INSERT OR REPLACE INTO clothes_tombstones (id, username, version) VALUES (OLD.id, OLD.username, {current.format(u="OLD.username")});
+    END''')
+
+    # 6. HAFTALIK PLANLAYICI
+    # is_auto = 1: planlayıcının yazdığı gün (yeniden planlanabilir), 0: kullanıcının seçtiği
+    try: cursor.execute("ALTER TABLE planned_outfits ADD COLUMN is_auto INTEGER DEFAULT 0")
+    except sqlite3.OperationalError: pass
+    cursor.execute('''CREATE TABLE IF NOT EXISTS schedule_settings (username TEXT PRIMARY KEY, laundry_days TEXT, repeat_window INTEGER, season TEXT)''')
+
+    # 7. HAZIR İSTATİSTİKLER (user_wardrobe_stats + trigger'lar)
+    wardrobe_stats.install(cursor)
+
+    # 8. ANALİTİK (giyim başına maliyet için fiyat, kullanıcı bazlı log taraması için indeks)
+    try: cursor.execute("ALTER TABLE clothes ADD COLUMN price REAL")
+    except sqlite3.OperationalError: pass
+    # Analitik log'u kullanıcı + id sırasıyla (artımlı) okur; indeks bütün okunan sütunları kapsar
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_wear_logs_user_id ON wear_logs(username, id, wear_date, top_id, bottom_id, shoe_id)")
+
+    # 9. GİYİM KAYDI PARÇALARI (wear_logs <-> clothes)
+    # Her giyimde giyilen bütün parçalar (aksesuar ve elbise dahil) burada satır olur.
+    # clothes.wear_count bu tablodan türetilir: satır eklenince/silinince trigger günceller.
+    is_new = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'wear_log_items'").fetchone() is None
+    cursor.execute('''CREATE TABLE IF NOT EXISTS wear_log_items (log_id INTEGER NOT NULL, item_id INTEGER NOT NULL, PRIMARY KEY (log_id, item_id)) WITHOUT ROWID''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_wear_log_items_item ON wear_log_items(item_id, log_id)")
+    if is_new:
+        # Tek seferlik taşıma: eski sabit sütunlardan doldur, sayaçları log'a göre yeniden hesapla
+        for col in ("top_id", "bottom_id", "shoe_id"):
+            cursor.execute(f"INSERT OR IGNORE INTO wear_log_items (log_id, item_id) SELECT id, {col} FROM wear_logs WHERE {col} > 0")
+        cursor.execute("UPDATE clothes SET wear_count = (SELECT COUNT(*) FROM wear_log_items WHERE item_id = clothes.id)")
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_wear_items_insert AFTER INSERT ON wear_log_items BEGIN
+        UPDATE clothes SET wear_count = COALESCE(wear_count, 0) + 1 WHERE id = NEW.item_id;
+    END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_wear_items_delete AFTER DELETE ON wear_log_items BEGIN
+        UPDATE clothes SET wear_count = MAX(COALESCE(wear_count, 0) - 1, 0) WHERE id = OLD.item_id;
+    END''')
+
+    # 10. PREMIUM HAKLARI (entitlements tek sorguda okur)
+    for col in ("is_premium INTEGER DEFAULT 0", "premium_expiry TEXT"):
+        try: cursor.execute(f"ALTER TABLE users ADD COLUMN {col}")
+        except sqlite3.OperationalError: pass
+    cursor.execute('''CREATE TABLE IF NOT EXISTS xp_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, action_type TEXT, xp_amount INTEGER, log_date TEXT)''')
+    # Günlük sayımlar xp_daily özet tablosundan okunur (bkz. xp_rollup.py)
+    cursor.execute("DROP INDEX IF EXISTS idx_xp_logs_user_action_date")
+    xp_rollup.install(cursor)
+
+    # 11. İPTAL EDİLEN TOKEN'LAR (bkz. session_tokens.py)
+    revocations.install(cursor)
+
+    # 12. ÜRÜN LİNKİ ÖNBELLEĞİ (bkz. product_meta.py)
+    product_meta.install(cursor)
+
+    # 13. AFFILIATE ANAHTAR KELİME OTOMATI SÜRÜMÜ (bkz. affiliate_matcher.py)
+    affiliate_matcher.install(cursor)
+
+    # 14. AFFILIATE GÖSTERİM / TIKLAMA GÜNLÜK ÖZETİ (bkz. affiliate_stats.py)
+    affiliate_stats.install(cursor)
+
+    # 15. BLOB REFERANS SAYILARI (bkz. blob_store.py)
+    blob_store.install(cursor)
+
     conn.commit()
     conn.close()
 
@@ -425,66 +655,24 @@ def is_duplicate_image(username, img_obj):
 
 def check_daily_xp_cap(username, action_type, limit=5):
     """
-    Kullanıcının o gün o işlemden kaç kez puan kazandığını sayar.
+    Kullanıcının o gün o işlemden kaç kez puan kazandığını sayar (bellekteki sayaçtan).
     """
-    today = datetime.now().strftime("%Y-%m-%d")
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT COUNT(*) FROM xp_logs WHERE username = ? AND action_type = ? AND log_date = ?", 
-                   (username, action_type, today))
-    count = cursor.fetchone()[0]
-    conn.close()
-    
-    return count < limit # Limit aşılmadıysa True döner
+    return xp_log.count_today(username, action_type) < limit # Limit aşılmadıysa True döner
 
 # --- PREMIUM KONTROL SİSTEMİ ---
 
 def check_premium_status(username):
-    """Kullanıcının Premium olup olmadığını döner"""
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    row = c.execute("SELECT is_premium FROM users WHERE username = ?", (username,)).fetchone()
-    conn.close()
-    return row and row[0] == 1
+    """Kullanıcının Premium olup olmadığını döner (bitiş tarihi geçmişse False)"""
+    return entitlements.get(DB_FILE, username).is_premium
 
 def check_limits(username, feature_type):
     """
     Özelliğe göre limit kontrolü yapar.
     feature_type: 'upload' (Dolap Limiti) veya 'ai_gen' (Kombin Limiti)
     Dönüş: (İzin Var mı?, Hata Mesajı)
+    Premium durumu ve sayaçlar tek sorguyla okunur, kısa süre önbellekte kalır.
     """
-    is_prem = check_premium_status(username)
-    
-    # Eğer Premium ise sınır yok!
-    if is_prem:
-        return True, None
-
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    if feature_type == 'upload':
-        # FREE LİMİTİ: 30 Parça
-        count = c.execute("SELECT COUNT(*) FROM clothes WHERE username = ?", (username,)).fetchone()[0]
-        limit = 30
-        if count >= limit:
-            conn.close()
-            return False, f"Free pakette en fazla {limit} kıyafet yükleyebilirsin. Sınırsız dolap için Premium'a geç! 👑"
-
-    elif feature_type == 'ai_gen':
-        # FREE LİMİTİ: Günde 1 Kombin
-        today = datetime.now().strftime("%Y-%m-%d")
-        # xp_logs tablosunu kullanarak sayaç yapabiliriz veya basitçe o anlık kontrol
-        # Şimdilik basit tutalım, log tablosundan sayalım (action_type='ai_gen' diye kaydedeceğiz)
-        count = c.execute("SELECT COUNT(*) FROM xp_logs WHERE username = ? AND action_type = 'ai_gen' AND log_date = ?", 
-                          (username, today)).fetchone()[0]
-        limit = 1
-        if count >= limit:
-            conn.close()
-            return False, "Günlük kombin hakkın doldu. Sınırsız stilist için Premium'a geç! 👑"
-            
-    conn.close()
-    return True, None
+    return entitlements.check(DB_FILE, username, feature_type)
 
 
 @app.get("/favicon.ico")
@@ -503,13 +691,32 @@ async def get_manifest():
     return {"error": "manifest.json dosyası bulunamadı"}
 
 @app.get("/sw.js")
-async def get_sw():
-    sw_path = os.path.join(BASE_DIR, "sw.js")
-    
-    if os.path.exists(sw_path):
-        return FileResponse(sw_path, media_type="application/javascript")
+async def get_sw(request: Request):
+    if SW_ASSET.exists():
+        return await SW_ASSET.response(request)
     return {"error": "sw.js dosyası bulunamadı"}
 
+# --- OFFLINE ÖNBELLEK LİSTESİ (service worker bunu precache eder) ---
+@app.get("/precache-manifest.json")
+async def get_precache_manifest(request: Request, username: str = None):
+    urls = ["/"]
+    if os.path.exists(os.path.join(BASE_DIR, "manifest.json")): urls.append("/manifest.json")
+    if os.path.exists(os.path.join(BASE_DIR, "static", "logo.png")): urls.append("/favicon.ico")
+    if username:
+        conn = sqlite3.connect(DB_FILE)
+        rows = conn.execute("SELECT url FROM clothes WHERE username = ? ORDER BY id", (username,)).fetchall()
+        avatar = conn.execute("SELECT avatar_url FROM users WHERE username = ?", (username,)).fetchone()
+        conn.close()
+        urls += [r[0] for r in rows if r[0]]
+        if avatar and avatar[0]: urls.append(avatar[0])
+        urls = list(dict.fromkeys(urls))
+
+    # Sürüm: index.html'in içeriği + liste; biri değişince SW yeni önbellek kurar
+    await INDEX_ASSET.ensure_fresh()
+    version_src = INDEX_ASSET.variants["identity"][1] + "\n".join(urls)
+    version = hashlib.sha256(version_src.encode("utf-8")).hexdigest()[:16]
+    return static_cache.json_response(request, {"version": version, "urls": urls})
+
 @app.get("/fix_database_now")
 async def fix_database_now():
     conn = sqlite3.connect(DB_FILE)
@@ -581,6 +788,11 @@ async def fix_database_now():
         # Affiliate tablosunu da garantiye alalım
         conn.execute('''CREATE TABLE IF NOT EXISTS affiliate_links (id INTEGER PRIMARY KEY AUTOINCREMENT, keyword TEXT UNIQUE, link TEXT, click_count INTEGER DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
 
+        # --- 4. GİYİM SAYAÇLARINI LOG'DAN, HAZIR İSTATİSTİKLERİ BAŞTAN HESAPLA ---
+        conn.execute("UPDATE clothes SET wear_count = (SELECT COUNT(*) FROM wear_log_items WHERE item_id = clothes.id)")
+        conn.commit()
+        log.append(f"İstatistikler yeniden hesaplandı ({wardrobe_stats.rebuild(conn)} kullanıcı)")
+
         conn.commit()
         return {"durum": "TAMAMLANDI", "yapilan_islemler": log}
     
@@ -590,17 +802,18 @@ async def fix_database_now():
         conn.close()
 
 @app.post("/user/register")
-async def register_user(user: UserRegisterSchema):
+async def register_user(user: UserRegisterSchema, request: Request):
+    await check_throttle(REGISTER_IP_LIMIT, throttle.client_ip(request))
+    # Şifreyi hashle (kriptola) - event loop dışında
+    hashed_pw = await hash_or_503(password_hashing.hash_password(user.password))
+
     conn = sqlite3.connect(DB_FILE)
     try:
-        # Şifreyi hashle (kriptola)
-        hashed_pw = get_password_hash(user.password)
-        
-        conn.execute("INSERT INTO users (username, full_name, email, city, gender, xp, password_hash) VALUES (?, ?, ?, ?, ?, 0, ?)", 
+        cur = conn.execute("INSERT INTO users (username, full_name, email, city, gender, xp, password_hash) VALUES (?, ?, ?, ?, ?, 0, ?)", 
                      (user.username, user.full_name, user.email, user.city, user.gender, hashed_pw))
         conn.commit()
         conn.close()
-        return {"status": "success"}
+        return {"status": "success", **session_tokens.issue(user.username, cur.lastrowid, False)}
     except sqlite3.IntegrityError:
         conn.close()
         raise HTTPException(status_code=400, detail="Bu kullanıcı adı zaten alınmış.")
@@ -629,15 +842,21 @@ async def update_user(data: UserUpdateSchema):
 
 @app.post("/user/upload-avatar")
 async def upload_avatar(file: UploadFile = File(...), username: str = Form(...)):
-    unique_id = str(uuid.uuid4()); path = os.path.join(UPLOAD_DIR, f"avatar_{unique_id}.jpg")
-    img = Image.open(io.BytesIO(await file.read())).convert("RGB")
+    try:
+        with await spool_upload(file) as upload:
+            img = (await asyncio.to_thread(open_prepared, upload.path, max_edge=600)).convert("RGB")
+    except (UploadTooLargeError, InvalidImageError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     w, h = img.size; new_size = min(w, h)
     img = img.crop(((w-new_size)/2, (h-new_size)/2, (w+new_size)/2, (h+new_size)/2))
-    img.thumbnail((300, 300)); img.save(path, quality=85)
-    url = f"/uploads/avatar_{unique_id}.jpg"
+    img.thumbnail((300, 300))
+    url = blob_store.url_for(await asyncio.to_thread(blob_store.put_image, img, "JPEG", quality=85))
     conn = sqlite3.connect(DB_FILE)
+    old = conn.execute("SELECT avatar_url FROM users WHERE username = ?", (username,)).fetchone()
     conn.execute("UPDATE users SET avatar_url = ? WHERE username = ?", (url, username))
-    conn.commit(); conn.close()
+    conn.commit()
+    if old and old[0] != url: blob_store.release(conn, [old[0]])
+    conn.close()
     return {"status": "success", "avatar_url": url}
 
 @app.get("/user/search")
@@ -664,7 +883,7 @@ async def get_user_profile_stats(username: str, viewer: str = None):
     # --- get_user_profile_stats fonksiyonunun return kısmı ---
     
     # Lig Hesapla
-    user_xp = user_row['xp'] if user_row['xp'] else 0
+    user_xp = (user_row['xp'] or 0) + xp_log.pending_xp(username)
     league_info = calculate_league(user_xp)
 
     return { 
@@ -695,7 +914,7 @@ async def get_following_list(username: str):
     return rows
 
 @app.get("/social/feed")
-async def get_social_feed(username: str = None):
+async def get_social_feed(request: Request, username: str = None):
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
     try:
@@ -737,7 +956,8 @@ async def get_social_feed(username: str = None):
             
             results.append(item)
             
-        return results
+        # ETag'li döner: service worker değişmediyse 304 alır
+        return static_cache.json_response(request, results)
 
     except Exception as e:
         print(f"FEED HATASI: {e}")
@@ -755,6 +975,51 @@ async def get_leaderboard():
     except: return []
     finally: conn.close()
 
+@app.get("/leaderboard/xp")
+async def get_xp_leaderboard(period: str = "week", limit: int = 20):
+    """Haftalık / aylık en çok XP kazananlar (xp_daily özetlerinden)."""
+    try:
+        start, end = xp_rollup.period_range(period)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="period 'week' veya 'month' olmalı")
+    conn = sqlite3.connect(DB_FILE); conn.row_factory = sqlite3.Row
+    try:
+        rows = xp_rollup.leaderboard(conn, start, end, max(1, min(limit, 100)))
+        users = {}
+        if rows:
+            names = [r[0] for r in rows]
+            for u in conn.execute(f"SELECT username, full_name, avatar_url FROM users WHERE username IN ({','.join('?' * len(names))})", names):
+                users[u["username"]] = dict(u)
+        return {"period": period, "start": start, "end": end, "leaders": [
+            {"rank": i + 1, "username": r[0], "xp": r[1],
+             "full_name": users.get(r[0], {}).get("full_name"), "avatar_url": users.get(r[0], {}).get("avatar_url")}
+            for i, r in enumerate(rows)]}
+    finally: conn.close()
+
+@app.get("/leaderboard/league")
+async def get_league_leaderboard(username: str, period: str = "all", limit: int = 20):
+    """Kullanıcının ligindeki ilk N ve kendi sırası (bellekteki sıralama indeksinden)."""
+    if period not in xp_rank.PERIODS:
+        raise HTTPException(status_code=400, detail="period 'all', 'week' veya 'month' olmalı")
+    # İlk çağrıda / süresi dolunca indeks kurulur; event loop'u bekletmesin
+    result = await asyncio.to_thread(league_board.standing, username, period, max(1, min(limit, 100)))
+    if result["league"] is None:
+        return {"error": "User not found"}
+
+    conn = sqlite3.connect(DB_FILE); conn.row_factory = sqlite3.Row
+    try:
+        names = [x["username"] for x in result["leaders"]]
+        users = {}
+        if names:
+            for u in conn.execute(f"SELECT username, full_name, avatar_url FROM users WHERE username IN ({','.join('?' * len(names))})", names):
+                users[u["username"]] = u
+        for x in result["leaders"]:
+            u = users.get(x["username"])
+            x["full_name"] = u["full_name"] if u else None
+            x["avatar_url"] = u["avatar_url"] if u else None
+    finally: conn.close()
+    return {"period": period, **result}
+
 @app.get("/duel/pair")
 async def get_duel_pair(username: str):
     conn = sqlite3.connect(DB_FILE); conn.row_factory = sqlite3.Row
@@ -770,8 +1035,8 @@ async def vote_duel(winner_id: int = Form(...)):
         post = conn.execute("SELECT username_handle FROM social_feed WHERE id = ?", (winner_id,)).fetchone()
         if post:
             conn.execute("UPDATE social_feed SET duel_wins = duel_wins + 1 WHERE id = ?", (winner_id,))
-            conn.execute("UPDATE users SET xp = xp + 3 WHERE username = ?", (post['username_handle'],))
             conn.commit()
+            await update_user_xp(post['username_handle'], 3, "duel_win")
     except Exception as e: print(e)
     finally: conn.close()
     return {"status": "voted"}
@@ -818,7 +1083,7 @@ def get_showcase_items(showcase_type: str, username: str):
     finally:
         conn.close()
 @app.get("/clothes/")
-async def get_clothes(username: str):
+async def get_clothes(username: str, request: Request):
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
@@ -826,19 +1091,63 @@ async def get_clothes(username: str):
         c.execute("SELECT * FROM clothes WHERE username = ? ORDER BY id DESC", (username,))
         rows = c.fetchall()
     
-        return [dict(row) for row in rows]
+        return static_cache.json_response(request, [dict(row) for row in rows])
     except Exception as e:
         print(f"Listeleme Hatası: {e}")
         return []
     finally:
         conn.close()
 
+@app.get("/clothes/sync")
+async def sync_clothes(username: str, request: Request, since: int = 0):
+    """
+    Dolap delta senkronu. İstemci elindeki sürümü (since) gönderir;
+    sadece o sürümden sonra eklenen/güncellenen/silinen parçalar döner.
+    Hiçbir şey değişmediyse 304.
+    """
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute("SELECT version FROM clothes_sync_state WHERE username = ?", (username,)).fetchone()
+        version = row["version"] if row else 0
+        headers = {"ETag": f'"v{version}"', "Cache-Control": "no-cache"}
+
+        if since == version or static_cache.not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+
+        # İstemcinin sürümü sunucudakinden ileride ise (DB sıfırlandı vb.) baştan gönder
+        full = since <= 0 or since > version
+        if full:
+            since = 0
+
+        rows = conn.execute("SELECT * FROM clothes WHERE username = ? AND row_version > ? ORDER BY id DESC", (username, since)).fetchall()
+        inserted = [dict(r) for r in rows if (r["created_version"] or 0) > since]
+        updated = [dict(r) for r in rows if (r["created_version"] or 0) <= since]
+        deleted = [] if full else [r["id"] for r in conn.execute(
+            "SELECT id FROM clothes_tombstones WHERE username = ? AND version > ?", (username, since)).fetchall()]
+
+        # Trigger'lardan önce eklenmiş (row_version = 0) eski kayıtlar tam senkronda gelsin
+        if full:
+            legacy = conn.execute("SELECT * FROM clothes WHERE username = ? AND COALESCE(row_version, 0) = 0 ORDER BY id DESC", (username,)).fetchall()
+            inserted += [dict(r) for r in legacy]
+
+        body = {"version": version, "full": full, "inserted": inserted, "updated": updated, "deleted": deleted}
+        return JSONResponse(content=body, headers=headers)
+    finally:
+        conn.close()
+
 @app.delete("/clothes/{item_id}")
 async def delete_item(item_id: int):
     conn = sqlite3.connect(DB_FILE)
+    row = conn.execute("SELECT url, username FROM clothes WHERE id = ?", (item_id,)).fetchone()
     conn.execute("DELETE FROM clothes WHERE id = ?", (item_id,))
     conn.execute("DELETE FROM saved_outfits WHERE top_id = ? OR bottom_id = ? OR shoe_id = ?", (item_id, item_id, item_id))
-    conn.commit(); conn.close()
+    conn.commit()
+    # Başka hiçbir kayıt kullanmıyorsa dosyayı da sil (yetim dosya kalmasın)
+    if row:
+        blob_store.release(conn, [row[0]])
+        entitlements.record(row[1], 'upload', -1)
+    conn.close()
     return {"status": "deleted"}
 
 @app.post("/clothes/update")
@@ -847,6 +1156,8 @@ async def update_clothing_item(data: ItemUpdateSchema):
     try:
         conn.execute("UPDATE clothes SET category = ?, season = ?, style = ?, sub_category = ? WHERE id = ?", 
                      (data.category, data.season, data.style, data.sub_category, data.id))
+        if data.price is not None:
+            conn.execute("UPDATE clothes SET price = ? WHERE id = ?", (data.price if data.price > 0 else None, data.id))
         conn.commit()
         return {"status": "success", "message": "Parça başarıyla güncellendi."}
     except Exception as e:
@@ -854,98 +1165,16 @@ async def update_clothing_item(data: ItemUpdateSchema):
     finally:
         conn.close()
 
-@app.post("/process/")
-async def process_image(
-    file: UploadFile = File(...), 
-    category: str = Form(...), 
-    season: str = Form(...), 
-    style: str = Form(...), 
-    username: str = Form(...),
-    sub_category: str = Form(None)
-): 
-    # 1. Limit Kontrolü
-    allowed, msg = check_limits(username, 'upload')
-    if not allowed:
-        return {"error": msg}
-    
-    # 2. Dosya Yolları Hazırla
-    unique_id = str(uuid.uuid4())
-    filename = f"{unique_id}.png"
-    upload_folder = os.path.join(base_path, "static", "uploads")
-    os.makedirs(upload_folder, exist_ok=True)
-    path = os.path.join(upload_folder, filename)
-    url = f"/static/uploads/{filename}"
-    color_name = "Bilinmiyor"
-
-    # 3. Resmi Oku
-    try:
-        contents = await file.read()
-        
-        # --- 🌍 HUGGING FACE API ---
-        # Dünyanın en iyi modellerinden biri: RMBG-1.4
-        API_URL = "https://api-inference.huggingface.co/models/briaai/RMBG-1.4"
-        headers = {"Authorization": f"Bearer {HF_TOKEN}"}
-
-        print("🌍 Fotoğraf Hugging Face'e gönderiliyor...")
-        
-        # API'ye Gönder
-        response = requests.post(API_URL, headers=headers, data=contents)
-        
-        if response.status_code == 200:
-            print("✅ Temizlenmiş resim alındı! (API Başarılı)")
-            cleaned_img = Image.open(io.BytesIO(response.content))
-            
-            # Rengi Analiz Et
-            color_name = analyze_clothing_color(cleaned_img)
-            
-            # Kaydet
-            cleaned_img.save(path, format="PNG")
-        else:
-            print(f"⚠️ API Hatası ({response.status_code}): {response.text}")
-            print("⚠️ Orijinal resim kaydediliyor...")
-            # Hata varsa orijinali kaydet (Kullanıcı mağdur olmasın)
-            with open(path, "wb") as f:
-                f.write(contents)
-                
-    except Exception as e:
-        print(f"🚨 Kritik Hata: {str(e)}")
-        # En kötü durumda orijinali kaydet
-        with open(path, "wb") as f:
-            f.write(contents)
-
-    # 4. Veritabanına Kayıt
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        # Tablo yoksa oluştur (Garanti olsun)
-        conn.execute('''CREATE TABLE IF NOT EXISTS clothes 
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                      username TEXT, url TEXT, category TEXT, 
-                      season TEXT, style TEXT, color_name TEXT, 
-                      wear_count INTEGER DEFAULT 0, is_clean INTEGER DEFAULT 1, 
-                      sub_category TEXT, image_hash TEXT)''')
-        
-        conn.execute("INSERT INTO clothes (username, url, category, season, style, color_name, wear_count, is_clean, sub_category, image_hash) VALUES (?, ?, ?, ?, ?, ?, 0, 1, ?, ?)", 
-                    (username, url, category, season, style, color_name, sub_category, '0'))
-        conn.commit()
-        conn.close()
-    except Exception as db_e:
-        print(f"Veritabanı Hatası: {db_e}")
-        return {"error": "Veritabanı hatası oluştu."}
-    
-    # 5. XP İşlemleri
-    message = "Kıyafet eklendi!"
-    update_user_xp(username, 5)
-    message += " (+5 XP)"
-
-    return {"url": url, "color": color_name, "message": message}
-    
 @app.get("/recommend/")
-async def recommend_outfit(season: str, style: str, username: str, event: str = None, outfit_type: str = "normal", force: bool = False):
+async def recommend_outfit(season: str, style: str, username: str = None, event: str = None, outfit_type: str = "normal", force: bool = False, user = Depends(current_user)):
+    username = resolve_username(user, username)
     
     # --- 1. PREMIUM LİMİT KONTROLÜ (YENİ EKLENEN KISIM) ---
-    allowed, msg = check_limits(username, 'ai_gen')
-    if not allowed:
-        return {"error": msg} # Frontend bu hatayı görünce uyarı verecek
+    # Token'da premium yazıyorsa DB'ye hiç gidilmez
+    if not (user and user.is_premium):
+        allowed, msg = check_limits(username, 'ai_gen')
+        if not allowed:
+            return {"error": msg} # Frontend bu hatayı görünce uyarı verecek
     # ------------------------------------------------------
 
     conn = sqlite3.connect(DB_FILE)
@@ -1012,6 +1241,7 @@ async def recommend_outfit(season: str, style: str, username: str, event: str =
                          (username, 'ai_gen', 0, today))
             conn.commit()
             conn.close()
+            entitlements.record(username, 'ai_gen')
         except Exception as e:
             print(f"Log Hatası: {e}")
         # -----------------------------------------------------------
@@ -1034,7 +1264,7 @@ async def save_outfit(outfit: OutfitSchema):
     conn = sqlite3.connect(DB_FILE)
     conn.execute("INSERT INTO saved_outfits (username, top_id, bottom_id, shoe_id) VALUES (?, ?, ?, ?)", (outfit.username, outfit.top_id, outfit.bottom_id, outfit.shoe_id))
     conn.commit(); conn.close()
-    update_user_xp(outfit.username, 2)
+    await update_user_xp(outfit.username, 2, "save_outfit")
     return {"status": "saved"}
 
 @app.get("/outfits/")
@@ -1074,7 +1304,9 @@ async def add_to_calendar(plan: PlanSchema):
     conn.execute("INSERT INTO user_plans (username, type, title, data) VALUES (?, ?, ?, ?)", (plan.username, 'calendar', title, json.dumps(plan_data)))
     conn.commit(); conn.close()
     
-    return {"status": "planned"}
+    # Haftalık planlayıcı kullanılıyorsa sadece bu değişiklikten etkilenen sonraki günleri yeniden planla
+    replanned = replan_after_edit(plan.username, plan.date_str)
+    return {"status": "planned", "replanned": replanned}
 @app.get("/calendar/check/{username}/{date_str}")
 async def check_calendar(username: str, date_str: str):
     conn = sqlite3.connect(DB_FILE); conn.row_factory = sqlite3.Row; cur = conn.cursor()
@@ -1083,6 +1315,104 @@ async def check_calendar(username: str, date_str: str):
     if row: return dict(row)
     return {"empty": True}
 
+CALENDAR_MAX_RANGE_DAYS = 62
+
+@app.get("/calendar/range/{username}")
+async def get_calendar_range(username: str, start: str, end: str):
+    """
+    Tarih aralığındaki (dahil) tüm planları TEK sorguda döner.
+    Haftalık/aylık görünüm için günde bir /calendar/check çağırmaya gerek kalmaz.
+    Sorgu (username, plan_date) UNIQUE indeksini kullanır.
+    """
+    try:
+        start_dt = datetime.strptime(start, "%Y-%m-%d")
+        end_dt = datetime.strptime(end, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Tarih formatı YYYY-MM-DD olmalı.")
+    if end_dt < start_dt:
+        raise HTTPException(status_code=400, detail="Bitiş tarihi başlangıçtan önce olamaz.")
+    if (end_dt - start_dt).days >= CALENDAR_MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"En fazla {CALENDAR_MAX_RANGE_DAYS} günlük aralık istenebilir.")
+
+    conn = sqlite3.connect(DB_FILE); conn.row_factory = sqlite3.Row
+    query = '''SELECT p.id, p.plan_date, t.url as top_url, t.id as top_id, b.url as bottom_url, b.id as bottom_id, sh.url as shoe_url, sh.id as shoe_id FROM planned_outfits p LEFT JOIN clothes t ON p.top_id = t.id LEFT JOIN clothes b ON p.bottom_id = b.id LEFT JOIN clothes sh ON p.shoe_id = sh.id WHERE p.username = ? AND p.plan_date BETWEEN ? AND ? ORDER BY p.plan_date'''
+    rows = conn.execute(query, (username, start, end)).fetchall(); conn.close()
+    return {"start": start, "end": end, "plans": {r["plan_date"]: dict(r) for r in rows}}
+
+def _schedule_wardrobe(conn, username, season):
+    sql = "SELECT id, category, color_name, is_clean, wear_count FROM clothes WHERE username = ?"
+    params = [username]
+    if season:
+        sql += " AND (season = ? OR season = 'mevsimlik' OR season = '4 Mevsim')"
+        params.append(season)
+    return conn.execute(sql, params).fetchall()
+
+def _write_schedule(conn, username, changes):
+    """Planlayıcının değiştirdiği günleri tek transaction'da yazar."""
+    rows = [(username, d, o["top_id"], o["bottom_id"], o["shoe_id"]) for d, o in changes.items() if o]
+    empty = [(username, d) for d, o in changes.items() if not o]
+    conn.executemany("REPLACE INTO planned_outfits (username, plan_date, top_id, bottom_id, shoe_id, is_auto) VALUES (?, ?, ?, ?, ?, 1)", rows)
+    conn.executemany("DELETE FROM planned_outfits WHERE username = ? AND plan_date = ? AND is_auto = 1", empty)
+    conn.commit()
+
+@app.post("/schedule/week")
+async def schedule_week(req: ScheduleSchema):
+    """
+    Çamaşır günlerini simüle ederek start_date'ten itibaren days günlük plan üretir.
+    Kullanıcının elle girdiği günler korunur, diğer günler (yeniden) planlanır.
+    """
+    start = req.start_date or (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    try: dates = laundry_scheduler.date_range(start, max(1, min(req.days, 14)))
+    except ValueError: raise HTTPException(status_code=400, detail="Tarih formatı YYYY-MM-DD olmalı.")
+    laundry_days = req.laundry_days if req.laundry_days is not None else list(laundry_scheduler.DEFAULT_LAUNDRY_DAYS)
+    window = req.repeat_window if req.repeat_window is not None else laundry_scheduler.REPEAT_WINDOW
+
+    conn = sqlite3.connect(DB_FILE); conn.row_factory = sqlite3.Row
+    items = _schedule_wardrobe(conn, req.username, req.season)
+    if not items:
+        conn.close(); return {"error": "Plan için dolabında kıyafet yok."}
+
+    manual = conn.execute("SELECT plan_date, top_id, bottom_id, shoe_id FROM planned_outfits WHERE username = ? AND plan_date BETWEEN ? AND ? AND is_auto = 0", (req.username, dates[0], dates[-1])).fetchall()
+    fixed = {r["plan_date"]: dict(r) for r in manual}
+
+    changes = laundry_scheduler.schedule(items, dates, fixed, {}, laundry_days, calculate_compatibility_score, window)
+    conn.execute("REPLACE INTO schedule_settings (username, laundry_days, repeat_window, season) VALUES (?, ?, ?, ?)", (req.username, json.dumps(laundry_days), window, req.season))
+    _write_schedule(conn, req.username, changes)
+    conn.close()
+
+    result = await get_calendar_range(req.username, dates[0], dates[-1])
+    result["empty_days"] = [d for d, o in changes.items() if not o]
+    return result
+
+def replan_after_edit(username, date_str):
+    """
+    Elle düzenlenen günden SONRAKİ otomatik günlerden, yeni kirli/tekrar durumuna göre
+    geçersiz kalanları yeniden planlar. Dönüş: değişen tarihler
+    """
+    try: edited = datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError: return []
+    # Düzenleme en fazla bir plan uzunluğu (14 gün) ileriyi etkileyebilir
+    start = max(datetime.now() + timedelta(days=1), edited - timedelta(days=14)).strftime("%Y-%m-%d")
+    horizon = (edited + timedelta(days=14)).strftime("%Y-%m-%d")
+
+    conn = sqlite3.connect(DB_FILE); conn.row_factory = sqlite3.Row
+    settings = conn.execute("SELECT * FROM schedule_settings WHERE username = ?", (username,)).fetchone()
+    end = conn.execute("SELECT MAX(plan_date) FROM planned_outfits WHERE username = ? AND is_auto = 1 AND plan_date <= ?", (username, horizon)).fetchone()[0]
+    if not settings or not end or end <= date_str or end < start:
+        conn.close(); return []
+
+    rows = conn.execute("SELECT plan_date, top_id, bottom_id, shoe_id, is_auto FROM planned_outfits WHERE username = ? AND plan_date BETWEEN ? AND ?", (username, start, end)).fetchall()
+    fixed = {r["plan_date"]: dict(r) for r in rows if not r["is_auto"] or r["plan_date"] <= date_str}
+    existing = {r["plan_date"]: dict(r) for r in rows if r["plan_date"] not in fixed}
+    dates = laundry_scheduler.date_range(start, (datetime.strptime(end, "%Y-%m-%d") - datetime.strptime(start, "%Y-%m-%d")).days + 1)
+
+    items = _schedule_wardrobe(conn, username, settings["season"])
+    changes = laundry_scheduler.schedule(items, dates, fixed, existing, json.loads(settings["laundry_days"]),
+                                         calculate_compatibility_score, settings["repeat_window"], fill=False)
+    _write_schedule(conn, username, changes)
+    conn.close()
+    return sorted(changes)
+
 @app.post("/travel/pack")
 async def pack_suitcase(req: TravelRequest):
     conn = sqlite3.connect(DB_FILE); conn.row_factory = sqlite3.Row; cur = conn.cursor()
@@ -1090,48 +1420,10 @@ async def pack_suitcase(req: TravelRequest):
     cur.execute("SELECT * FROM clothes WHERE username = ? AND (season = ? OR season = 'mevsimlik' OR season = '4 Mevsim')", (req.username, req.season))
     items = cur.fetchall()
     
-    ustler = [x for x in items if x['category'] == 'ust_giyim']
-    altlar = [x for x in items if x['category'] == 'alt_giyim']
-    elbiseler = [x for x in items if x['category'] == 'elbise'] # Elbiseleri de alıyoruz
-    ayakkabilar = [x for x in items if x['category'] == 'ayakkabi']
-    
-    if (len(ustler) < 1 or len(altlar) < 1) and len(elbiseler) < 1: 
-        conn.close(); return {"error": "Bavul için yeterli kıyafetin yok."}
-    
-    days = min(req.days, 14); plan = [] # Max 14 gün sınırı koyalım
-    
-    for i in range(days):
-        want_dress = (random.random() < 0.3) and (len(elbiseler) > 0)
-        
-        selected_shoe = random.choice(ayakkabilar) if ayakkabilar else None
-        
-        if want_dress:
-            dress = random.choice(elbiseler)
-            plan.append({
-                "day": i + 1,
-                "type": "dress", # Türü belirttik
-                "ust_url": dress['url'],
-                "ust_id": dress['id'],
-                "alt_url": None, # Alt giyim yok
-                "alt_id": 0,
-                "shoe_url": selected_shoe['url'] if selected_shoe else None,
-                "shoe_id": selected_shoe['id'] if selected_shoe else None
-            })
-        else:
-            if not ustler or not altlar: continue 
-            
-            u = random.choice(ustler)
-            a = random.choice(altlar)
-            plan.append({
-                "day": i + 1,
-                "type": "normal",
-                "ust_url": u['url'],
-                "ust_id": u['id'],
-                "alt_url": a['url'],
-                "alt_id": a['id'],
-                "shoe_url": selected_shoe['url'] if selected_shoe else None,
-                "shoe_id": selected_shoe['id'] if selected_shoe else None
-            })
+    days = max(1, min(req.days, 14)) # Max 14 gün sınırı koyalım
+    plan, packing_list = travel_planner.plan_trip(items, days, calculate_compatibility_score)
+    if not plan:
+        conn.close(); return {"error": "Bavul için yeterli temiz kıyafetin yok."}
 
     today = datetime.now(); start_date = today + timedelta(days=1); end_date = start_date + timedelta(days=req.days - 1)
     date_str = format_date_tr(start_date) if req.days == 1 else f"{format_date_tr(start_date)} - {format_date_tr(end_date)}"
@@ -1142,7 +1434,7 @@ async def pack_suitcase(req: TravelRequest):
     conn.execute("INSERT INTO user_plans (username, type, title, data) VALUES (?, ?, ?, ?)", (req.username, 'travel', title, plan_json))
     conn.commit(); conn.close()
     
-    return {"plan": plan}
+    return {"plan": plan, "packing_list": packing_list}
 
 @app.get("/plans/")
 async def get_user_plans(username: str):
@@ -1152,7 +1444,11 @@ async def get_user_plans(username: str):
 
 @app.delete("/plans/{id}")
 async def delete_plan(id: int):
-    conn = sqlite3.connect(DB_FILE); conn.execute("DELETE FROM user_plans WHERE id = ?", (id,)); conn.commit(); conn.close()
+    conn = sqlite3.connect(DB_FILE)
+    row = conn.execute("SELECT data FROM user_plans WHERE id = ?", (id,)).fetchone()
+    conn.execute("DELETE FROM user_plans WHERE id = ?", (id,)); conn.commit()
+    if row: blob_store.release(conn, re.findall(r'"(/[^"]+)"', row[0] or ""))
+    conn.close()
     return {"status": "deleted"}
 
 @app.post("/user/follow")
@@ -1217,7 +1513,7 @@ async def add_comment(data: CommentSchema):
     conn = sqlite3.connect(DB_FILE)
     conn.execute("INSERT INTO comments (post_id, username, text) VALUES (?, ?, ?)", (data.post_id, data.username, data.text))
     conn.commit(); conn.close()
-    update_user_xp(data.username, 1)
+    await update_user_xp(data.username, 1, "comment")
     return {"status": "added"}
 
 @app.get("/notifications/{username}")
@@ -1233,59 +1529,41 @@ async def get_notifications(username: str):
 @app.get("/stats/")
 async def get_stats(username: str):
     conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    # 1. Toplam Parça Sayısı
-    c.execute("SELECT COUNT(*) FROM clothes WHERE username = ?", (username,))
-    total_clothes = c.fetchone()[0]
 
-    # 2. Toplam Kombin Sayısı
-    c.execute("SELECT COUNT(*) FROM outfits WHERE username = ?", (username,))
-    total_outfits = c.fetchone()[0]
+    # Tek satır okuma: user_wardrobe_stats trigger'larla güncel tutuluyor (bkz. wardrobe_stats.py)
+    stats = wardrobe_stats.read(conn, username)
+    conn.close()
 
-    # 3. Kategori Dağılımı (DÜZELTME BURADA)
-    c.execute("SELECT category, COUNT(*) as cnt FROM clothes WHERE username = ? GROUP BY category", (username,))
-    cat_rows = c.fetchall()
-    
     # Varsayılan değerleri tanımlıyoruz ki boş olsa bile 0 dönsün
-    categories = {
-        "ust_giyim": 0, 
-        "alt_giyim": 0, 
-        "elbise": 0, 
-        "ayakkabi": 0,
-        "aksesuar": 0  # <--- EKSİK OLAN BU SATIRDI!
-    }
-    
-    for row in cat_rows:
-        # Veritabanındaki kategori ismini alıp sayıya eşitliyoruz
-        if row['category'] in categories:
-            categories[row['category']] = row['cnt']
-        else:
-            # Eğer tanımlı olmayan bir kategori varsa (örn: eski veri), onu da ekleyelim
-            categories[row['category']] = row['cnt']
-
-    # 4. Stil Dağılımı (Grafik için)
-    c.execute("SELECT style, COUNT(*) as cnt FROM clothes WHERE username = ? GROUP BY style", (username,))
-    style_rows = c.fetchall()
-    styles = {row['style']: row['cnt'] for row in style_rows if row['style']}
-
-    # 5. Mevsim Dağılımı (Grafik için)
-    c.execute("SELECT season, COUNT(*) as cnt FROM clothes WHERE username = ? GROUP BY season", (username,))
-    season_rows = c.fetchall()
-    seasons = {row['season']: row['cnt'] for row in season_rows if row['season']}
-
-    conn.close()
+    categories = {cat: 0 for cat in wardrobe_stats.DEFAULT_CATEGORIES}
+    categories.update(stats["categories"])
 
     return {
-        "clothes": total_clothes,
-        "outfits": total_outfits,
-        "categories": categories, # Güncellenmiş kategori listesi
-        "styles": styles,
-        "seasons": seasons
+        "clothes": stats["clothes"],
+        "outfits": stats["outfits"],
+        "categories": categories,
+        "styles": stats["styles"],
+        "seasons": stats["seasons"],
+        "colors": stats["colors"],
+        "wear_total": stats["wear_total"]
     }
 
 
+@app.get("/analytics/{username}")
+async def get_wardrobe_analytics(username: str):
+    """
+    Kullanım oranı (30/90/365 gün ve tümü), 90 gündür giyilmeyenler, en çok giyilen
+    kombinler, renk/kategori giyim payları ve giyim başına maliyet.
+    Hesap wear_logs üzerinde vektörel yapılır ve log/dolap değişene kadar önbellekten döner.
+    """
+    def run():
+        conn = sqlite3.connect(DB_FILE)
+        try: return wardrobe_analytics.get(conn, username)
+        finally: conn.close()
+    # Büyük log'larda event loop bloklanmasın
+    return await asyncio.to_thread(run)
+
+
 class ChatRequest(BaseModel):
     username: str
     message: str
@@ -1376,8 +1654,36 @@ async def wash_selected_items(data: WashListSchema):
     conn.close()
     return {"status": "success", "message": "Seçilenler yıkandı ve ütülendi! ✨"}
 
+@app.post("/auth/refresh")
+async def refresh_session(data: RefreshTokenSchema):
+    """Refresh token -> yeni token çifti. Eski refresh token iptal edilir (tek kullanımlık)."""
+    try:
+        claims = session_tokens.decode(data.refresh_token, revocations, expected_type="refresh")
+    except session_tokens.TokenError:
+        raise HTTPException(status_code=401, detail="Oturum süresi doldu, tekrar giriş yap.")
+    # Bellekteki liste senkron olmayabilir; tekrar kullanımı asıl INSERT yakalar
+    if not revocations.revoke(claims["jti"], claims["exp"]):
+        raise HTTPException(status_code=401, detail="Oturum süresi doldu, tekrar giriş yap.")
+    # Premium bilgisi sadece burada tazelenir (entitlements önbelleğinden)
+    return session_tokens.issue(claims["sub"], claims.get("uid"), check_premium_status(claims["sub"]))
+
+@app.post("/auth/logout")
+async def logout_session(data: RefreshTokenSchema, user = Depends(current_user)):
+    try:
+        claims = session_tokens.decode(data.refresh_token, revocations, expected_type="refresh")
+        revocations.revoke(claims["jti"], claims["exp"])
+    except session_tokens.TokenError:
+        pass  # Zaten geçersiz
+    if user is not None:
+        revocations.revoke(user.jti, user.expires_at)
+    return {"status": "success"}
+
 @app.post("/user/login")
-async def login_user(user: UserLoginSchema):
+async def login_user(user: UserLoginSchema, request: Request):
+    # Önce deneme sınırları (hash hesaplanmadan, ucuz)
+    await check_throttle(LOGIN_IP_LIMIT, throttle.client_ip(request))
+    await check_throttle(LOGIN_USER_LIMIT, user.username)
+
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
     # Kullanıcıyı bul
@@ -1394,11 +1700,24 @@ async def login_user(user: UserLoginSchema):
          # Şimdilik "123456" varsayalım veya direkt reddedelim. Güvenlik için reddediyoruz:
          raise HTTPException(status_code=400, detail="Eski hesap! Lütfen yönetici ile iletişime geçin.")
 
-    if not verify_password(user.password, db_user['password_hash']):
+    ok, new_hash = await hash_or_503(password_hashing.verify_password(user.password, db_user['password_hash']))
+    if not ok:
         raise HTTPException(status_code=400, detail="Şifre hatalı!")
+
+    if rate_backend.blocking:
+        await asyncio.to_thread(LOGIN_USER_LIMIT.reset, user.username)
+    else:
+        LOGIN_USER_LIMIT.reset(user.username)
+    if new_hash:
+        # Eski (düşük cost) hash: yeni ayarla tekrar kaydet
+        conn = sqlite3.connect(DB_FILE)
+        conn.execute("UPDATE users SET password_hash = ? WHERE username = ?", (new_hash, db_user["username"]))
+        conn.commit()
+        conn.close()
         
     return {
         "status": "success", 
+        **session_tokens.issue(db_user["username"], db_user["id"], check_premium_status(db_user["username"])),
         "data": {
             "username": db_user["username"],
             "full_name": db_user["full_name"],
@@ -1435,17 +1754,16 @@ async def get_showcase(showcase_type: str, username: str):
 async def confirm_wear_count(data: WearConfirmSchema):
     conn = sqlite3.connect(DB_FILE)
     
-    ids = [data.top_id, data.bottom_id]
-    if data.shoe_id: ids.append(data.shoe_id)
-    placeholders = ','.join('?' for _ in ids)
-    conn.execute(f"UPDATE clothes SET wear_count = wear_count + 1 WHERE id IN ({placeholders})", ids)
-    
     today_str = datetime.now().strftime("%Y-%m-%d")
-    conn.execute(
+    cur = conn.execute(
         "INSERT INTO wear_logs (username, top_id, bottom_id, shoe_id, wear_date, is_reviewed) VALUES (?, ?, ?, ?, ?, 0)",
         (data.username, data.top_id, data.bottom_id, data.shoe_id, today_str)
     )
     
+    # wear_count'u wear_log_items trigger'ı artırır (log ile sayaç hep tutarlı)
+    ids = {i for i in [data.top_id, data.bottom_id, data.shoe_id, *data.accessory_ids] if i}
+    conn.executemany("INSERT OR IGNORE INTO wear_log_items (log_id, item_id) VALUES (?, ?)", [(cur.lastrowid, i) for i in ids])
+    
     conn.commit()
     conn.close()
     return {"status": "updated", "message": "Kombin giyildi olarak işaretlendi! Yarın görüşürüz. 👋"}
@@ -1475,6 +1793,17 @@ async def check_pending_review(username: str):
         return dict(row)
     return {"status": "no_pending"}
 
+@app.get("/wear/history/{item_id}")
+async def get_wear_history(item_id: int, limit: int = 20):
+    """Parçanın giyildiği son tarihler ("X'i en son ne zaman giydim"). item_id indeksinden okunur."""
+    conn = sqlite3.connect(DB_FILE)
+    rows = conn.execute('''SELECT w.wear_date FROM wear_log_items li JOIN wear_logs w ON w.id = li.log_id
+                           WHERE li.item_id = ? ORDER BY li.log_id DESC LIMIT ?''', (item_id, max(1, min(limit, 365)))).fetchall()
+    count = conn.execute("SELECT wear_count FROM clothes WHERE id = ?", (item_id,)).fetchone()
+    conn.close()
+    dates = [r[0] for r in rows]
+    return {"item_id": item_id, "last_worn": dates[0] if dates else None, "wear_count": count[0] if count else 0, "dates": dates}
+
 class DirtyReviewSchema(BaseModel):
     log_id: int
     dirty_ids: list[int]
@@ -1494,63 +1823,25 @@ async def submit_wear_review(data: DirtyReviewSchema):
     return {"status": "success"}   
 class ImportUrlSchema(BaseModel):
     url: str
-    username: str
+    username: str = None
     category: str = None
 
-def scrape_product_metadata(url):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        image_url = ""
-        og_image = soup.find("meta", property="og:image")
-        if og_image: image_url = og_image["content"]
-        else:
-            img_tag = soup.find("img")
-            if img_tag: image_url = img_tag.get("src")
-            
-        title = ""
-        og_title = soup.find("meta", property="og:title")
-        if og_title: title = og_title["content"]
-        else:
-            if soup.title: title = soup.title.string
-
-        if not image_url: return {"error": "Resim bulunamadı."}
-        return {"image_url": image_url, "title": title}
-    except Exception as e: return {"error": str(e)}
-
-@app.post("/import/url")
-async def import_from_url(data: ImportUrlSchema):
-    # Linkten bilgileri çek
-    meta = scrape_product_metadata(data.url)
-    if "error" in meta: raise HTTPException(status_code=400, detail=meta["error"])
-    
-    try:
-        img_response = requests.get(meta["image_url"])
-        img = Image.open(io.BytesIO(img_response.content))
-    except: raise HTTPException(status_code=400, detail="Resim indirilemedi.")
+class BulkImportSchema(BaseModel):
+    urls: list[str]
+    username: str = None
+    category: str = None
 
-    # Resmi işle (Arka plan sil, kırp, renk bul)
-    unique_id = str(uuid.uuid4())
-    path = os.path.join(UPLOAD_DIR, f"{unique_id}.png")
-    out = remove(img)
-    out = crop_image(out)
-    color_name = analyze_clothing_color(out)
-    out.save(path)
-    url = f"/uploads/{unique_id}.png"
-    
+def guess_category(title, page_url, category=None):
+    """Başlık ve linkten (kategori, alt kategori) tahmini."""
     # --- MANTIK: KATEGORİ BELİRLEME ---
     final_category = "ust_giyim" # Varsayılan
 
     # Eğer Frontend'den kategori geldiyse (Örn: Kullanıcı Aksesuar sekmesindeyse) onu KİLİTLE.
-    if data.category and data.category in ["ust_giyim", "alt_giyim", "elbise", "ayakkabi", "aksesuar"]:
-        final_category = data.category
+    if category and category in ["ust_giyim", "alt_giyim", "elbise", "ayakkabi", "aksesuar"]:
+        final_category = category
     else:
         # Kategori gelmediyse başlığa bakarak tahmin et (Eski yöntem)
-        title_lower = str(meta["title"]).lower()
+        title_lower = str(title).lower()
         if any(x in title_lower for x in ["pantolon", "şort", "etek", "jean", "tayt"]): final_category = "alt_giyim"
         elif any(x in title_lower for x in ["elbise", "tulum", "dress"]): final_category = "elbise"
         elif any(x in title_lower for x in ["ayakkabı", "bot", "çizme", "sneaker"]): final_category = "ayakkabi"
@@ -1558,7 +1849,7 @@ async def import_from_url(data: ImportUrlSchema):
 
     # --- MANTIK: ALT KATEGORİ (SUB_CATEGORY) BULMA ---
     # Linki ve Başlığı birleştirip içinde kelime avına çıkıyoruz.
-    search_text = (str(meta["title"]) + " " + data.url).lower()
+    search_text = (str(title) + " " + page_url).lower()
     final_sub_category = None
 
     if final_category == "aksesuar":
@@ -1575,14 +1866,33 @@ async def import_from_url(data: ImportUrlSchema):
         elif any(x in search_text for x in ["tişört", "t-shirt", "tshirt"]): final_sub_category = "tisort"
         elif any(x in search_text for x in ["kazak", "hırka", "sweat"]): final_sub_category = "kislik_ust"
 
+    return final_category, final_sub_category
+
+def save_imported(username, page_url, meta, image_bytes, category=None):
+    """İndirilen ürün resmini yükleme hattından geçirip dolaba kaydeder (thread'de çalışır)."""
+    allowed, msg = check_limits(username, 'upload')
+    if not allowed:
+        return {"error": msg}
+    try:
+        img, prepared = prepare_upload(image_bytes)
+    except InvalidImageError as e:
+        return {"error": str(e)}
+
+    # Resmi işle (Arka plan sil, kırp, renk bul)
+    out, color_name = remove_background(img, prepared)
+    out = crop_image(out)
+    url = blob_store.url_for(blob_store.put_image(out, "PNG", optimize=True))
+    final_category, final_sub_category = guess_category(meta["title"], page_url, category)
+
     # Veritabanına Kaydet
     conn = sqlite3.connect(DB_FILE)
     conn.execute("INSERT INTO clothes (username, url, category, season, style, color_name, wear_count, is_clean, sub_category) VALUES (?, ?, ?, ?, ?, ?, 0, 1, ?)", 
-                 (data.username, url, final_category, "mevsimlik", "gunluk", color_name, final_sub_category))
+                 (username, url, final_category, "mevsimlik", "gunluk", color_name, final_sub_category))
     conn.commit()
     conn.close()
+    entitlements.record(username, 'upload')
     
-    update_user_xp(data.username, 15)
+    xp_log.add(username, "import", 15)  # Thread'de çalışıyor; sayaç okuması loop'u bloklamaz
     
     return {
         "status": "success", 
@@ -1592,9 +1902,41 @@ async def import_from_url(data: ImportUrlSchema):
         "sub_category": final_sub_category, 
         "color": color_name
     }
+
+# Linkten içe aktarma: ortak bağlantı havuzu, site başına eşzamanlılık sınırı (bkz. bulk_import)
+# Aynı ürün linkinin bilgisi önbellekten / koşullu GET ile gelir (bkz. product_meta)
+importer = bulk_import.Importer(save_imported, meta_cache=product_meta.MetaCache(DB_FILE))
+
+@app.post("/import/url")
+async def import_from_url(data: ImportUrlSchema, user = Depends(current_user)):
+    username = resolve_username(user, data.username)
+    result = await importer.import_one(username, data.url, data.category)
+    if "error" in result: raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@app.post("/import/urls")
+async def import_bulk(data: BulkImportSchema, user = Depends(current_user)):
+    """Toplu içe aktarma arka planda başlar; ilerleme /import/jobs/{job_id} ile izlenir."""
+    username = resolve_username(user, data.username)
+    if not any(u.strip() for u in data.urls):
+        raise HTTPException(status_code=400, detail="Link listesi boş.")
+    return importer.submit(username, data.urls, data.category)
+
+@app.get("/import/jobs/{job_id}")
+async def import_progress(job_id: str, username: str = None, user = Depends(current_user)):
+    username = resolve_username(user, username)
+    progress = importer.progress(job_id)
+    # Başkasının işi de "yok" sayılır; iş kimliği tahmin edilse bile linkler görünmez
+    if progress is None or progress["username"] != username: raise HTTPException(status_code=404, detail="İş bulunamadı.")
+    return progress
     
     # --- TEMİZLENMİŞ AFFILIATE KODLARI (Sadece bunu yapıştır) ---
 
+# Anahtar kelimeler tek otomatta; tablo değişince yeniden kurulur (bkz. affiliate_matcher)
+affiliates = affiliate_matcher.AffiliateMatcher(DB_FILE)
+# Gösterim / tıklama sayaçları bellekte toplanır, arka planda toplu yazılır (bkz. affiliate_stats)
+affiliate_counter = affiliate_stats.AffiliateCounter(DB_FILE)
+
 @app.get("/affiliate/suggest-missing-piece")
 async def suggest_missing_piece(username: str):
     conn = sqlite3.connect(DB_FILE)
@@ -1634,29 +1976,14 @@ async def suggest_missing_piece(username: str):
         search_query = ai_data.get("search_query", product_name)
 
         final_link = ""
-        all_links = c.execute("SELECT id, keyword, link FROM affiliate_links").fetchall()
-        
-        found_match = None
-        
-        # Döngüyle her satırı kontrol et
-        for row in all_links:
-            # Veritabanındaki "Ceket, Mont, Kaban" verisini virgülle ayır
-            keywords_list = [k.strip().lower() for k in row['keyword'].split(',')]
-            
-            # AI'nın önerdiği ürün isminde bu kelimelerden biri geçiyor mu?
-            for k in keywords_list:
-                if k in product_name.lower():
-                    found_match = row
-                    break
-            if found_match:
-                break
+        # AI'nın önerdiği ürün isminde geçen en uzun anahtar kelime ("Ceket, Mont, Kaban" satırları)
+        found_match = affiliates.match(product_name)
         
         if found_match:
-            final_link = found_match['link']
-            # Tıklanma sayısını artır
-            c.execute("UPDATE affiliate_links SET click_count = click_count + 1 WHERE id = ?", (found_match['id'],))
-            conn.commit()
-            print(f"💰 Veritabanından Link Çekildi: {found_match['keyword']}")
+            # Tıklama /affiliate/go üzerinden sayılır; gösterim sayacı bellekte
+            final_link = f"/affiliate/go/{found_match['id']}"
+            affiliate_counter.impression(found_match['id'])
+            print(f"💰 Veritabanından Link Çekildi: {found_match['matched']} ({found_match['keyword']})")
         else:
             # Yoksa Otomatik Arama Linki
             encoded_query = requests.utils.quote(search_query)
@@ -1681,6 +2008,14 @@ async def suggest_missing_piece(username: str):
             "search_query": fallback_query
         }
 
+@app.get("/affiliate/go/{link_id}")
+async def affiliate_redirect(link_id: int):
+    """Önerideki linke tıklama: sayılır ve mağazaya yönlendirilir."""
+    row = affiliates.get(link_id)
+    if not row: raise HTTPException(status_code=404, detail="Link bulunamadı.")
+    affiliate_counter.click(link_id)
+    return RedirectResponse(row['link'], status_code=302)
+
 # --- YÖNETİCİ FONKSİYONLARI ---
 
 class LinkAddSchema(BaseModel):
@@ -1693,6 +2028,7 @@ async def add_affiliate_link(data: LinkAddSchema):
     try:
         conn.execute("INSERT INTO affiliate_links (keyword, link) VALUES (?, ?)", (data.keyword, data.link))
         conn.commit()
+        affiliates.invalidate()
         return {"status": "success", "message": "Link eklendi!"}
     except sqlite3.IntegrityError:
         return {"status": "error", "message": "Bu kelime zaten var."}
@@ -1703,16 +2039,26 @@ async def add_affiliate_link(data: LinkAddSchema):
 async def list_affiliate_links():
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
-    rows = conn.execute("SELECT id, keyword, link, click_count FROM affiliate_links ORDER BY id DESC LIMIT 20").fetchall()
+    rows = [dict(row) for row in conn.execute("SELECT id, keyword, link, impression_count, click_count FROM affiliate_links ORDER BY id DESC LIMIT 20")]
+    # Son günlerin eğilimi günlük özetten (ham olay taranmaz)
+    trends = affiliate_stats.trends(conn, [row['id'] for row in rows])
     conn.close()
-    return [dict(row) for row in rows]
+    pending = affiliate_counter.pending()
+    for row in rows:
+        extra = pending.get(row['id'], {})
+        row['impression_count'] = (row['impression_count'] or 0) + extra.get('impressions', 0)
+        row['click_count'] = (row['click_count'] or 0) + extra.get('clicks', 0)
+        row['trend'] = trends[row['id']]
+    return rows
 
 @app.delete("/affiliate/delete/{link_id}")
 async def delete_affiliate_link(link_id: int):
     conn = sqlite3.connect(DB_FILE)
     conn.execute("DELETE FROM affiliate_links WHERE id = ?", (link_id,))
+    conn.execute("DELETE FROM affiliate_daily WHERE link_id = ?", (link_id,))
     conn.commit()
     conn.close()
+    affiliates.invalidate()
     return {"status": "deleted"}
 
 class LinkUpdateSchema(BaseModel):
@@ -1727,6 +2073,7 @@ async def update_affiliate_link(data: LinkUpdateSchema):
         # ID'ye göre güncelle
         conn.execute("UPDATE affiliate_links SET keyword = ?, link = ? WHERE id = ?", (data.keyword, data.link, data.id))
         conn.commit()
+        affiliates.invalidate()
         return {"status": "success", "message": "Link güncellendi!"}
     except Exception as e:
         return {"status": "error", "message": f"Hata: {str(e)}"}
@@ -1747,6 +2094,7 @@ async def upgrade_to_premium(data: UpgradeSchema):
         
         conn.execute("UPDATE users SET is_premium = 1, premium_expiry = ? WHERE username = ?", (expiry, data.username))
         conn.commit()
+        entitlements.invalidate(data.username)
         return {"status": "success", "message": "Hoş geldin VIP üye! Artık sınırsızsın. 💎"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -1757,8 +2105,10 @@ async def upgrade_to_premium(data: UpgradeSchema):
 async def delete_social_post(post_id: int):
     conn = sqlite3.connect(DB_FILE)
     try:
+        row = conn.execute("SELECT top_url, bottom_url, shoe_url FROM social_feed WHERE id = ?", (post_id,)).fetchone()
         conn.execute("DELETE FROM social_feed WHERE id = ?", (post_id,))
         conn.commit()
+        if row: blob_store.release(conn, list(row))
         return {"status": "success", "message": "Paylaşım silindi."}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -0,0 +1,76 @@
+"""
+Şifre hash'leme (bcrypt) event loop dışında.
+
+bcrypt.checkpw / hashpw cost 12'de ~250 ms CPU harcar. Doğrudan async
+endpoint'te çağrılınca o sürede bütün API donuyordu. Artık:
+- Hash işlemleri PASSWORD_HASH_WORKERS thread'lik ayrı havuzda çalışır
+  (bcrypt hesap sırasında GIL'i bırakır)
+- Havuzda bekleyen iş sayısı PASSWORD_HASH_QUEUE ile sınırlı; dolarsa
+  HashBusyError atılır ve istek hemen 503 ile döner (CPU kuyruğu büyümez)
+- Giriş başarılıysa ve kayıtlı hash BCRYPT_ROUNDS'tan düşük cost ile
+  yapılmışsa yeni hash döner; çağıran kaydeder (şeffaf yeniden hash)
+
+Ölçüm: benchmarks/bench_password_hashing.py
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE)
+
+
+class HashBusyError(Exception):
+    pass
+
+
+def _rounds(hashed):
+    """'$2b$12$...' -> 12 (tanınmazsa 0)"""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed):
+    return _rounds(hashed) < BCRYPT_ROUNDS
+
+
+def hash_sync(password, rounds=None):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def verify_sync(password, hashed):
+    """Dönüş: (doğru mu?, yeniden hash gerekiyorsa yeni hash)"""
+    try:
+        ok = bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    except ValueError:  # bozuk hash
+        return False, None
+    if ok and needs_rehash(hashed):
+        return True, hash_sync(password)
+    return ok, None
+
+
+async def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HashBusyError("Şu an çok fazla giriş isteği var, lütfen biraz sonra tekrar dene.")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _slots.release()
+
+
+async def hash_password(password):
+    return await _run(hash_sync, password)
+
+
+async def verify_password(password, hashed):
+    """Dönüş: (doğru mu?, yeniden hash gerekiyorsa yeni hash)"""
+    return await _run(verify_sync, password, hashed)
@@ -0,0 +1,216 @@
+"""
+Ürün sayfası bilgisi (og:image, og:title) ve önbelleği.
+
+Aynı popüler ürün linki (ör. Trendyol) birçok kullanıcı tarafından içe
+aktarılıyor; her seferinde 1 MB'lık sayfayı indirip baştan parse etmek
+gereksiz. Artık:
+- Link normalize edilir (şema/host küçük harf, #parça ve utm_* vb. takip
+  parametreleri atılır, parametreler sıralanır) ve anahtar olarak kullanılır
+- Bilgi product_meta tablosunda ETag / Last-Modified ile saklanır, önünde
+  süreç içi LRU (PRODUCT_META_CACHE_SIZE) vardır
+- PRODUCT_META_FRESH_SECONDS içindeki kayıt ağa hiç gitmeden kullanılır;
+  daha eskiyse koşullu GET (If-None-Match / If-Modified-Since) atılır,
+  304 gelirse kayıt tazelenir
+- Sadece <head> parse edilir (html.parser.HTMLParser, ağaç kurmadan);
+  head'de resim yoksa tam sayfa BeautifulSoup ile taranır
+
+Ölçüm: benchmarks/bench_product_meta.py
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+PRODUCT_META_FRESH_SECONDS = int(os.getenv("PRODUCT_META_FRESH_SECONDS", str(6 * 3600)))
+PRODUCT_META_CACHE_SIZE = int(os.getenv("PRODUCT_META_CACHE_SIZE", "5000"))
+
+# Ürünü değiştirmeyen paylaşım / reklam parametreleri
+TRACKING_PARAMS = {"gclid", "fbclid", "yclid", "msclkid", "ref", "igshid", "boutiqueid", "merchantid"}
+
+# Tam sayfa taramasında sadece bunlara bakıyoruz; geri kalan ağaç hiç kurulmaz
+_PRODUCT_TAGS = SoupStrainer(["meta", "title", "img"])
+
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS)
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+class _HeadDone(Exception):
+    pass
+
+
+class _HeadParser(HTMLParser):
+    """<head> içindeki og:image / og:title / <title>; </head> veya <body>'de durur."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta = {}
+        self.in_title = False
+        self.title = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            raise _HeadDone
+        if tag == "title":
+            self.in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+            if name in ("og:image", "og:title", "twitter:image") and attrs.get("content"):
+                self.meta.setdefault(name, attrs["content"])
+        elif tag == "link" and "image_src" in (dict(attrs).get("rel") or "").lower():
+            self.meta.setdefault("image_src", dict(attrs).get("href") or "")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self.in_title = False
+        elif tag == "head":
+            raise _HeadDone
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+
+
+def head_end(html):
+    """</head> (veya <body) bitişinin byte konumu; henüz gelmediyse -1."""
+    lower = html.lower()
+    for marker in (b"</head", b"<body"):
+        pos = lower.find(marker)
+        if pos >= 0:
+            end = lower.find(b">", pos)
+            return len(html) if end < 0 else end + 1
+    return -1
+
+
+def parse_head(html, page_url, encoding="utf-8"):
+    """Sadece <head>. Dönüş: {"image_url", "title"}; head'de resim yoksa None"""
+    end = head_end(html)
+    text = (html[:end] if end >= 0 else html).decode(encoding or "utf-8", errors="replace")
+    parser = _HeadParser()
+    try:
+        parser.feed(text)
+        parser.close()
+    except _HeadDone:
+        pass
+    meta = parser.meta
+    image_url = meta.get("og:image") or meta.get("twitter:image") or meta.get("image_src")
+    if not image_url:
+        return None
+    title = meta.get("og:title") or parser.title.strip()
+    return {"image_url": urljoin(page_url, image_url), "title": title}
+
+
+def parse_product(html, page_url):
+    """Tam sayfa (head'de resim olmayan siteler için). Dönüş: {"image_url", "title"} veya None"""
+    soup = BeautifulSoup(html, "html.parser", parse_only=_PRODUCT_TAGS)
+
+    image_url = ""
+    og_image = soup.find("meta", property="og:image")
+    if og_image and og_image.get("content"):
+        image_url = og_image["content"]
+    else:
+        img_tag = soup.find("img")
+        if img_tag:
+            image_url = img_tag.get("src") or ""
+
+    title = ""
+    og_title = soup.find("meta", property="og:title")
+    if og_title and og_title.get("content"):
+        title = og_title["content"]
+    elif soup.title and soup.title.string:
+        title = soup.title.string.strip()
+
+    if not image_url:
+        return None
+    return {"image_url": urljoin(page_url, image_url), "title": title}
+
+
+def install(cursor):
+    cursor.execute('''CREATE TABLE IF NOT EXISTS product_meta (
+        url_key TEXT PRIMARY KEY,
+        image_url TEXT,
+        title TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        checked_at REAL
+    ) WITHOUT ROWID''')
+
+
+class MetaCache:
+    """Normalize edilmiş link -> ürün bilgisi; bellek LRU + product_meta tablosu."""
+
+    def __init__(self, db_file, size=None, fresh_seconds=None):
+        self.db_file = db_file
+        self.size = size or PRODUCT_META_CACHE_SIZE
+        self.fresh_seconds = PRODUCT_META_FRESH_SECONDS if fresh_seconds is None else fresh_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def get(self, key):
+        """Dönüş: kayıt sözlüğü (image_url, title, etag, last_modified, checked_at) veya None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+        conn = sqlite3.connect(self.db_file)
+        try:
+            row = conn.execute("SELECT image_url, title, etag, last_modified, checked_at FROM product_meta WHERE url_key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        entry = dict(zip(("image_url", "title", "etag", "last_modified", "checked_at"), row))
+        self._remember(key, entry)
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry["checked_at"] < self.fresh_seconds
+
+    def validators(self, entry):
+        """Koşullu GET başlıkları"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, key, meta, etag=None, last_modified=None):
+        entry = {"image_url": meta["image_url"], "title": meta["title"], "etag": etag,
+                 "last_modified": last_modified, "checked_at": time.time()}
+        self._save(key, entry)
+        return entry
+
+    def touch(self, key, entry):
+        """304 geldi: içerik aynı, sadece kontrol zamanı yenilenir."""
+        entry = {**entry, "checked_at": time.time()}
+        self._save(key, entry)
+        return entry
+
+    def _save(self, key, entry):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            conn.execute("INSERT OR REPLACE INTO product_meta (url_key, image_url, title, etag, last_modified, checked_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, entry["image_url"], entry["title"], entry["etag"], entry["last_modified"], entry["checked_at"]))
+            conn.commit()
+        finally:
+            conn.close()
+        self._remember(key, entry)
@@ -0,0 +1,162 @@
+"""
+İmzalı oturum token'ları (JWT, python-jose).
+
+- Giriş / kayıt: kısa ömürlü access token (ACCESS_TOKEN_MINUTES) + uzun
+  ömürlü refresh token (REFRESH_TOKEN_DAYS) döner
+- Access token kullanıcı adı, id ve premium bilgisini taşır; doğrulama
+  sadece imza + süre + bellekteki iptal listesi kontrolüdür, veritabanına
+  gidilmez
+- /auth/refresh: refresh token tek kullanımlıktır (eskisi iptal edilir;
+  başka worker daha önce iptal ettiyse INSERT satır eklemez ve istek
+  reddedilir), premium bilgisi bu sırada yeniden okunur
+- /auth/logout: iki token da iptal listesine yazılır
+
+İptal listesi revoked_tokens tablosunda tutulur, her süreç bellekte
+kopyasını tutar ve REVOCATION_SYNC_SECONDS'te bir sadece yeni satırları okur.
+
+İmza anahtarı JWT_SECRET'tan okunur. Tanımlı değilse bir kez üretilip
+JWT_SECRET_FILE'a yazılır; bütün worker'lar ve yeniden başlatmalar aynı
+anahtarı kullanır (dosya gizli tutulmalı, repoya girmemeli).
+"""
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from jose import JWTError, jwt
+
+ALGORITHM = "HS256"
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "30"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "30"))
+
+JWT_SECRET_FILE = os.getenv("JWT_SECRET_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".jwt_secret"))
+
+
+def _shared_secret(path):
+    """Dosyadaki anahtar; yoksa üretip yazar. Aynı anda açılan worker'lardan sadece biri yazar, hepsi onu okur."""
+    if not os.path.exists(path):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".jwt_tmp_")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_urlsafe(48))
+            os.chmod(tmp, 0o600)
+            try:
+                os.link(tmp, path)  # Hedef varsa hata verir: yarım dosya görülmez, ilk yazan kazanır
+            except FileExistsError:
+                pass
+        finally:
+            os.remove(tmp)
+    with open(path) as f:
+        return f.read().strip()
+
+
+JWT_SECRET = os.getenv("JWT_SECRET")
+if not JWT_SECRET:
+    print(f"⚠️ UYARI: JWT_SECRET tanımlı değil, {JWT_SECRET_FILE} dosyasındaki anahtar kullanılıyor.")
+    JWT_SECRET = _shared_secret(JWT_SECRET_FILE)
+
+
+class TokenError(Exception):
+    pass
+
+
+class TokenUser:
+    """Doğrulanmış access token'dan gelen kullanıcı."""
+
+    def __init__(self, claims):
+        self.username = claims["sub"]
+        self.user_id = claims.get("uid")
+        self.is_premium = bool(claims.get("prem"))
+        self.jti = claims["jti"]
+        self.expires_at = claims["exp"]
+
+
+def _encode(claims, ttl_seconds):
+    now = int(time.time())
+    claims = {**claims, "iat": now, "exp": now + ttl_seconds, "jti": uuid.uuid4().hex}
+    return jwt.encode(claims, JWT_SECRET, algorithm=ALGORITHM)
+
+
+def issue(username, user_id, is_premium):
+    """Giriş sonrası token çifti (frontend'e aynen döner)."""
+    access = _encode({"sub": username, "uid": user_id, "prem": bool(is_premium), "type": "access"}, ACCESS_TOKEN_MINUTES * 60)
+    refresh = _encode({"sub": username, "uid": user_id, "type": "refresh"}, REFRESH_TOKEN_DAYS * 86400)
+    return {"access_token": access, "refresh_token": refresh, "token_type": "bearer", "expires_in": ACCESS_TOKEN_MINUTES * 60}
+
+
+class RevocationList:
+    """İptal edilen token id'leri (jti) -> bitiş zamanı; bellekte, tablodan artımlı senkron."""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.revoked = {}
+        self.last_id = 0
+        self.synced_at = 0.0
+        self.lock = threading.Lock()
+
+    def install(self, cursor):
+        cursor.execute('''CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            jti TEXT UNIQUE,
+            expires_at INTEGER
+        )''')
+
+    def _sync(self):
+        now = time.time()
+        conn = sqlite3.connect(self.db_file)
+        try:
+            rows = conn.execute("SELECT id, jti, expires_at FROM revoked_tokens WHERE id > ?", (self.last_id,)).fetchall()
+        finally:
+            conn.close()
+        for row_id, jti, expires_at in rows:
+            self.revoked[jti] = expires_at
+            self.last_id = max(self.last_id, row_id)
+        # Süresi geçmiş token zaten reddedilir; listede tutmaya gerek yok
+        for jti in [j for j, exp in self.revoked.items() if exp < now]:
+            del self.revoked[jti]
+        self.synced_at = time.monotonic()
+
+    def is_revoked(self, jti):
+        with self.lock:
+            if time.monotonic() - self.synced_at > REVOCATION_SYNC_SECONDS:
+                self._sync()
+            return jti in self.revoked
+
+    def revoke(self, jti, expires_at):
+        """Token'ı iptal eder. Dönüş: False ise zaten iptal edilmişti (başka worker'da bile)."""
+        conn = sqlite3.connect(self.db_file)
+        try:
+            added = conn.execute("INSERT OR IGNORE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)", (jti, int(expires_at))).rowcount == 1
+            conn.execute("DELETE FROM revoked_tokens WHERE expires_at < ?", (int(time.time()),))
+            conn.commit()
+        finally:
+            conn.close()
+        with self.lock:
+            self.revoked[jti] = expires_at
+        return added
+
+
+def subject(token):
+    """Hız sınırı anahtarı için: imza ve süre geçerliyse kullanıcı adı, değilse None (iptal listesine bakmaz)."""
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return claims.get("sub") if claims.get("type") == "access" else None
+
+
+def decode(token, revocations, expected_type="access"):
+    """İmza, süre, tür ve iptal kontrolü. Dönüş: claims; geçersizse TokenError."""
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+    except JWTError as e:
+        raise TokenError(str(e))
+    if claims.get("type") != expected_type or "sub" not in claims or "jti" not in claims:
+        raise TokenError("Geçersiz token türü")
+    if revocations.is_revoked(claims["jti"]):
+        raise TokenError("Token iptal edilmiş")
+    return claims
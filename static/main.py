@@ -5,7 +5,7 @@ from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from rembg import remove
+import rembg_backend # Arka plan silme (process havuzu)
 from PIL import Image
 import io, os, uuid, sqlite3, math, colorsys, json, random
 import numpy as np
@@ -59,6 +59,18 @@ DB_FILE = os.path.join(BASE_DIR, "dolap_v41_clean.db")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
+# Arka plan silme havuzu: model her worker'da uygulama açılırken bir kez yüklenir
+@app.on_event("startup")
+async def start_rembg_pool():
+    try:
+        rembg_backend.start()
+    except Exception as e:
+        print(f"UYARI: rembg havuzu başlatılamadı, ilk istekte tekrar denenecek: {e}")
+
+@app.on_event("shutdown")
+async def stop_rembg_pool():
+    rembg_backend.shutdown()
+
 static_path = os.path.join(BASE_DIR, "static")
 if os.path.exists(static_path):
     app.mount("/static", StaticFiles(directory=static_path), name="static")
@@ -832,12 +844,13 @@ async def process_image(
     img = Image.open(io.BytesIO(img_data)) 
     
     try:
-        out = remove(img)
-        out = crop_image(out)
+        # Silme + kırpma worker havuzunda yapılır, event loop bloklanmaz
+        out = await rembg_backend.remove_background(img_data)
         color_name = analyze_clothing_color(out)
         out.save(path)
-    except:
+    except Exception as e:
         # Hata olursa orijinali kaydet
+        print(f"Arka Plan Silme Hatası: {e}")
         img.save(path)
         color_name = "Bilinmiyor"
 
@@ -1457,15 +1470,14 @@ async def import_from_url(data: ImportUrlSchema):
     if "error" in meta: raise HTTPException(status_code=400, detail=meta["error"])
     
     try:
-        img_response = requests.get(meta["image_url"])
-        img = Image.open(io.BytesIO(img_response.content))
+        img_response = requests.get(meta["image_url"], timeout=15)
+        Image.open(io.BytesIO(img_response.content)).verify()
     except: raise HTTPException(status_code=400, detail="Resim indirilemedi.")
 
     # Resmi işle (Arka plan sil, kırp, renk bul)
     unique_id = str(uuid.uuid4())
     path = os.path.join(UPLOAD_DIR, f"{unique_id}.png")
-    out = remove(img)
-    out = crop_image(out)
+    out = await rembg_backend.remove_background(img_response.content)
     color_name = analyze_clothing_color(out)
     out.save(path)
     url = f"/uploads/{unique_id}.png"
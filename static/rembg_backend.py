@@ -0,0 +1,138 @@
+"""
+Arka plan silme servisi (rembg).
+
+Her worker process açılışta TEK bir rembg session'ı yükler ve sonraki
+tüm istekler bu session'ı kullanır. Model çıkarımı event loop'u
+bloklamasın diye sınırlı bir ProcessPoolExecutor içinde çalışır.
+
+Ayarlar (.env):
+    REMBG_MODEL    -> "u2net" (varsayılan) veya küçük model için "u2netp"
+    REMBG_WORKERS  -> Aynı anda çalışan process sayısı (varsayılan 1)
+    REMBG_THREADS  -> Her process'in ONNX intra-op thread sayısı (varsayılan 1)
+    REMBG_QUEUE    -> Kuyrukta bekleyebilecek maksimum iş (varsayılan workers * 4)
+"""
+import asyncio
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+REMBG_MODEL = os.getenv("REMBG_MODEL", "u2net")
+REMBG_WORKERS = max(1, int(os.getenv("REMBG_WORKERS", "1")))
+REMBG_THREADS = max(1, int(os.getenv("REMBG_THREADS", "1")))
+REMBG_QUEUE = max(1, int(os.getenv("REMBG_QUEUE", str(REMBG_WORKERS * 4))))
+
+# Worker process'in kendi session'ı (her process'te bir kez oluşur)
+_session = None
+
+# Ana process tarafı; start/shutdown aynı anda birden fazla havuz açmasın diye kilitli
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _init_worker(model_name, threads):
+    """Worker açılırken çalışır: thread limitini koyar ve session'ı yükler."""
+    global _session
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+
+    import onnxruntime as ort
+    from rembg import new_session
+
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = threads
+    opts.inter_op_num_threads = 1
+    _session = new_session(model_name, sess_opts=opts)
+
+
+def _remove_in_worker(data: bytes) -> bytes:
+    """Worker içinde arka planı siler, kırpar ve PNG byte'ı döner."""
+    from rembg import remove
+
+    img = Image.open(io.BytesIO(data))
+    out = remove(img, session=_session)
+    bbox = out.getbbox()
+    if bbox:
+        out = out.crop(bbox)
+
+    buf = io.BytesIO()
+    out.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _warmup():
+    return _session is not None
+
+
+def start(workers=None, threads=None, model_name=None):
+    """Process havuzunu başlatır ve her worker'da modeli önceden yükler."""
+    return _pool(workers, threads, model_name)[0]
+
+
+def _pool(workers=None, threads=None, model_name=None):
+    """(executor, slots) çiftini döner; havuz yoksa kilit altında bir kez açar."""
+    global _executor, _slots
+    with _lock:
+        if _executor is not None:
+            return _executor, _slots
+
+        workers = workers or REMBG_WORKERS
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(model_name or REMBG_MODEL, threads or REMBG_THREADS),
+        )
+        # Havuz tembel açılır; her worker'a birer iş göndererek session'ları şimdiden yükle
+        try:
+            for f in [executor.submit(_warmup) for _ in range(workers)]:
+                f.result()
+        except BrokenProcessPool:
+            # Model yüklenemedi (indirme hatası vb.), bir sonraki istekte tekrar denenir
+            executor.shutdown(wait=False)
+            raise
+
+        _executor, _slots = executor, asyncio.Semaphore(max(REMBG_QUEUE, workers))
+        return _executor, _slots
+
+
+def _discard(executor):
+    """Çöken havuzu bırakır; bu arada yenisi açıldıysa ona dokunmaz. Beklemez."""
+    global _executor, _slots
+    with _lock:
+        if _executor is executor:
+            _executor = None
+            _slots = None
+    executor.shutdown(wait=False)
+
+
+def shutdown():
+    global _executor, _slots
+    with _lock:
+        executor, _executor, _slots = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def remove_background(data: bytes) -> Image.Image:
+    """
+    Arka planı worker havuzunda siler. Event loop bloklanmaz.
+    Kuyruk doluysa yer açılana kadar bekler (sınırsız iş birikmez).
+    """
+    # Havuz ve kuyruk yerel değişkene alınır: başka bir istek havuzu sıfırlasa da
+    # bu istek kendi yakaladığı nesnelerle devam eder
+    executor, slots = _executor, _slots
+    if executor is None or slots is None:
+        executor, slots = await asyncio.to_thread(_pool)
+
+    loop = asyncio.get_running_loop()
+    async with slots:
+        try:
+            png_bytes = await loop.run_in_executor(executor, _remove_in_worker, data)
+        except BrokenProcessPool:
+            # Bir worker çöktüyse havuzu bırak, sonraki istek yenisini açar
+            _discard(executor)
+            raise
+    return Image.open(io.BytesIO(png_bytes))
@@ -0,0 +1,170 @@
+"""
+HTTP önbellekleme katmanı.
+
+- index.html / sw.js: açılışta bir kez gzip ve (kuruluysa) brotli sürümleri
+  hazırlanır, Accept-Encoding'e göre seçilir. Güçlü ETag + "no-cache" ile
+  tarayıcı her açılışta sadece 304 alır (~300 KB yerine birkaç yüz byte).
+  Dosya sonradan değişirse yeniden sıkıştırma thread'de yapılır.
+- İçerik adresli yüklemeler (<sha256>.png): dosya adı asla değişmediği için
+  "immutable" ve 1 yıllık max-age, ETag = sha256.
+- Liste dönen JSON endpoint'leri (json_response): gövdenin hash'i ETag olur,
+  service worker stale-while-revalidate yaparken değişmediyse 304 alır.
+- If-None-Match eşleşirse gövde gönderilmeden 304 döner.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # opsiyonel: yoksa sadece gzip sunulur
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+SHA_KEY_RE = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+
+
+def _etag_matches(request, etags):
+    """If-None-Match başlığı verilen ETag'lerden biriyle eşleşiyor mu (zayıf karşılaştırma)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in etags:
+            return True
+    return False
+
+
+def _accepted(accept_encoding):
+    """Accept-Encoding -> {kodlama: q}"""
+    result = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        result[name.strip().lower()] = q
+    return result
+
+
+class PrecompressedAsset:
+    """Diskteki küçük bir dosyanın bellekte tutulan identity/gzip/br sürümleri."""
+
+    def __init__(self, path, media_type, cache_control=REVALIDATE):
+        self.path = path
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.mtime = None
+        self.variants = {}
+        self.lock = threading.Lock()
+
+    def _build(self):
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()[:32]
+
+        # Her kodlamanın ayrı güçlü ETag'i olmalı (farklı byte'lar)
+        variants = {"identity": (raw, f'"{digest}"')}
+        variants["gzip"] = (gzip.compress(raw, compresslevel=9, mtime=0), f'"{digest}-gz"')
+        if brotli is not None:
+            variants["br"] = (brotli.compress(raw, quality=11), f'"{digest}-br"')
+
+        self.variants = variants
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def refresh(self):
+        """Dosya değiştiyse sıkıştırılmış sürümleri yeniden hazırla (bloklar: brotli quality 11)."""
+        with self.lock:
+            mtime = os.path.getmtime(self.path)
+            if mtime != self.mtime:
+                self._build()
+                self.mtime = mtime
+
+    async def ensure_fresh(self):
+        """Event loop'tan çağrılır: dosya değiştiyse refresh() thread'de çalışır."""
+        if os.path.getmtime(self.path) != self.mtime:
+            await asyncio.to_thread(self.refresh)
+
+    def pick(self, accept_encoding):
+        accepted = _accepted(accept_encoding)
+        wildcard = accepted.get("*", 0)
+        for name in ("br", "gzip"):
+            if name in self.variants and accepted.get(name, wildcard) > 0:
+                return name
+        return "identity"
+
+    async def response(self, request):
+        await self.ensure_fresh()
+        encoding = self.pick(request.headers.get("accept-encoding"))
+        body, etag = self.variants[encoding]
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+
+        # Sadece seçilen sürümün ETag'i: gzip'li kopyası olan istemci br'ye geçtiyse 304 değil yeni gövde alır
+        if _etag_matches(request, {etag}):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(body))
+        if request.method == "HEAD":
+            body = b""
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+def blob_headers(key):
+    """Yüklenen dosya için ETag ve Cache-Control. İçerik adresli değilse (eski uuid) kısa süre."""
+    m = SHA_KEY_RE.match(key)
+    if m:
+        return {"ETag": f'"{m.group(1)}"', "Cache-Control": IMMUTABLE}
+    return {"Cache-Control": "public, max-age=86400"}
+
+
+def not_modified(request, headers):
+    """ETag'i olan yanıt için If-None-Match eşleşiyorsa 304 döner, değilse None."""
+    etag = headers.get("ETag")
+    if etag and _etag_matches(request, {etag}):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def json_response(request, data, last_modified=None):
+    """
+    JSON yanıtı ETag (ve varsa Last-Modified) ile döner.
+    İstemcinin elindeki sürüm aynıysa gövde yerine 304 gider.
+    """
+    body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {
+        "ETag": f'W/"{hashlib.sha256(body).hexdigest()[:32]}"',
+        "Cache-Control": REVALIDATE,
+    }
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+
+    if _etag_matches(request, {headers["ETag"][2:]}):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,137 @@
+// --- BugunNeGiysem Service Worker (offline-first) ---
+// Uygulama kabuğu + kıyafet resimleri /precache-manifest.json'dan önbelleğe alınır.
+// /clothes/ ve /social/feed: stale-while-revalidate (önce önbellek, arkada ETag ile kontrol).
+// /static/uploads/: içerik adresli, asla değişmez -> önce önbellek.
+
+const SHELL_CACHE = 'shell-v1';
+const IMG_CACHE = 'uploads-v1';
+const API_CACHE = 'api-v1';
+const META_CACHE = 'meta-v1';
+
+const SWR_PATHS = ['/clothes/', '/social/feed'];
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(precache(null).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    const keep = [SHELL_CACHE, IMG_CACHE, API_CACHE, META_CACHE];
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(k => !keep.includes(k)).map(k => caches.delete(k))))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Sayfa giriş yapınca kullanıcı adını gönderir, o kullanıcının resimleri önbelleğe alınır
+self.addEventListener('message', (event) => {
+    if (event.data && event.data.type === 'precache') {
+        event.waitUntil(precache(event.data.username));
+    }
+});
+
+async function precache(username) {
+    const url = username ? `/precache-manifest.json?username=${encodeURIComponent(username)}` : '/precache-manifest.json';
+    let manifest;
+    try {
+        const res = await fetch(url, { cache: 'no-cache' });
+        if (!res.ok) return;
+        manifest = await res.json();
+    } catch (e) { return; }
+
+    // Sürüm değişmediyse hiçbir şey yapma
+    const meta = await caches.open(META_CACHE);
+    const key = `/__precache_version__/${username || ''}`;
+    const old = await meta.match(key);
+    if (old && (await old.text()) === manifest.version) return;
+
+    const shell = await caches.open(SHELL_CACHE);
+    const imgs = await caches.open(IMG_CACHE);
+    const wanted = new Set(manifest.urls);
+
+    for (const u of manifest.urls) {
+        const cache = u.startsWith('/static/uploads/') ? imgs : shell;
+        if (cache === imgs && await imgs.match(u)) continue; // değişmez, tekrar indirme
+        try {
+            const res = await fetch(u, { cache: 'no-cache' });
+            if (res.ok) await cache.put(u, res);
+        } catch (e) { /* çevrimdışı: sonra denenir */ }
+    }
+
+    // Bu kullanıcının artık kullanmadığı resimleri önbellekten at
+    if (username) {
+        for (const req of await imgs.keys()) {
+            const path = new URL(req.url).pathname;
+            if (!wanted.has(path)) await imgs.delete(req);
+        }
+    }
+    await meta.put(key, new Response(manifest.version));
+}
+
+// Önbellek anahtarı: cache-buster (?t=...) parametresi atılır
+function apiCacheKey(url) {
+    const u = new URL(url);
+    u.searchParams.delete('t');
+    return u.toString();
+}
+
+async function staleWhileRevalidate(event) {
+    const cache = await caches.open(API_CACHE);
+    const key = apiCacheKey(event.request.url);
+    const cached = await cache.match(key);
+
+    // Tarayıcı HTTP önbelleği ETag'i If-None-Match olarak ekler; değişmediyse 304 gelir
+    const network = fetch(event.request, { cache: 'no-cache' }).then(async (res) => {
+        if (!res.ok) return res;
+        const changed = !cached || cached.headers.get('ETag') !== res.headers.get('ETag');
+        await cache.put(key, res.clone());
+        if (changed && cached) {
+            const clients = await self.clients.matchAll();
+            clients.forEach(c => c.postMessage({ type: 'api-updated', url: new URL(key).pathname }));
+        }
+        return res;
+    });
+
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    return network;
+}
+
+async function cacheFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+    const res = await fetch(request);
+    if (res.ok) cache.put(request, res.clone());
+    return res;
+}
+
+async function networkFirst(request, cacheName) {
+    const cache = await caches.open(cacheName);
+    try {
+        const res = await fetch(request);
+        if (res.ok) cache.put(request, res.clone());
+        return res;
+    } catch (e) {
+        const cached = await cache.match(request) || await cache.match('/');
+        if (cached) return cached;
+        throw e;
+    }
+}
+
+self.addEventListener('fetch', (event) => {
+    const req = event.request;
+    if (req.method !== 'GET') return;
+    const url = new URL(req.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (url.pathname.startsWith('/static/uploads/')) {
+        event.respondWith(cacheFirst(req, IMG_CACHE));
+    } else if (SWR_PATHS.includes(url.pathname)) {
+        event.respondWith(staleWhileRevalidate(event));
+    } else if (req.mode === 'navigate' || url.pathname === '/' || url.pathname === '/manifest.json') {
+        event.respondWith(networkFirst(req, SHELL_CACHE));
+    }
+});
@@ -0,0 +1,176 @@
+"""
+Token bucket hız sınırlayıcı.
+
+Her anahtar (ör. "login:user:ayse", "/ai/ask|ip:1.2.3.4") için bir kova:
+kapasite kadar art arda istek yapılabilir, sonra kova saniyede `rate`
+jeton hızıyla dolar. Jeton yoksa istek reddedilir ve kaç saniye sonra
+tekrar denenebileceği döner.
+
+Kovaların durumu değiştirilebilir bir backend'de tutulur:
+- MemoryBackend: süreç içi (varsayılan). MAX_KEYS aşılırsa en eski
+  kovalar atılır (dolu kova ile yeni kova aynı davranır)
+- SQLiteBackend: aynı makinedeki bütün worker'lar ortak kovayı görür.
+  Ana veritabanının yazma kilidiyle yarışmasın diye ayrı dosyadadır.
+  Her satır kovanın yeniden dolacağı zamanı (expires) tutar; dolmuş
+  kovalar SWEEP_SECONDS'te bir silinir (yeni kovayla aynı davranır)
+  Redis vb. için aynı take() arayüzünü uygulayan bir sınıf yeterli.
+
+RateLimiter route başına kuralları (RATE_LIMITS) tutar; main.py'deki
+middleware her istekte bunu çağırır. Ölçüm: benchmarks/bench_rate_limit.py
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+MAX_KEYS = 100_000
+SWEEP_SECONDS = 60
+
+# Önümüzdeki güvenilir proxy sayısı (Render: 1). X-Forwarded-For'un başını istemci
+# yazabilir; gerçek IP sağdan bu kadar proxy'nin eklediği adrestir. 0: başlığa bakılmaz
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+# Route -> (kapasite, saniyede jeton). RATE_LIMITS ortam değişkeniyle (JSON) değiştirilebilir:
+#   RATE_LIMITS='{"/ai/ask": [3, 0.05]}'   (kapasite 0 = sınır yok)
+RATE_LIMITS = {
+    "/ai/ask": (5, 1 / 12),         # Groq kotası: dakikada ~5
+    "/recommend/": (10, 1 / 6),     # Groq kotası
+    "/process/": (10, 1 / 6),       # Arka plan silme + yazma
+    "/import/url": (10, 1 / 6),
+    "/import/urls": (3, 1 / 60),    # Tek istekte IMPORT_MAX_URLS link
+    "/duel/vote": (30, 1),
+    "/social/like": (60, 2),
+    "/social/comment": (20, 1 / 3),
+}
+RATE_LIMITS.update({path: tuple(rule) for path, rule in json.loads(os.getenv("RATE_LIMITS", "{}")).items()})
+
+
+def _refill(tokens, last, now, capacity, rate, cost):
+    tokens = min(capacity, tokens + max(now - last, 0) * rate)
+    if tokens >= cost:
+        return tokens - cost, True, 0.0
+    return tokens, False, (cost - tokens) / rate
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self):
+        self.buckets = OrderedDict()   # anahtar -> (jeton, son zaman)
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        """Dönüş: (izin var mı?, tekrar denemeden önce beklenecek saniye)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, last = self.buckets.pop(key, (capacity, now))
+            tokens, allowed, retry_after = _refill(tokens, last, now, capacity, rate, cost)
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > MAX_KEYS:
+                self.buckets.popitem(last=False)
+            return allowed, retry_after
+
+    def reset(self, key):
+        with self.lock:
+            self.buckets.pop(key, None)
+
+
+class SQLiteBackend:
+    """Worker'lar arası ortak kovalar (tek makine). Her take() kısa bir yazma transaction'ıdır."""
+    blocking = True
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.local = threading.local()
+        self.swept_at = time.monotonic()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL, expires REAL) WITHOUT ROWID")
+        try:
+            conn.execute("ALTER TABLE rate_buckets ADD COLUMN expires REAL")
+        except sqlite3.OperationalError:
+            pass
+        conn.commit()
+
+    def _conn(self):
+        # Thread başına tek bağlantı (sqlite3 bağlantısı thread'ler arası paylaşılamaz)
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.db_file, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=OFF")  # Kova durumu kaybolsa da zararı yok
+        return conn
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, last = row if row else (capacity, now)
+            tokens, allowed, retry_after = _refill(tokens, last, now, capacity, rate, cost)
+            # Kova bu zamandan sonra tekrar dolu: satırın yokluğuyla aynı
+            expires = now + (capacity - tokens) / rate
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, expires) VALUES (?, ?, ?, ?)", (key, tokens, now, expires))
+            if time.monotonic() - self.swept_at > SWEEP_SECONDS:
+                self.swept_at = time.monotonic()
+                # expires'ı olmayan eski satırlar bir gün sonra
+                conn.execute("DELETE FROM rate_buckets WHERE COALESCE(expires, updated + 86400) < ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def reset(self, key):
+        self._conn().execute("DELETE FROM rate_buckets WHERE key = ?", (key,))
+
+
+def make_backend():
+    """RATE_LIMIT_BACKEND=sqlite ise ortak dosya (RATE_LIMIT_DB), değilse bellek."""
+    if os.getenv("RATE_LIMIT_BACKEND", "memory") == "sqlite":
+        return SQLiteBackend(os.getenv("RATE_LIMIT_DB", "ratelimit.db"))
+    return MemoryBackend()
+
+
+class TokenBucket:
+    """Tek kuralın kovaları (giriş denemeleri vb.)."""
+
+    def __init__(self, capacity, rate, backend=None, name=""):
+        """capacity: art arda izin verilen istek, rate: saniyede eklenen jeton"""
+        self.capacity = capacity
+        self.rate = rate
+        self.backend = backend or MemoryBackend()
+        self.name = name
+
+    def take(self, key, cost=1):
+        """Dönüş: (izin var mı?, tekrar denemeden önce beklenecek saniye)"""
+        return self.backend.take(f"{self.name}{key}", self.capacity, self.rate, cost)
+
+    def reset(self, key):
+        self.backend.reset(f"{self.name}{key}")
+
+
+class RateLimiter:
+    """Route + kimlik (kullanıcı veya IP) başına token bucket."""
+
+    def __init__(self, rules=None, backend=None):
+        self.rules = {path: rule for path, rule in (RATE_LIMITS if rules is None else rules).items() if rule[0] > 0}
+        self.backend = backend or make_backend()
+
+    def rule_for(self, path):
+        return self.rules.get(path)
+
+    def take(self, path, identity):
+        capacity, rate = self.rules[path]
+        return self.backend.take(f"{path}|{identity}", capacity, rate)
+
+
+def client_ip(request):
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if forwarded:
+            # Zincir beklenenden kısaysa en soldaki (ilk proxy'nin gördüğü) adres
+            return forwarded[-min(TRUSTED_PROXY_HOPS, len(forwarded))]
+    return request.client.host if request.client else "unknown"
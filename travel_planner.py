@@ -0,0 +1,269 @@
+"""
+Seyahat bavulu planlayıcısı.
+
+Amaç: N günü birbirinden farklı ve renk uyumlu kombinlerle karşılayan
+EN AZ parçalı bavulu bulmak.
+
+- Sadece temiz (is_clean = 1) kıyafetler bavula girer
+- Her parça en fazla MAX_REWEAR[kategori] gün giyilir
+- Aynı (üst, alt) veya aynı elbise ikinci kez kombin olmaz
+- Uyum puanı calculate_compatibility_score ile hesaplanır; önce
+  TRAVEL_MIN_SCORE eşiği denenir, çözüm yoksa eşik kaldırılır
+- Dolap bu kurallarla N güne yetmiyorsa (az parça) kombinler tekrar
+  edebilir; tekrar sınırı sadece parçası yetmeyen kategoride ve adım
+  adım (birer gün) artırılır, böylece tek elbise her gün giyilmez
+
+Uyum sadece renge bağlı olduğu için puanlar renk çiftleri için bir kez
+hesaplanır; 1000 parçalık dolapta bile 14 günlük plan birkaç ms sürer.
+"""
+import math
+import os
+
+TRAVEL_MIN_SCORE = int(os.getenv("TRAVEL_MIN_SCORE", "10"))
+
+# Bir parçanın seyahat boyunca kaç gün giyilebileceği
+MAX_REWEAR = {
+    "ust_giyim": int(os.getenv("TRAVEL_REWEAR_TOP", "2")),
+    "alt_giyim": int(os.getenv("TRAVEL_REWEAR_BOTTOM", "4")),
+    "elbise": 1,       # Aynı elbise tekrar giyilirse kombin farklı olmaz
+    "ayakkabi": 99,    # Ayakkabı her gün giyilebilir
+}
+
+
+class _ScoreTable:
+    """Renk çifti -> puan önbelleği (calculate_compatibility_score çağrılarını azaltır)."""
+
+    def __init__(self, score_fn):
+        self.score_fn = score_fn
+        self.cache = {}
+
+    def __call__(self, c1, c2):
+        key = (c1, c2)
+        if key not in self.cache:
+            self.cache[key] = self.score_fn(c1, c2)
+        return self.cache[key]
+
+
+def _rank(items):
+    # Az giyilmişler önce, eşitlikte eski id
+    return sorted(items, key=lambda x: (x["wear_count"] or 0, x["id"]))
+
+
+def _size_options(days, tops, bottoms, rt, rb, distinct):
+    """(üst sayısı, alt sayısı) adaylarını toplam parça sayısına göre sıralı döner."""
+    options = []
+    for k in range(max(1, math.ceil(days / rt)), min(len(tops), days) + 1):
+        m = math.ceil(days / rb)
+        if distinct:
+            m = max(m, math.ceil(days / k))  # k*m >= gün: her gün farklı çift
+        m = max(m, 1)
+        if m <= len(bottoms):
+            options.append((k + m, k, m))
+    options.sort()
+    return options
+
+
+def _pick_separates(days, tops, bottoms, k, m, score, min_score, rt, rb, distinct):
+    """
+    k üst + m alt seç ve günlere dağıt. Başaramazsa None.
+    Dönüş: [(üst, alt, puan), ...] (gün sayısı kadar)
+    """
+    # Altlar: üst renklerinin çoğuyla uyumlu olanlar (renk sayısı az, sayım ucuz)
+    top_colors = {}
+    for t in tops:
+        top_colors[t["color_name"]] = top_colors.get(t["color_name"], 0) + 1
+
+    def bottom_fit(b):
+        fit = 0
+        for c, n in top_colors.items():
+            if score(c, b["color_name"]) >= min_score:
+                fit += n
+        return fit
+
+    chosen_bottoms = sorted(bottoms, key=bottom_fit, reverse=True)[:m]
+
+    # Üstler: seçilen altların çoğuyla (ve yüksek puanla) uyanlar
+    def top_fit(t):
+        scores = [score(t["color_name"], b["color_name"]) for b in chosen_bottoms]
+        return (sum(1 for s in scores if s >= min_score), sum(scores))
+
+    ranked = sorted(((top_fit(t), t) for t in tops), key=lambda x: x[0], reverse=True)
+    chosen_tops = [t for fit, t in ranked[:k] if fit[0] > 0]
+    if len(chosen_tops) < k:
+        return None
+
+    pairs = []
+    for t in chosen_tops:
+        for b in chosen_bottoms:
+            s = score(t["color_name"], b["color_name"])
+            if s >= min_score:
+                pairs.append((t, b, s))
+
+    # Her gün: kullanılmamış çiftlerden, kalan hakkı en çok olan parçaları
+    # tercih ederek (sonraki günlere parça bırakmak için) en yüksek puanlıyı seç
+    left = {t["id"]: rt for t in chosen_tops}
+    left.update({("b", b["id"]): rb for b in chosen_bottoms})
+    used = set()
+    result = []
+    for _ in range(days):
+        best = None
+        for i, (t, b, s) in enumerate(pairs):
+            if i in used or left[t["id"]] == 0 or left[("b", b["id"])] == 0:
+                continue
+            key = (left[t["id"]] + left[("b", b["id"])], s)
+            if best is None or key > best[0]:
+                best = (key, i)
+        if best is None:
+            return None
+        i = best[1]
+        if distinct:
+            used.add(i)
+        t, b, s = pairs[i]
+        left[t["id"]] -= 1
+        left[("b", b["id"])] -= 1
+        result.append(pairs[i])
+    return result
+
+
+def _pick_shoes(outfit_colors, shoes, score, min_score):
+    """Bütün kombinleri uyumlu ayakkabıyla karşılayan az sayıda ayakkabı (açgözlü küme örtüsü)."""
+    if not shoes:
+        return []
+
+    def fits(shoe, colors):
+        return all(score(c, shoe["color_name"]) >= min_score for c in colors)
+
+    chosen = []
+    uncovered = list(range(len(outfit_colors)))
+    while uncovered:
+        best, best_cover = None, []
+        for shoe in shoes:
+            if shoe in chosen:
+                continue
+            cover = [i for i in uncovered if fits(shoe, outfit_colors[i])]
+            if len(cover) > len(best_cover):
+                best, best_cover = shoe, cover
+        if best is None:
+            break
+        chosen.append(best)
+        uncovered = [i for i in uncovered if i not in best_cover]
+
+    # Hiçbiri uymuyorsa en az bir ayakkabı yine de götürülür
+    return chosen or [shoes[0]]
+
+
+def _spread(days, count):
+    """count adet günü days içine eşit aralıkla yay (elbise günleri için)."""
+    return {int((j + 0.5) * days / count) for j in range(count)} if count else set()
+
+
+def _relaxed_limits(days, counts):
+    """
+    Gevşek mod için (üst, alt, elbise) tekrar sınırları: MAX_REWEAR'dan başlar,
+    her adımda sadece tek başına N güne yetmeyen kategorinin sınırı 1 artar.
+    """
+    limits = {cat: MAX_REWEAR[cat] for cat in counts}
+    while True:
+        yield limits["ust_giyim"], limits["alt_giyim"], limits["elbise"]
+        short = [cat for cat, n in counts.items() if n and n * limits[cat] < days]
+        if not short:
+            return
+        for cat in short:
+            limits[cat] += 1
+
+
+def _search(days, tops, bottoms, dresses, score, threshold, rt, rb, rd, distinct):
+    """Verilen sınırlarla en az parçalı planı ara: (parça, çiftler, elbiseler, elbise günü) veya None."""
+    best = None
+    # d gün elbise, kalanı üst+alt; toplam parça sayısı en az olanı ara
+    for d in range(0, min(days, len(dresses) * rd) + 1):
+        rest = days - d
+        n_dresses = math.ceil(d / rd)
+        if rest == 0:
+            candidate = (n_dresses, [], dresses[:n_dresses])
+        else:
+            candidate = None
+            for total, k, m in _size_options(rest, tops, bottoms, rt, rb, distinct):
+                if best is not None and n_dresses + total >= best[0]:
+                    break
+                pairs = _pick_separates(rest, tops, bottoms, k, m, score, threshold, rt, rb, distinct)
+                if pairs:
+                    candidate = (n_dresses + total, pairs, dresses[:n_dresses])
+                    break
+            if candidate is None:
+                continue
+        if best is None or candidate[0] < best[0]:
+            best = candidate + (d,)
+    return best
+
+
+def plan_trip(items, days, score_fn, min_score=None):
+    """
+    items: clothes satırları (dict veya sqlite3.Row), sezona göre filtrelenmiş.
+    Dönüş: (gün gün plan, bavul listesi) veya çözüm yoksa (None, None)
+    """
+    min_score = TRAVEL_MIN_SCORE if min_score is None else min_score
+    score = _ScoreTable(score_fn)
+
+    clean = [dict(x) for x in items if x["is_clean"] in (1, None)]
+    by_cat = {"ust_giyim": [], "alt_giyim": [], "elbise": [], "ayakkabi": []}
+    for x in clean:
+        if x["category"] in by_cat:
+            by_cat[x["category"]].append(x)
+    tops, bottoms = _rank(by_cat["ust_giyim"]), _rank(by_cat["alt_giyim"])
+    dresses, shoes = _rank(by_cat["elbise"]), _rank(by_cat["ayakkabi"])
+
+    strict = (MAX_REWEAR["ust_giyim"], MAX_REWEAR["alt_giyim"], MAX_REWEAR["elbise"])
+    attempts = [(t, True, strict) for t in ((min_score, 0) if min_score > 0 else (0,))]
+    # Gevşek modda (az parça) tekrar hakkı, eksik kategoride birer birer artar
+    counts = {"ust_giyim": len(tops), "alt_giyim": len(bottoms), "elbise": len(dresses)}
+    attempts += [(0, False, limits) for limits in _relaxed_limits(days, counts)]
+    for threshold, distinct, (rt, rb, rd) in attempts:
+        best = _search(days, tops, bottoms, dresses, score, threshold, rt, rb, rd, distinct)
+        if best is not None:
+            break
+    else:
+        return None, None
+
+    _, pairs, chosen_dresses, d = best
+    dress_days = _spread(days, d)
+    outfits = []
+    pair_iter = iter(pairs)
+    dress_iter = iter([x for x in chosen_dresses for _ in range(rd)])
+    for day in range(days):
+        if day in dress_days:
+            outfits.append(("dress", next(dress_iter), None, 0))
+        else:
+            t, b, s = next(pair_iter)
+            outfits.append(("normal", t, b, s))
+
+    outfit_colors = [[o[1]["color_name"]] + ([o[2]["color_name"]] if o[2] else []) for o in outfits]
+    chosen_shoes = _pick_shoes(outfit_colors, shoes, score, threshold)
+
+    plan = []
+    packed = {}
+    for day, (kind, main, bottom, s) in enumerate(outfits):
+        shoe = None
+        if chosen_shoes:
+            shoe = max(chosen_shoes, key=lambda sh: sum(score(c, sh["color_name"]) for c in outfit_colors[day]))
+        plan.append({
+            "day": day + 1,
+            "type": kind,
+            "ust_url": main["url"],
+            "ust_id": main["id"],
+            "alt_url": bottom["url"] if bottom else None,
+            "alt_id": bottom["id"] if bottom else 0,
+            "shoe_url": shoe["url"] if shoe else None,
+            "shoe_id": shoe["id"] if shoe else None,
+            "score": s,
+        })
+        for x in (main, bottom, shoe):
+            if x:
+                entry = packed.setdefault(x["id"], {
+                    "id": x["id"], "url": x["url"], "category": x["category"],
+                    "color_name": x["color_name"], "days": 0,
+                })
+                entry["days"] += 1
+
+    packing_list = sorted(packed.values(), key=lambda e: (e["category"], e["id"]))
+    return plan, packing_list
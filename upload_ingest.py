@@ -0,0 +1,65 @@
+"""
+Yüklenen dosyayı belleğe almadan diske parça parça yazar.
+
+`await file.read()` tüm dosyayı (ve PIL/BytesIO ile birkaç kopyasını)
+RAM'de tutuyordu; aynı anda gelen büyük yüklemeler küçük container'ları
+öldürüyordu. Burada dosya 64 KB'lık parçalarla geçici dosyaya yazılır ve
+boyut sınırı aşılırsa hemen kesilir. PIL resmi daha sonra diskten tembel
+açar. (İçerik özeti burada alınmaz: depoya işlenmiş resim yazılır, onun
+SHA-256'sını blob_store hesaplar.)
+"""
+import os
+import tempfile
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(15 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Dosya UPLOAD_MAX_BYTES sınırını aştı."""
+
+
+class SpooledUpload:
+    """Diske yazılmış yükleme: path, size. İş bitince close() çağır."""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+
+    def close(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def spool_upload(file, max_bytes=None):
+    """
+    UploadFile'ı parça parça geçici dosyaya kopyalar.
+    Sınır aşılırsa geçici dosyayı siler ve UploadTooLargeError fırlatır.
+    """
+    max_bytes = max_bytes or UPLOAD_MAX_BYTES
+    size = 0
+
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Dosya çok büyük (en fazla {max_bytes // (1024 * 1024)} MB).")
+                out.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return SpooledUpload(path, size)
@@ -0,0 +1,216 @@
+"""
+Dolap analitiği: kullanım oranı, uyuyan parçalar, en çok giyilen kombinler,
+renk/kategori giyim payları ve (fiyat girilmişse) giyim başına maliyet.
+
+wear_logs satırları ve giyilen parçalar (wear_log_items: aksesuar ve elbise
+dahil) NumPy dizilerine alınır, bütün hesaplar vektörel yapılır (bincount /
+unique / maximum.at); Python döngüsü log satırı sayısıyla değil parça
+sayısıyla büyür. Kombinler wear_logs'un üst/alt sütunlarından sayılır.
+
+Diziler ve sonuç kullanıcı başına önbellekte tutulur. wear_logs'a sadece
+ekleme yapıldığı için yeni kayıt gelince yalnızca son id'den sonrası okunur;
+dolap sürümü (clothes_sync_state) değişince veya gün dönünce sadece
+vektörel hesap tekrarlanır (bkz. benchmarks/bench_wardrobe_analytics.py).
+"""
+import threading
+from datetime import date, datetime
+from itertools import chain
+
+import numpy as np
+
+WINDOWS = (30, 90, 365)
+DORMANT_DAYS = 90
+TOP_COMBOS = 10
+CACHE_MAX_USERS = 512
+
+_cache = {}
+_lock = threading.Lock()
+
+# Tarih -> tam gün numarası (julianday gece yarısını .5 ile verir, +0.5 ile aynı gün aynı sayı olur)
+_DAY_SQL = "CAST(julianday({col}) + 0.5 AS INTEGER)"
+_TODAY_SQL = _DAY_SQL.format(col="'now'")
+_ORDINAL_OFFSET = 1721425  # gün numarası - date.toordinal()
+
+
+class _UserLogs:
+    """Kullanıcının wear_logs / wear_log_items dizileri ve son sonucu."""
+
+    def __init__(self):
+        self.max_id = 0
+        self.days = np.empty(0, dtype=np.int64)
+        self.outfits = np.empty((0, 2), dtype=np.int64)
+        self.item_days = np.empty(0, dtype=np.int64)
+        self.item_ids = np.empty(0, dtype=np.int64)
+        self.key = None
+        self.result = None
+
+
+def _fetch(conn, sql, params, width):
+    # Tuple listesi oluşturmadan doğrudan int64 dizisine
+    return np.fromiter(chain.from_iterable(conn.execute(sql, params)), dtype=np.int64).reshape(-1, width)
+
+
+def _load_logs(conn, username, after_id=0, upto_id=None):
+    """
+    Dönüş: (log günleri, [üst, alt], parça günleri, parça id'leri) int64 dizileri.
+    wear_logs (username, id, ...) kapsayan indeksinden, parçalar wear_log_items
+    birincil anahtarından (log_id, item_id) okunur; tablo satırlarına gidilmez.
+    """
+    where = "w.username = ? AND w.id > ?"
+    params = [username, after_id]
+    if upto_id is not None:
+        where += " AND w.id <= ?"
+        params.append(upto_id)
+    logs = _fetch(conn, f"SELECT w.id, {_DAY_SQL.format(col='w.wear_date')}, COALESCE(w.top_id, 0), COALESCE(w.bottom_id, 0) "
+                        f"FROM wear_logs w WHERE {where} AND julianday(w.wear_date) IS NOT NULL ORDER BY w.id", params, 4)
+    pairs = _fetch(conn, f"SELECT li.log_id, li.item_id FROM wear_logs w JOIN wear_log_items li ON li.log_id = w.id WHERE {where}", params, 2)
+    # Parçanın günü log'undan (id sıralı dizide arama); tarihi bozuk log'ların parçaları atlanır
+    pos = np.minimum(np.searchsorted(logs[:, 0], pairs[:, 0]), max(len(logs) - 1, 0))
+    valid = logs[pos, 0] == pairs[:, 0] if len(logs) else np.zeros(len(pairs), dtype=bool)
+    return logs[:, 1].copy(), logs[:, 2:].copy(), logs[pos[valid], 1], pairs[valid, 1].copy()
+
+
+def _load_items(conn, username):
+    has_price = any(r[1] == "price" for r in conn.execute("PRAGMA table_info(clothes)"))
+    price = "price" if has_price else "NULL"
+    return conn.execute(
+        f"SELECT id, category, color_name, url, COALESCE(wear_count, 0), {price}, {_DAY_SQL.format(col='created_at')} "
+        "FROM clothes WHERE username = ? ORDER BY id", (username,)).fetchall()
+
+
+def _shares(labels, wears):
+    """Etiket başına giyim sayısı ve yüzdesi (etiketler parça dizisiyle aynı sırada)."""
+    names, idx = np.unique(np.array([x or "Bilinmiyor" for x in labels], dtype=object), return_inverse=True)
+    totals = np.bincount(idx, weights=wears, minlength=len(names))
+    total = totals.sum()
+    order = np.argsort(-totals, kind="stable")
+    return [{"name": names[i], "wears": int(totals[i]), "share": round(float(totals[i] / total), 3) if total else 0.0}
+            for i in order if totals[i] > 0]
+
+
+def _to_date(day):
+    if day < 0:
+        return None
+    return date.fromordinal(int(day) - _ORDINAL_OFFSET).isoformat()
+
+
+def _analyze(days, outfits, item_days, item_ids, items, today):
+    n = len(items)
+    ids = np.array([r[0] for r in items], dtype=np.int64)
+    categories = [r[1] for r in items]
+    colors = [r[2] for r in items]
+    created = np.array([r[6] if r[6] is not None else today for r in items], dtype=np.int64)
+
+    # Log'daki id'leri parça sırasına çevir (id -> sıra tablosu); silinmiş/başkasının parçası n olur
+    lut = np.full(max(int(ids.max()) if n else 0, int(item_ids.max()) if item_ids.size else 0) + 1, n, dtype=np.int64)
+    lut[ids] = np.arange(n)
+    lut[0] = n
+    item_idx = lut[np.maximum(item_ids, 0)]
+
+    # Her parçanın son giyildiği gün (-1: hiç)
+    last_worn = np.full(n + 1, -1, dtype=np.int64)
+    np.maximum.at(last_worn, item_idx, item_days)
+    last_worn = last_worn[:n]
+
+    windows = {}
+    for w in WINDOWS + (None,):
+        logged = int((days >= today - w).sum()) if w else len(days)
+        mask = item_days >= today - w if w else np.ones(item_days.shape, dtype=bool)
+        wears = np.bincount(item_idx[mask], minlength=n + 1)[:n]
+        worn_items = int((wears > 0).sum())
+        windows[str(w) if w else "all"] = {
+            "outfits_logged": logged,
+            "items_worn": worn_items,
+            "utilization": round(worn_items / n, 3) if n else 0.0,
+            "category_share": _shares(categories, wears),
+            "color_share": _shares(colors, wears),
+        }
+
+    # Uyuyan parçalar: DORMANT_DAYS'ten eski ve o süredir hiç giyilmemiş
+    cutoff = today - DORMANT_DAYS
+    dormant_mask = (last_worn < cutoff) & (created <= cutoff)
+    dormant = [{
+        "id": items[i][0], "url": items[i][3], "category": items[i][1],
+        "last_worn": _to_date(last_worn[i]), "wear_count": items[i][4],
+    } for i in np.flatnonzero(dormant_mask)[np.argsort(last_worn[dormant_mask], kind="stable")]]
+
+    # En çok giyilen kombinler (üst, alt) çifti
+    combos = []
+    outfits = outfits[outfits[:, 0] > 0]
+    if len(outfits):
+        pairs = outfits[:, 0] * (1 << 32) + outfits[:, 1]
+        uniq, counts = np.unique(pairs, return_counts=True)
+        for k in np.argsort(-counts, kind="stable")[:TOP_COMBOS]:
+            combos.append({"top_id": int(uniq[k] >> 32), "bottom_id": int(uniq[k] & 0xFFFFFFFF), "count": int(counts[k])})
+
+    # Giyim başına maliyet (fiyatı girilmiş parçalar)
+    cost_per_wear = [{"id": r[0], "url": r[3], "price": r[5], "wear_count": r[4],
+                      "cost_per_wear": round(r[5] / max(r[4], 1), 2)} for r in items if r[5]]
+    cost_per_wear.sort(key=lambda x: -x["cost_per_wear"])
+
+    return {
+        "total_items": n,
+        "windows": windows,
+        "dormant_days": DORMANT_DAYS,
+        "dormant": dormant,
+        "top_combos": combos,
+        "cost_per_wear": cost_per_wear,
+        "computed_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compute(conn, username, today=None):
+    """Önbelleksiz tam hesap. Dönüş: JSON'a uygun dict."""
+    arrays = _load_logs(conn, username)
+    if today is None:
+        today = conn.execute(f"SELECT {_TODAY_SQL}").fetchone()[0]
+    return _analyze(*arrays, _load_items(conn, username), today)
+
+
+def get(conn, username):
+    """
+    Önbellekten döner. Yeni giyim kaydı varsa sadece son id'den sonraki satırlar
+    okunup dizilere eklenir; dolap değiştiyse veya gün döndüyse sadece hesap tekrarlanır.
+    """
+    max_id = conn.execute("SELECT MAX(id) FROM wear_logs WHERE username = ?", (username,)).fetchone()[0] or 0
+    row = conn.execute("SELECT version FROM clothes_sync_state WHERE username = ?", (username,)).fetchone()
+    today = conn.execute(f"SELECT {_TODAY_SQL}").fetchone()[0]
+    key = (max_id, row[0] if row else 0, today)
+
+    with _lock:
+        entry = _cache.get(username)
+    if entry is not None and entry.key == key:
+        return entry.result
+
+    if entry is None or max_id < entry.max_id:
+        entry = _UserLogs()
+    if max_id > entry.max_id:
+        entry = _extend(entry, _load_logs(conn, username, entry.max_id, max_id), max_id)
+
+    result = _analyze(entry.days, entry.outfits, entry.item_days, entry.item_ids, _load_items(conn, username), today)
+    entry.key, entry.result = key, result
+    with _lock:
+        if len(_cache) >= CACHE_MAX_USERS and username not in _cache:
+            _cache.pop(next(iter(_cache)))
+        _cache[username] = entry
+    return result
+
+
+def _extend(entry, arrays, max_id):
+    # Aynı anda okuyan başka istek eski dizileri görmeye devam etsin diye yeni nesne
+    days, outfits, item_days, item_ids = arrays
+    new = _UserLogs()
+    new.days = np.concatenate([entry.days, days])
+    new.outfits = np.concatenate([entry.outfits, outfits])
+    new.item_days = np.concatenate([entry.item_days, item_days])
+    new.item_ids = np.concatenate([entry.item_ids, item_ids])
+    new.max_id = max_id
+    return new
+
+
+def invalidate(username=None):
+    with _lock:
+        if username is None:
+            _cache.clear()
+        else:
+            _cache.pop(username, None)
@@ -0,0 +1,149 @@
+"""
+Kullanıcı başına hazır (materialized) dolap istatistikleri.
+
+İstatistik ekranı her açılışta clothes/outfits üzerinde beş ayrı
+COUNT/GROUP BY çalıştırıyordu. Artık her kullanıcı için user_wardrobe_stats
+tablosunda tek satır var; clothes ve outfits'e yapılan her INSERT, UPDATE ve
+DELETE trigger'larla bu satırı günceller. Ekran sadece bu satırı okur.
+
+Dağılımlar JSON sütunlarında tutulur ({"ust_giyim": 12, ...}); trigger'lar
+json_set ile ilgili anahtarı +1/-1 yapar. 0'a düşen anahtarlar okurken atlanır.
+Boş ve çift tırnak içeren değerler JSON yoluna yazılamadığı için sayılmaz.
+
+Tam yeniden hesaplama (tutarsızlık şüphesinde / ilk kurulumda):
+    python wardrobe_stats.py [veritabani.db] [--verify]
+"""
+import json
+import sqlite3
+import sys
+
+DIMENSIONS = {
+    # sütun      : clothes alanı
+    "categories": "category",
+    "styles": "style",
+    "seasons": "season",
+    "colors": "color_name",
+}
+DEFAULT_CATEGORIES = ("ust_giyim", "alt_giyim", "elbise", "ayakkabi", "aksesuar")
+
+
+def _countable(expr):
+    """Dağılımlara girecek değerler (trigger ve GROUP BY aynı koşulu kullanır)."""
+    return f"{expr} IS NOT NULL AND {expr} != '' AND instr({expr}, '\"') = 0"
+
+
+def _bump(col, expr, sign):
+    """JSON dağılımında expr anahtarını sign kadar değiştiren SET parçası."""
+    path = f"'$.\"' || {expr} || '\"'"
+    return (f"{col} = CASE WHEN NOT ({_countable(expr)}) THEN {col} "
+            f"ELSE json_set({col}, {path}, COALESCE(json_extract({col}, {path}), 0) {sign} 1) END")
+
+
+def _apply(row, sign):
+    """row (NEW/OLD) satırını kullanıcının istatistiğine ekleyen/çıkaran SQL."""
+    sets = [f"clothes = clothes {sign} 1", f"wear_total = wear_total {sign} COALESCE({row}.wear_count, 0)"]
+    sets += [_bump(col, f"{row}.{field}", sign) for col, field in DIMENSIONS.items()]
+    return (f"INSERT OR IGNORE INTO user_wardrobe_stats (username) SELECT {row}.username WHERE {row}.username IS NOT NULL;\n"
+            f"UPDATE user_wardrobe_stats SET {', '.join(sets)} WHERE username = {row}.username;")
+
+
+def install(cursor):
+    """Tabloyu ve trigger'ları oluşturur. Tablo yeni oluştuysa mevcut veriden doldurur."""
+    is_new = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_wardrobe_stats'").fetchone() is None
+    cols = ", ".join(f"{col} TEXT DEFAULT '{{}}'" for col in DIMENSIONS)
+    cursor.execute(f'''CREATE TABLE IF NOT EXISTS user_wardrobe_stats (
+        username TEXT PRIMARY KEY,
+        clothes INTEGER DEFAULT 0,
+        outfits INTEGER DEFAULT 0,
+        wear_total INTEGER DEFAULT 0,
+        {cols}
+    )''')
+
+    fields = ", ".join(["username", "wear_count"] + list(DIMENSIONS.values()))
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_stats_clothes_insert AFTER INSERT ON clothes BEGIN
+        {_apply("NEW", "+")}
+    END''')
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_stats_clothes_delete AFTER DELETE ON clothes BEGIN
+        {_apply("OLD", "-")}
+    END''')
+    # Sadece istatistiği etkileyen sütunlar değişince (row_version vb. güncellemeleri tetiklemez)
+    cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_stats_clothes_update AFTER UPDATE OF {fields} ON clothes BEGIN
+        {_apply("OLD", "-")}
+        {_apply("NEW", "+")}
+    END''')
+
+    for event, row, sign in (("INSERT", "NEW", "+"), ("DELETE", "OLD", "-")):
+        cursor.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_stats_outfits_{event.lower()} AFTER {event} ON outfits BEGIN
+            INSERT OR IGNORE INTO user_wardrobe_stats (username) SELECT {row}.username WHERE {row}.username IS NOT NULL;
+            UPDATE user_wardrobe_stats SET outfits = outfits {sign} 1 WHERE username = {row}.username;
+        END''')
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_stats_outfits_move AFTER UPDATE OF username ON outfits BEGIN
+        UPDATE user_wardrobe_stats SET outfits = outfits - 1 WHERE username = OLD.username;
+        INSERT OR IGNORE INTO user_wardrobe_stats (username) SELECT NEW.username WHERE NEW.username IS NOT NULL;
+        UPDATE user_wardrobe_stats SET outfits = outfits + 1 WHERE username = NEW.username;
+    END''')
+
+    if is_new:
+        rebuild(cursor.connection)
+
+
+def compute(conn, username):
+    """İstatistikleri doğrudan GROUP BY ile hesaplar (eski yol; doğrulama için)."""
+    result = {
+        "clothes": conn.execute("SELECT COUNT(*) FROM clothes WHERE username = ?", (username,)).fetchone()[0],
+        "outfits": conn.execute("SELECT COUNT(*) FROM outfits WHERE username = ?", (username,)).fetchone()[0],
+        "wear_total": conn.execute("SELECT COALESCE(SUM(wear_count), 0) FROM clothes WHERE username = ?", (username,)).fetchone()[0],
+    }
+    for col, field in DIMENSIONS.items():
+        rows = conn.execute(f"SELECT {field}, COUNT(*) FROM clothes WHERE username = ? AND {_countable(field)} GROUP BY {field}", (username,)).fetchall()
+        result[col] = {k: n for k, n in rows}
+    return result
+
+
+def rebuild(conn, username=None):
+    """Tabloyu (veya tek kullanıcıyı) clothes/outfits'ten baştan hesaplar. Dönüş: kullanıcı sayısı"""
+    if username:
+        users = [username]
+    else:
+        users = [r[0] for r in conn.execute("SELECT username FROM clothes WHERE username IS NOT NULL UNION SELECT username FROM outfits WHERE username IS NOT NULL")]
+
+    if username:
+        conn.execute("DELETE FROM user_wardrobe_stats WHERE username = ?", (username,))
+    else:
+        conn.execute("DELETE FROM user_wardrobe_stats")
+    for user in users:
+        s = compute(conn, user)
+        conn.execute(
+            "INSERT INTO user_wardrobe_stats (username, clothes, outfits, wear_total, categories, styles, seasons, colors) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (user, s["clothes"], s["outfits"], s["wear_total"], *(json.dumps(s[col], ensure_ascii=False) for col in DIMENSIONS)),
+        )
+    conn.commit()
+    return len(users)
+
+
+def read(conn, username):
+    """Tek satır okuma. Dönüş: compute() ile aynı şekil (sıfır olan anahtarlar atlanır)."""
+    row = conn.execute("SELECT clothes, outfits, wear_total, categories, styles, seasons, colors FROM user_wardrobe_stats WHERE username = ?", (username,)).fetchone()
+    if row is None:
+        return {"clothes": 0, "outfits": 0, "wear_total": 0, **{col: {} for col in DIMENSIONS}}
+    result = {"clothes": row[0], "outfits": row[1], "wear_total": row[2]}
+    for i, col in enumerate(DIMENSIONS):
+        result[col] = {k: n for k, n in json.loads(row[3 + i] or "{}").items() if n}
+    return result
+
+
+def verify(conn):
+    """Hazır istatistiklerin GROUP BY sonuçlarıyla aynı olup olmadığını kontrol eder. Dönüş: farklı kullanıcılar"""
+    users = [r[0] for r in conn.execute("SELECT username FROM clothes WHERE username IS NOT NULL UNION SELECT username FROM outfits WHERE username IS NOT NULL")]
+    return [u for u in users if read(conn, u) != compute(conn, u)]
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db = sqlite3.connect(args[0] if args else "giyim.db")
+    if "--verify" in sys.argv:
+        bad = verify(db)
+        print("TUTARLI" if not bad else f"FARKLI: {bad}")
+    else:
+        print(f"{rebuild(db)} kullanıcının istatistiği yeniden hesaplandı.")
+    db.close()
@@ -0,0 +1,266 @@
+"""
+XP defteri (write-behind).
+
+Eskiden her XP olayı (yükleme, yorum, kaydetme, içe aktarma) ayrı bağlantı
+açıp tek bir "UPDATE users SET xp = xp + ?" commit ediyordu; hatalar
+yutuluyor, her olay SQLite yazma kilidi için diğer isteklerle yarışıyordu.
+
+Artık olaylar bellekte toplanır:
+- add() günlük limiti bellekteki sayaçtan kontrol eder, olayı kuyruğa ekler;
+  async handler'lar add_async() kullanır (ilk sayaç okuması thread'de)
+- Sayaçlar worker başınadır; asıl limit flush transaction'ında xp_daily'ye
+  göre tekrar uygulanır, böylece birden fazla worker toplamda limiti aşamaz
+  (fazla olaylar yazılmadan düşer)
+- Arka plan thread'i XP_FLUSH_INTERVAL saniyede bir (veya kuyruk
+  XP_FLUSH_SIZE olaya ulaşınca hemen) tek transaction'da yazar:
+  xp_logs satırları + kullanıcı başına tek UPDATE
+- daily_job verilmişse (xp_rollup.compact) aynı thread günde bir kez çalıştırır
+- Lig değişimi her flush'ta kullanıcı başına bir kez hesaplanır,
+  lig atlayanlara bildirim düşülür; on_flush (sıralama indeksi) yazılan
+  olaylarla çağrılır
+- Yazma başarısız olursa olaylar kuyruğa geri konur, sonraki flush dener
+
+Ölçüm: benchmarks/bench_xp_ledger.py
+"""
+import asyncio
+import atexit
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import xp_rollup
+
+XP_FLUSH_INTERVAL = float(os.getenv("XP_FLUSH_INTERVAL", "2"))
+XP_FLUSH_SIZE = int(os.getenv("XP_FLUSH_SIZE", "200"))
+
+# Günde en fazla kaç kez XP kazandırır. Listede olmayan işlemler sınırsızdır.
+DAILY_CAPS = {
+    "upload": None,       # Yükleme zaten plan limitine (entitlements) bağlı
+    "import": None,       # İçe aktarma da upload kotasından düşer
+    "save_outfit": 5,     # Aynı kombini tekrar tekrar kaydetmek bedava XP olmasın
+    "comment": 5,         # Yorum spam'i
+    "duel_win": 10,       # Oylar anonim; tek kombine oy yağdırarak XP kasılmasın
+}
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+class XPLedger:
+    def __init__(self, db_file, league_fn=None, interval=XP_FLUSH_INTERVAL, size=XP_FLUSH_SIZE, daily_job=None, on_flush=None):
+        self.db_file = db_file
+        self.league_fn = league_fn
+        self.on_flush = on_flush
+        self.daily_job = daily_job
+        self.job_day = None
+        self.interval = interval
+        self.size = size
+        self.pending = []      # (username, action_type, xp, log_date)
+        self.deltas = {}       # username -> yazılmamış toplam XP
+        self.day = _today()
+        self.daily = {}        # (username, action_type) -> bugünkü sayı
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+        self.stopped = False
+
+    # --- Olay ekleme ---
+
+    def _roll_day(self):
+        """Gün değiştiyse bellekteki sayaçlar sıfırlanır. self.lock altında çağrılır."""
+        today = _today()
+        if today > self.day:
+            self.day, self.daily = today, {}
+
+    def _load_count(self, username, action_type):
+        """Bugünkü sayaç bellekte yoksa xp_daily'den bir kez okunur; okuma kilit dışında yapılır."""
+        key = (username, action_type)
+        with self.lock:
+            self._roll_day()
+            if key in self.daily:
+                return
+            day = self.day
+        conn = sqlite3.connect(self.db_file)
+        try:
+            count = xp_rollup.daily_count(conn, username, action_type, day)
+        except sqlite3.Error:
+            count = 0
+        finally:
+            conn.close()
+        with self.lock:
+            if self.day == day:
+                # Bu arada başka thread yüklediyse ya da olay eklediyse onunki geçerli
+                self.daily.setdefault(key, count)
+
+    def count_today(self, username, action_type):
+        self._load_count(username, action_type)
+        with self.lock:
+            self._roll_day()
+            return self.daily.get((username, action_type), 0)
+
+    def add(self, username, action_type, points):
+        """
+        XP olayını kuyruğa ekler. Dönüş: verilen XP (günlük limit dolduysa 0).
+        Sayaç bellekte yoksa veritabanından okunur; async kodda add_async kullanın.
+        """
+        if not username:
+            return 0
+        cap = DAILY_CAPS.get(action_type)
+        self._load_count(username, action_type)
+        with self.lock:
+            self._roll_day()
+            count = self.daily.get((username, action_type), 0)
+            if cap is not None and count >= cap:
+                return 0
+            self.daily[(username, action_type)] = count + 1
+            self.pending.append((username, action_type, points, self.day))
+            self.deltas[username] = self.deltas.get(username, 0) + points
+            full = len(self.pending) >= self.size
+        self._ensure_thread()
+        if full:
+            self.wake.set()
+        return points
+
+    async def add_async(self, username, action_type, points):
+        """add() ile aynı; sayaç okuması event loop'u bloklamasın diye thread'de yapılır."""
+        if username:
+            await asyncio.to_thread(self._load_count, username, action_type)
+        return self.add(username, action_type, points)
+
+    def pending_xp(self, username):
+        """Henüz veritabanına yazılmamış XP (profil okunurken eklenir)."""
+        with self.lock:
+            return self.deltas.get(username, 0)
+
+    # --- Yazma ---
+
+    def flush(self):
+        """Kuyruktaki olayları tek transaction'da yazar. Dönüş: yazılan olay sayısı."""
+        with self.flush_lock:
+            with self.lock:
+                events, deltas = self.pending, self.deltas
+                self.pending, self.deltas = [], {}
+            if not events:
+                return 0
+            try:
+                written = self._write(events)
+            except Exception as e:
+                print(f"XP yazma hatası, tekrar denenecek: {e}")
+                with self.lock:
+                    self.pending = events + self.pending
+                    for user, xp in deltas.items():
+                        self.deltas[user] = self.deltas.get(user, 0) + xp
+                return 0
+            if self.on_flush:
+                try:
+                    self.on_flush(written)
+                except Exception as e:
+                    print(f"XP flush sonrası hata: {e}")
+            return len(written)
+
+    def _within_caps(self, conn, events):
+        """
+        Günlük limiti xp_daily'ye göre (diğer worker'ların yazdıkları dahil) uygular,
+        limiti aşan olayları atar. Yazma kilidi altında çağrılır.
+        """
+        counts = {}
+        kept = []
+        for event in events:
+            user, action, _, day = event
+            cap = DAILY_CAPS.get(action)
+            if cap is not None:
+                key = (user, action, day)
+                if key not in counts:
+                    counts[key] = xp_rollup.daily_count(conn, user, action, day)
+                if counts[key] >= cap:
+                    continue
+                counts[key] += 1
+            kept.append(event)
+        # Bellekteki sayaçlar diğer worker'ların olaylarını da görsün
+        with self.lock:
+            for (user, action, day), count in counts.items():
+                if day == self.day:
+                    key = (user, action)
+                    self.daily[key] = max(self.daily.get(key, 0), count)
+        return kept
+
+    def _write(self, events):
+        """Olayları tek transaction'da yazar. Dönüş: limit kontrolünden geçip yazılan olaylar."""
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            # Yazma kilidi baştan alınır; okuma -> yazma yükseltmesinde kilitlenme olmaz
+            conn.execute("BEGIN IMMEDIATE")
+            events = self._within_caps(conn, events)
+            deltas = {}
+            for user, _, xp, _ in events:
+                deltas[user] = deltas.get(user, 0) + xp
+            users = list(deltas)
+            before = {}
+            if self.league_fn:
+                for i in range(0, len(users), 500):
+                    chunk = users[i:i + 500]
+                    rows = conn.execute(f"SELECT username, xp FROM users WHERE username IN ({','.join('?' * len(chunk))})", chunk)
+                    before.update({u: xp or 0 for u, xp in rows})
+
+            conn.executemany("INSERT INTO xp_logs (username, action_type, xp_amount, log_date) VALUES (?, ?, ?, ?)", events)
+            conn.executemany("UPDATE users SET xp = COALESCE(xp, 0) + ? WHERE username = ?",
+                             [(xp, u) for u, xp in deltas.items() if xp])
+
+            # Lig değişimi: flush başına kullanıcı başına bir kez
+            notes = []
+            for user, old in before.items():
+                new_league = self.league_fn(old + deltas[user])
+                if new_league["name"] != self.league_fn(old)["name"]:
+                    notes.append((user, "system", "league", f"Tebrikler! {new_league['name']} {new_league['icon']} seviyesine yükseldin."))
+            if notes:
+                conn.executemany("INSERT INTO notifications (user_to, user_from, type, message) VALUES (?, ?, ?, ?)", notes)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return events
+
+    # --- Arka plan thread'i ---
+
+    def _ensure_thread(self):
+        if self.thread is not None or self.stopped:
+            return
+        with self.flush_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="xp-ledger", daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self.stopped:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+            self._run_daily_job()
+
+    def _run_daily_job(self):
+        today = _today()
+        if self.daily_job is None or self.job_day == today:
+            return
+        self.job_day = today
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            self.daily_job(conn)
+        except Exception as e:
+            # Bakım depoya da dokunabilir (blob silme); hiçbir hata thread'i durdurmamalı
+            print(f"XP günlük bakım hatası: {e}")
+        finally:
+            conn.close()
+
+    def close(self):
+        """Thread'i durdurur ve kalanları yazar (uygulama kapanırken)."""
+        self.stopped = True
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.flush()
@@ -0,0 +1,269 @@
+"""
+Bellekte lig sıralama indeksi (Fenwick ağacı).
+
+"Kaçıncıyım?" sorusu için users tablosunu XP'ye göre sıralamak gerekiyordu.
+Artık her dönem (all / week / month) için:
+- Genel indeks: bütün kullanıcılar
+- Lig indeksleri: kullanıcılar toplam XP'lerine göre (calculate_league)
+  ayrı indekslerde; kullanıcı lig değiştirince taşınır
+
+Her indeks XP değerleri üzerinde bir Fenwick ağacıdır (değer başına
+kullanıcı sayısı). Sıralama = kendisinden yüksek XP'li kullanıcı sayısı + 1;
+ilk N için ağaçta k. büyük değer aranır. İkisi de O(log maks_XP).
+
+İndeksler ilk kullanımda users / xp_daily'den kurulur, XP flush'ından sonra
+apply() ile güncellenir. Birden fazla worker varsa her süreç sadece kendi
+flush'larını görür; RANK_REBUILD_INTERVAL saniyede bir baştan kurulur.
+
+Ölçüm (1M kullanıcı): benchmarks/bench_xp_rank.py
+"""
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+import xp_rollup
+
+RANK_REBUILD_INTERVAL = float(os.getenv("RANK_REBUILD_INTERVAL", "600"))
+PERIODS = ("all", "week", "month")
+
+
+class RankIndex:
+    """Kullanıcı -> XP; XP değerleri üzerinde Fenwick ağacı."""
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.scores = {}
+        self.buckets = {}   # xp -> {kullanıcılar}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _update(self, xp, delta):
+        i = xp + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def _count_le(self, xp):
+        """XP'si <= xp olan kullanıcı sayısı."""
+        i = min(xp + 1, self.size)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _build_tree(self, max_xp):
+        size = self.size
+        while size <= max_xp:
+            size *= 2
+        self.size = size
+        tree = [0] * (size + 1)
+        # O(maks_XP) kurulum: her düğüm kendi toplamını ebeveynine ekler
+        for value, users in self.buckets.items():
+            tree[value + 1] += len(users)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def load(self, pairs):
+        """Boş indekse toplu yükleme: [(kullanıcı, xp), ...] (tek tek set'ten çok daha hızlı)."""
+        scores, buckets = self.scores, self.buckets
+        for user, xp in pairs:
+            xp = max(int(xp or 0), 0)
+            scores[user] = xp
+            bucket = buckets.get(xp)
+            if bucket is None:
+                buckets[xp] = {user}
+            else:
+                bucket.add(user)
+        self._build_tree(max(buckets, default=0))
+
+    def set(self, user, xp):
+        xp = max(int(xp or 0), 0)
+        old = self.scores.get(user)
+        if old == xp:
+            return
+        if old is not None:
+            self._remove_bucket(user, old)
+        if xp >= self.size:
+            self._build_tree(xp)
+        self.scores[user] = xp
+        self.buckets.setdefault(xp, set()).add(user)
+        self._update(xp, 1)
+
+    def add(self, user, delta):
+        self.set(user, self.scores.get(user, 0) + delta)
+
+    def remove(self, user):
+        old = self.scores.pop(user, None)
+        if old is not None:
+            self._remove_bucket(user, old)
+
+    def _remove_bucket(self, user, xp):
+        bucket = self.buckets[xp]
+        bucket.discard(user)
+        if not bucket:
+            del self.buckets[xp]
+        self._update(xp, -1)
+
+    def get(self, user):
+        return self.scores.get(user)
+
+    def rank(self, user):
+        """1'den başlayan sıra (eşit XP aynı sırayı paylaşır). Kullanıcı yoksa None."""
+        xp = self.scores.get(user)
+        if xp is None:
+            return None
+        return len(self.scores) - self._count_le(xp) + 1
+
+    def _kth_smallest(self, k):
+        """k. en küçük kullanıcının XP değeri (1 <= k <= n)."""
+        pos = 0
+        step = 1 << (self.size.bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                pos = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return pos  # tree indeksi pos+1 -> xp = pos
+
+    def top(self, n):
+        """En yüksek XP'li ilk n kullanıcı: [(sıra, kullanıcı, xp), ...]"""
+        result = []
+        total = len(self.scores)
+        k = 1  # k. en büyük
+        while len(result) < n and k <= total:
+            xp = self._kth_smallest(total - k + 1)
+            bucket = self.buckets[xp]
+            # Eşit XP'de kullanıcı adına göre; kalabalık kovada sadece gerekenler sıralanır
+            for user in heapq.nsmallest(n - len(result), bucket):
+                result.append((k, user, xp))
+            k += len(bucket)
+        return result
+
+
+class LeagueBoard:
+    """Dönem başına genel ve lig indeksleri."""
+
+    def __init__(self, db_file, league_fn):
+        self.db_file = db_file
+        self.league_fn = league_fn
+        self.lock = threading.Lock()
+        self.built_at = None
+        self.periods = {}   # dönem -> (başlangıç, bitiş)
+        self.indexes = {}   # (dönem, lig) -> RankIndex; lig None = genel
+        self.league_of = {}
+
+    def _league(self, xp):
+        return self.league_fn(xp)["class"]
+
+    def _index(self, period, league=None):
+        key = (period, league)
+        if key not in self.indexes:
+            self.indexes[key] = RankIndex()
+        return self.indexes[key]
+
+    def _stale(self):
+        if self.built_at is None or time.monotonic() - self.built_at > RANK_REBUILD_INTERVAL:
+            return True
+        # Hafta / ay döndüyse dönem indeksleri sıfırlanmalı
+        return any(xp_rollup.period_range(p)[0] != self.periods[p][0] for p in PERIODS if p != "all")
+
+    def rebuild(self):
+        """users ve xp_daily'den baştan kurar (lock altında çağrılır)."""
+        self.indexes, self.league_of = {}, {}
+        conn = sqlite3.connect(self.db_file)
+        try:
+            rows = conn.execute("SELECT username, COALESCE(xp, 0) FROM users WHERE username IS NOT NULL").fetchall()
+            self._load_period("all", rows)
+            for period in PERIODS:
+                if period == "all":
+                    continue
+                start, end = xp_rollup.period_range(period)
+                self.periods[period] = (start, end)
+                rows = conn.execute("SELECT username, SUM(xp) FROM xp_daily WHERE day >= ? GROUP BY username", (start,)).fetchall()
+                self._load_period(period, [r for r in rows if r[0] in self.league_of])
+        finally:
+            conn.close()
+        self.built_at = time.monotonic()
+
+    def _load_period(self, period, rows):
+        by_league = {}
+        for user, xp in rows:
+            if period == "all":
+                self.league_of[user] = self._league(xp)
+            by_league.setdefault(self.league_of[user], []).append((user, xp))
+        self._index(period).load(rows)
+        for league, pairs in by_league.items():
+            self._index(period, league).load(pairs)
+
+    def _ensure(self):
+        if self._stale():
+            self.rebuild()
+
+    def apply(self, events):
+        """XP flush'ından sonra: events = [(kullanıcı, işlem, xp, gün), ...]"""
+        with self.lock:
+            if self.built_at is None:
+                return  # henüz kurulmadı; ilk kullanımda zaten güncel okunur
+            if self._stale():
+                self.rebuild()
+                return
+            for user, _, xp, day in events:
+                if not xp:
+                    continue
+                total = self._index("all")
+                old_league = self.league_of.get(user)
+                total.add(user, xp)
+                new_league = self._league(total.get(user))
+                self.league_of[user] = new_league
+                for period in PERIODS:
+                    if period == "all":
+                        score = total.get(user)
+                    elif day < self.periods[period][0]:
+                        continue
+                    else:
+                        general = self._index(period)
+                        general.add(user, xp)
+                        score = general.get(user)
+                    if old_league is not None and old_league != new_league:
+                        self._index(period, old_league).remove(user)
+                    self._index(period, new_league).set(user, score)
+
+    def _load_user(self, user):
+        # Son kurulumdan sonra kayıt olan kullanıcı: tek satır okunup eklenir
+        conn = sqlite3.connect(self.db_file)
+        try:
+            row = conn.execute("SELECT COALESCE(xp, 0) FROM users WHERE username = ?", (user,)).fetchone()
+        finally:
+            conn.close()
+        if row:
+            league = self._league(row[0])
+            self.league_of[user] = league
+            self._index("all").set(user, row[0])
+            self._index("all", league).set(user, row[0])
+
+    def standing(self, user, period="all", limit=20):
+        """Kullanıcının ligi, genel ve lig içi sırası, ligin ilk N'i."""
+        with self.lock:
+            self._ensure()
+            if user not in self.league_of:
+                self._load_user(user)
+            league = self.league_of.get(user)
+            general = self._index(period)
+            league_index = self._index(period, league) if league else None
+            return {
+                "league": league,
+                "xp": general.get(user) or 0,
+                "rank": general.rank(user),
+                "league_rank": league_index.rank(user) if league_index else None,
+                "league_size": len(league_index) if league_index else 0,
+                "leaders": [{"rank": r, "username": u, "xp": xp} for r, u, xp in (league_index.top(limit) if league_index else [])],
+            }
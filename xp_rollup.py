@@ -0,0 +1,100 @@
+"""
+xp_logs günlük özetleri ve saklama süresi.
+
+xp_logs her işlemde bir satır büyüyordu; günlük limit kontrolleri bu
+tablodan üç sütunlu filtreyle sayıyordu. Artık:
+- xp_daily (username, action_type, day) başına sayı ve XP toplamı tutar;
+  xp_logs'a eklenen her satır trigger'la buraya işlenir
+- Limit kontrolleri ve haftalık/aylık lig tabloları sadece xp_daily'yi okur
+- compact() XP_LOG_RETENTION_DAYS günden eski ham satırları siler
+  (özetlerde zaten sayılmış oldukları için hiçbir toplam değişmez)
+
+Elle çalıştırma:
+    python xp_rollup.py [veritabani.db] [--days N]
+"""
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+XP_LOG_RETENTION_DAYS = int(os.getenv("XP_LOG_RETENTION_DAYS", "90"))
+
+
+def install(cursor):
+    """Tabloyu ve trigger'ı oluşturur. Tablo yeni oluştuysa mevcut xp_logs'tan doldurur."""
+    is_new = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'xp_daily'").fetchone() is None
+    cursor.execute('''CREATE TABLE IF NOT EXISTS xp_daily (
+        username TEXT NOT NULL,
+        action_type TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER DEFAULT 0,
+        xp INTEGER DEFAULT 0,
+        PRIMARY KEY (username, action_type, day)
+    ) WITHOUT ROWID''')
+    # Dönem lig tabloları gün aralığıyla okur
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_xp_daily_day ON xp_daily(day, username, xp)")
+    cursor.execute('''CREATE TRIGGER IF NOT EXISTS trg_xp_logs_rollup AFTER INSERT ON xp_logs
+        WHEN NEW.username IS NOT NULL AND NEW.log_date IS NOT NULL BEGIN
+        INSERT INTO xp_daily (username, action_type, day, count, xp)
+        VALUES (NEW.username, COALESCE(NEW.action_type, ''), NEW.log_date, 1, COALESCE(NEW.xp_amount, 0))
+        ON CONFLICT(username, action_type, day) DO UPDATE SET count = count + 1, xp = xp + excluded.xp;
+    END''')
+    if is_new:
+        rebuild(cursor.connection)
+
+
+def rebuild(conn):
+    """xp_daily'yi ham xp_logs'tan baştan hesaplar (silinmiş eski satırlar geri gelmez)."""
+    conn.execute("DELETE FROM xp_daily")
+    conn.execute('''INSERT INTO xp_daily (username, action_type, day, count, xp)
+                    SELECT username, COALESCE(action_type, ''), log_date, COUNT(*), COALESCE(SUM(xp_amount), 0)
+                    FROM xp_logs WHERE username IS NOT NULL AND log_date IS NOT NULL
+                    GROUP BY username, COALESCE(action_type, ''), log_date''')
+    conn.commit()
+
+
+def daily_count(conn, username, action_type, day):
+    """O gün o işlemin kaç kez yapıldığı (tek satır okuma)."""
+    row = conn.execute("SELECT count FROM xp_daily WHERE username = ? AND action_type = ? AND day = ?",
+                       (username, action_type, day)).fetchone()
+    return row[0] if row else 0
+
+
+def compact(conn, keep_days=None):
+    """Saklama süresinden eski ham satırları siler. Dönüş: silinen satır sayısı"""
+    keep_days = XP_LOG_RETENTION_DAYS if keep_days is None else keep_days
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+    deleted = conn.execute("DELETE FROM xp_logs WHERE log_date < ?", (cutoff,)).rowcount
+    conn.commit()
+    return deleted
+
+
+def period_range(period, today=None):
+    """'week' (Pazartesi'den) veya 'month' (ayın 1'inden) -> (başlangıç, bugün)"""
+    today = today or datetime.now().date()
+    if period == "week":
+        start = today - timedelta(days=today.weekday())
+    elif period == "month":
+        start = today.replace(day=1)
+    else:
+        raise ValueError(f"Bilinmeyen dönem: {period}")
+    return start.isoformat(), today.isoformat()
+
+
+def leaderboard(conn, start, end, limit=20):
+    """[start, end] günlerinde en çok XP kazananlar: [(username, xp), ...]"""
+    return conn.execute('''SELECT username, SUM(xp) AS total FROM xp_daily
+                           WHERE day BETWEEN ? AND ? GROUP BY username HAVING total > 0
+                           ORDER BY total DESC, username LIMIT ?''', (start, end, limit)).fetchall()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    days = None
+    if "--days" in args:
+        i = args.index("--days")
+        days = int(args[i + 1])
+        del args[i:i + 2]
+    db = sqlite3.connect(args[0] if args else "giyim.db")
+    print(f"{compact(db, days)} eski xp_logs satırı silindi.")
+    db.close()